@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Archivo histórico (SQLite) de los mensajes extraídos de cada proveedor
+Cada mensaje se guarda una sola vez por (proveedor, fecha, data-id, hash del contenido),
+así se pueden consultar rangos de fechas y volver a generar el lista_<proveedor>.txt de
+cualquier día sin abrir WhatsApp.
+
+Uso:
+    python archivo_mensajes.py --listar --proveedor gcgroup --desde 2025-11-01
+    python archivo_mensajes.py --reemitir --proveedor gcgroup --fecha 2025-11-14
+"""
+
+import os
+import sys
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS mensajes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    proveedor TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    data_id TEXT NOT NULL DEFAULT '',
+    hash TEXT NOT NULL,
+    texto TEXT NOT NULL,
+    extraido TEXT NOT NULL,
+    UNIQUE (proveedor, fecha, data_id, hash)
+);
+CREATE INDEX IF NOT EXISTS idx_mensajes_proveedor_fecha ON mensajes (proveedor, fecha);
+"""
+
+
+class ArchivoMensajes:
+    def __init__(self, ruta="output/archivo_wsp.sqlite3"):
+        self.ruta = ruta
+        self.lock = threading.Lock()
+
+    def conectar(self):
+        """Abrir una conexión nueva (una por operación: los workers paralelos usan sus propios hilos)"""
+        os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+        conexion = sqlite3.connect(self.ruta, timeout=10)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.executescript(ESQUEMA)
+        return conexion
+
+    def guardar(self, proveedor, fecha, textos, data_ids=None):
+        """Archivar los mensajes de un día; los repetidos se descartan. Devuelve cuántos eran nuevos"""
+        extraido = datetime.now().isoformat(timespec='seconds')
+        filas = [
+            (proveedor, fecha.strftime("%Y-%m-%d"), (data_ids[i] if data_ids else None) or "",
+             hashlib.sha256(texto.encode('utf-8')).hexdigest(), texto, extraido)
+            for i, texto in enumerate(textos)
+        ]
+        with self.lock:
+            conexion = self.conectar()
+            try:
+                with conexion:
+                    antes = conexion.total_changes
+                    conexion.executemany(
+                        "INSERT OR IGNORE INTO mensajes (proveedor, fecha, data_id, hash, texto, extraido) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        filas
+                    )
+                    return conexion.total_changes - antes
+            finally:
+                conexion.close()
+
+    def consultar(self, proveedor, desde=None, hasta=None):
+        """Mensajes archivados de un proveedor entre dos fechas (inclusive), en orden de llegada"""
+        consulta = "SELECT fecha, data_id, hash, texto, extraido FROM mensajes WHERE proveedor = ?"
+        parametros = [proveedor]
+        if desde:
+            consulta += " AND fecha >= ?"
+            parametros.append(desde.strftime("%Y-%m-%d"))
+        if hasta:
+            consulta += " AND fecha <= ?"
+            parametros.append(hasta.strftime("%Y-%m-%d"))
+        conexion = self.conectar()
+        try:
+            filas = conexion.execute(consulta + " ORDER BY fecha, id", parametros).fetchall()
+        finally:
+            conexion.close()
+        return [
+            {"fecha": fecha, "data_id": data_id, "hash": hash_, "texto": texto, "extraido": extraido}
+            for fecha, data_id, hash_, texto, extraido in filas
+        ]
+
+    def textos_del_dia(self, proveedor, fecha):
+        """Textos de un día tal como se guardarían hoy: la última versión de cada mensaje (por data-id)"""
+        textos = {}
+        for mensaje in self.consultar(proveedor, fecha, fecha):
+            # Un mensaje editado conserva su data-id: gana la versión más reciente, en su lugar original
+            clave = mensaje["data_id"] or mensaje["hash"]
+            textos[clave] = mensaje["texto"]
+        return list(textos.values())
+
+    def reemitir_txt(self, proveedor, fecha, archivo_salida):
+        """Volver a escribir el lista_<proveedor>.txt de un día a partir del archivo"""
+        textos = self.textos_del_dia(proveedor, fecha)
+        if not textos:
+            print(f"⚠️ No hay mensajes archivados de {proveedor} para el {fecha.strftime('%d/%m/%Y')}")
+            return False
+        os.makedirs(os.path.dirname(archivo_salida) or ".", exist_ok=True)
+        with open(archivo_salida, 'w', encoding='utf-8') as file:
+            file.write(f"# Lista de precios - {proveedor}\n")
+            file.write(f"# Reemitido del archivo histórico: lista del {fecha.strftime('%d/%m/%Y')}\n")
+            file.write("# " + "="*60 + "\n\n")
+            for texto in textos:
+                file.write(texto + "\n")
+        print(f"✅ Archivo reemitido: {archivo_salida} ({len(textos)} mensaje(s))")
+        return True
+
+
+def main():
+    """Consultar el archivo o reemitir la lista de un día"""
+    parser = argparse.ArgumentParser(description="Archivo histórico de mensajes de proveedores")
+    parser.add_argument("--ruta", default="output/archivo_wsp.sqlite3", help="Base SQLite del archivo")
+    parser.add_argument("--proveedor", required=True, help="Nombre corto del proveedor (ej: gcgroup)")
+    parser.add_argument("--fecha", help="Día a reemitir (AAAA-MM-DD)")
+    parser.add_argument("--desde", help="Listar desde este día (AAAA-MM-DD)")
+    parser.add_argument("--hasta", help="Listar hasta este día (AAAA-MM-DD)")
+    parser.add_argument("--salida", help="Archivo a escribir (por defecto output/lista_<proveedor>.txt)")
+    accion = parser.add_mutually_exclusive_group(required=True)
+    accion.add_argument("--listar", action="store_true", help="Mostrar los mensajes archivados")
+    accion.add_argument("--reemitir", action="store_true", help="Reescribir el .txt de --fecha")
+    args = parser.parse_args()
+
+    def fecha(valor):
+        return datetime.strptime(valor, "%Y-%m-%d") if valor else None
+
+    archivo = ArchivoMensajes(args.ruta)
+    if args.listar:
+        mensajes = archivo.consultar(args.proveedor, fecha(args.desde), fecha(args.hasta))
+        for mensaje in mensajes:
+            primera_linea = mensaje["texto"].splitlines()[0] if mensaje["texto"] else ""
+            print(f"{mensaje['fecha']}  {len(mensaje['texto']):>6} chars  {primera_linea[:70]}")
+        print(f"📊 {len(mensajes)} mensaje(s) archivado(s)")
+        return
+
+    if not args.fecha:
+        parser.error("--reemitir requiere --fecha")
+    salida = args.salida or f"output/lista_{args.proveedor}.txt"
+    if not archivo.reemitir_txt(args.proveedor, fecha(args.fecha), salida):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
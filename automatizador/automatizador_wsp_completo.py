@@ -3,22 +3,670 @@ import re
 import os
 import subprocess
 import sys
+import argparse
+import json
+import shutil
+import platform
+import hashlib
+import threading
+import queue
+import asyncio
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, NoSuchElementException
+from registro_selectores import RegistroSelectores
+from traza_wsp import TrazaFases
+from archivo_mensajes import ArchivoMensajes
+import chat_exportado
+import procesar_gcgroup_refactor
+
+# Caché local de chromedriver: {"<versión mayor de Chrome>": "<ruta al binario>"}
+RUTA_CACHE_CHROMEDRIVER = os.path.expanduser("~/.cache/selenium_wsp/chromedriver.json")
+
+# Último mensaje procesado por proveedor: {"<nombre_corto>": {"data_id", "hash", ...}}
+RUTA_CHECKPOINTS = "output/checkpoints_wsp.json"
+_lock_checkpoints = threading.Lock()
+
+# Título del chat que abrió cada proveedor la última vez: {"<nombre_corto>": {"titulo", "aciertos", "fallos", ...}}
+RUTA_CACHE_CHATS = "output/chats_wsp.json"
+_lock_cache_chats = threading.Lock()
+
+# Script asíncrono: resuelve cuando el contenedor pasa `quietud` ms sin mutaciones
+# (o cuando vence el plazo). Evita sleeps fijos después de scrolls, búsquedas y clics.
+JS_ESPERAR_DOM_ESTABLE = """
+var contenedor = arguments[0] || document.body;
+var quietud = arguments[1], plazo = arguments[2];
+var listo = arguments[arguments.length - 1];
+var inicio = performance.now(), ultimo = inicio, mutaciones = 0;
+var observador = new MutationObserver(function (lista) {
+    mutaciones += lista.length;
+    ultimo = performance.now();
+});
+observador.observe(contenedor, {childList: true, subtree: true, characterData: true});
+(function revisar() {
+    var ahora = performance.now();
+    if (ahora - ultimo >= quietud || ahora - inicio >= plazo) {
+        observador.disconnect();
+        listo({estable: ahora - ultimo >= quietud, mutaciones: mutaciones});
+    } else {
+        setTimeout(revisar, 50);
+    }
+})();
+"""
+
+# Script único de extracción: devuelve todas las burbujas del chat abierto como registros
+# planos, así el filtrado corre en Python sin una llamada a chromedriver por elemento.
+# Con `margen` (px) solo se serializan las burbujas cercanas al viewport (recorrer_mensajes).
+JS_EXTRAER_BURBUJAS = """
+var raiz = document.querySelector('#main') || document.body;
+var soloId = arguments[0], margen = arguments[1];
+var leerMas = /^(leer|lee|read|ver|show) m(á|a|o)(s|re)/i;
+var registros = [];
+var nodos = soloId
+    ? raiz.querySelectorAll('[data-id="' + CSS.escape(soloId) + '"]')
+    : raiz.querySelectorAll('[data-id]');
+for (var i = 0; i < nodos.length; i++) {
+    var nodo = nodos[i];
+    if (nodo.parentElement && nodo.parentElement.closest('[data-id]')) continue;
+    var rect = nodo.getBoundingClientRect();
+    if (margen != null && (rect.bottom < -margen || rect.top > window.innerHeight + margen)) continue;
+    var meta = nodo.querySelector('[data-pre-plain-text]');
+    var cuerpo = nodo.querySelector('.selectable-text') || meta || nodo;
+    var truncado = false;
+    var botones = nodo.querySelectorAll('.read-more-button, [role="button"]');
+    for (var j = 0; j < botones.length; j++) {
+        if (botones[j].classList.contains('read-more-button') || leerMas.test((botones[j].textContent || '').trim())) {
+            truncado = true;
+            break;
+        }
+    }
+    registros.push({
+        data_id: nodo.getAttribute('data-id'),
+        texto: (cuerpo.innerText || '').trim(),
+        pre: meta ? meta.getAttribute('data-pre-plain-text') : null,
+        truncado: truncado,
+        indice: registros.length,
+        top: Math.round(rect.top),
+        visible: rect.bottom > 0 && rect.top < window.innerHeight
+    });
+}
+return registros;
+"""
+
+# Expansión en una sola pasada del lado del navegador: hace clic en cada "Leer más" /
+# "Read more" (opcionalmente solo en ciertas burbujas) y espera con un MutationObserver
+# a que todas crezcan o desaparezca su botón. Devuelve un único resumen.
+JS_EXPANDIR_LEER_MAS = """
+var raiz = document.querySelector('#main') || document.body;
+var filtroIds = arguments[0], contiene = arguments[1], plazo = arguments[2];
+var listo = arguments[arguments.length - 1];
+var inicio = performance.now();
+var patron = /^(leer|lee|read|ver|show) m(á|a|o)(s|re)/i;
+
+function largoBurbuja(p) {
+    var burbuja = p.id ? raiz.querySelector('[data-id="' + CSS.escape(p.id) + '"]') : p.burbuja;
+    if (!burbuja) return -1;
+    var cuerpo = burbuja.querySelector('.selectable-text') || burbuja;
+    return (cuerpo.innerText || '').length;
+}
+
+var pendientes = [], vistos = new Set();
+var candidatos = raiz.querySelectorAll('.read-more-button, [role="button"]');
+for (var i = 0; i < candidatos.length; i++) {
+    var boton = candidatos[i];
+    if (!boton.classList.contains('read-more-button') && !patron.test((boton.textContent || '').trim())) continue;
+    var burbuja = boton.closest('[data-id]') || boton.parentElement;
+    if (vistos.has(burbuja)) continue;
+    vistos.add(burbuja);
+    var id = burbuja.getAttribute('data-id');
+    if (filtroIds && filtroIds.indexOf(id) === -1) continue;
+    if (contiene && (burbuja.innerText || '').toUpperCase().indexOf(contiene) === -1) continue;
+    var p = {boton: boton, burbuja: burbuja, id: id, clic: true};
+    p.largo = largoBurbuja(p);
+    try {
+        boton.click();
+    } catch (e) {
+        try {
+            boton.dispatchEvent(new MouseEvent('click', {view: window, bubbles: true, cancelable: true}));
+        } catch (e2) {
+            p.clic = false;
+        }
+    }
+    pendientes.push(p);
+}
+
+function expandido(p) {
+    return p.clic && (!p.boton.isConnected || largoBurbuja(p) > p.largo);
+}
+
+var terminado = false;
+function terminar() {
+    if (terminado) return;
+    terminado = true;
+    observador.disconnect();
+    var ok = pendientes.filter(expandido);
+    listo({
+        encontrados: pendientes.length,
+        expandidos: ok.length,
+        fallidos: pendientes.length - ok.length,
+        ms: Math.round(performance.now() - inicio),
+        data_ids: ok.map(function (p) { return p.id; })
+    });
+}
+
+var observador = new MutationObserver(function () {
+    if (pendientes.every(function (p) { return !p.clic || expandido(p); })) terminar();
+});
+if (!pendientes.length || pendientes.every(function (p) { return !p.clic || expandido(p); })) {
+    terminar();
+} else {
+    observador.observe(raiz, {childList: true, subtree: true, characterData: true});
+    setTimeout(terminar, plazo);
+}
+"""
+
+# Completitud de una burbuja con hechos del DOM: ya no tiene "Leer más" y el largo de su
+# texto no cambió durante `quietud` ms (MutationObserver sobre la burbuja). Devuelve
+# {existe, truncado, largo, estable, cambios, ms}.
+JS_VERIFICAR_BURBUJA = """
+var raiz = document.querySelector('#main') || document.body;
+var id = arguments[0], quietud = arguments[1], plazo = arguments[2];
+var listo = arguments[arguments.length - 1];
+var patron = /^(leer|lee|read|ver|show) m(á|a|o)(s|re)/i;
+var burbuja = raiz.querySelector('[data-id="' + CSS.escape(id) + '"]');
+if (!burbuja) {
+    listo({existe: false, truncado: false, largo: 0, estable: false, cambios: 0, ms: 0});
+    return;
+}
+var inicio = performance.now();
+
+function estado() {
+    var truncado = false;
+    var botones = burbuja.querySelectorAll('.read-more-button, [role="button"]');
+    for (var i = 0; i < botones.length; i++) {
+        if (botones[i].classList.contains('read-more-button') || patron.test((botones[i].textContent || '').trim())) {
+            truncado = true;
+            break;
+        }
+    }
+    var cuerpo = burbuja.querySelector('.selectable-text') || burbuja;
+    return {existe: burbuja.isConnected, truncado: truncado, largo: (cuerpo.innerText || '').length};
+}
+
+var ultimo = estado(), cambios = 0, temporizador = null, limite = null;
+function terminar(estable) {
+    observador.disconnect();
+    clearTimeout(temporizador);
+    clearTimeout(limite);
+    var final = estado();
+    final.estable = estable;
+    final.cambios = cambios;
+    final.ms = Math.round(performance.now() - inicio);
+    listo(final);
+}
+function rearmar() {
+    clearTimeout(temporizador);
+    temporizador = setTimeout(function () { terminar(true); }, quietud);
+}
+var observador = new MutationObserver(function () {
+    var actual = estado();
+    if (actual.largo !== ultimo.largo || actual.truncado !== ultimo.truncado) {
+        cambios++;
+        ultimo = actual;
+        rearmar();
+    }
+});
+observador.observe(burbuja, {childList: true, subtree: true, characterData: true});
+limite = setTimeout(function () { terminar(false); }, plazo);
+rearmar();
+"""
+
+# Modo daemon: MutationObserver sobre la lista de chats (#pane-side). Cuando cambia la fila
+# de un proveedor vigilado y su vista previa coincide con filtro_inicio, encola un evento
+# en window.__wspVigia.eventos. Devuelve la cantidad de chats vigilados visibles (false si
+# la lista todavía no está en pantalla).
+JS_INSTALAR_VIGIA = """
+var vigilados = arguments[0];
+var panel = document.querySelector('#pane-side');
+if (!panel) return false;
+if (window.__wspVigia) window.__wspVigia.observador.disconnect();
+
+function normalizar(t) {
+    return (t || '').toLowerCase().normalize('NFD').replace(/[\\u0300-\\u036f]/g, '');
+}
+function vigiladoDe(titulo) {
+    var t = normalizar(titulo);
+    for (var i = 0; i < vigilados.length; i++) {
+        for (var j = 0; j < vigilados[i].terminos.length; j++) {
+            if (t.indexOf(normalizar(vigilados[i].terminos[j])) !== -1) return vigilados[i];
+        }
+    }
+    return null;
+}
+function filas() {
+    var resultado = [];
+    var nodos = panel.querySelectorAll('[role="listitem"], [role="row"]');
+    for (var i = 0; i < nodos.length; i++) {
+        var titulo = nodos[i].querySelector('span[title]');
+        var vigilado = titulo && vigiladoDe(titulo.getAttribute('title'));
+        if (vigilado) {
+            resultado.push({vigilado: vigilado, titulo: titulo.getAttribute('title'), texto: nodos[i].innerText || ''});
+        }
+    }
+    return resultado;
+}
+
+var vigia = {panel: panel, eventos: [], firmas: {}, demora: null};
+vigia.tomarBase = function () {
+    vigia.firmas = {};
+    vigia.eventos = [];
+    filas().forEach(function (f) { vigia.firmas[f.titulo] = f.texto; });
+};
+vigia.revisar = function () {
+    filas().forEach(function (f) {
+        if (vigia.firmas[f.titulo] === f.texto) return;
+        vigia.firmas[f.titulo] = f.texto;
+        var texto = normalizar(f.texto);
+        var esLista = f.vigilado.filtros.some(function (filtro) { return texto.indexOf(normalizar(filtro)) !== -1; });
+        if (esLista) {
+            vigia.eventos.push({proveedor: f.vigilado.nombre, titulo: f.titulo, vista_previa: f.texto.slice(0, 200)});
+        }
+    });
+};
+vigia.observador = new MutationObserver(function () {
+    clearTimeout(vigia.demora);
+    vigia.demora = setTimeout(vigia.revisar, 300);
+});
+vigia.observador.observe(panel, {childList: true, subtree: true, characterData: true});
+vigia.tomarBase();
+window.__wspVigia = vigia;
+return Object.keys(vigia.firmas).length;
+"""
+
+# Espera larga del lado del navegador: resuelve con los eventos pendientes apenas hay
+# alguno (o vacío al vencer el plazo). null si el vigía ya no existe (p. ej. tras recargar).
+JS_ESPERAR_EVENTOS_VIGIA = """
+var plazo = arguments[0];
+var listo = arguments[arguments.length - 1];
+var vigia = window.__wspVigia;
+if (!vigia || !vigia.panel.isConnected) {
+    listo(null);
+    return;
+}
+var inicio = performance.now();
+(function revisar() {
+    if (vigia.eventos.length || performance.now() - inicio >= plazo) {
+        listo(vigia.eventos.splice(0));
+    } else {
+        setTimeout(revisar, 200);
+    }
+})();
+"""
+
+# Idioma con el que se abre WhatsApp Web. data-pre-plain-text sale en el idioma del navegador
+# ("[10:32, 14/11/2025]" en es-AR, "[10:32 AM, 11/14/2025]" en en-US): fijarlo fija el orden día/mes en los
+# dos motores (Selenium y Playwright), que abren Chrome con este idioma
+IDIOMA_WHATSAPP = "es-AR"
+
+# "[10:32, 14/11/2025] GcGroup: " (también acepta segundos y a. m./p. m.)
+REGEX_PRE_PLAIN_TEXT = re.compile(
+    r'^\[(\d{1,2}):(\d{2})(?::\d{2})?\s*([ap])?\.?\s*m?\.?,\s*(\d{1,2})/(\d{1,2})/(\d{2,4})\]\s*(.*?):\s*$',
+    re.IGNORECASE
+)
+
+# Selectores alternativos por objetivo lógico; RegistroSelectores decide el orden en cada corrida
+SELECTORES = {
+    "campo_busqueda": [
+        '//div[@contenteditable="true"][@data-tab="3"]',
+        '//div[@role="textbox"][@contenteditable="true"][@data-tab="3"]',
+        '//div[@id="side"]//div[@contenteditable="true"]'
+    ],
+    "contenedor_chat": [
+        '//div[@data-testid="chat-history"]',
+        '//div[@data-testid="conversation-panel-messages"]',
+        '//div[contains(@class, "copyable-area")]'
+    ]
+}
+
+# Código QR de vinculación: si aparece, la sesión del perfil expiró
+SELECTORES_QR = [
+    'canvas[aria-label*="scan" i]',
+    'canvas[aria-label*="QR" i]',
+    '[data-ref] canvas',
+    '[data-testid="qrcode"]'
+]
+
+# Sondeo de arranque: 'sesion' si ya está la lista de chats (campo de búsqueda), 'qr' si
+# WhatsApp pide vincular el dispositivo, null mientras sigue cargando
+JS_ESTADO_SESION = """
+var xpaths = arguments[0], selectoresQr = arguments[1];
+for (var i = 0; i < xpaths.length; i++) {
+    if (document.evaluate(xpaths[i], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue) {
+        return 'sesion';
+    }
+}
+for (var j = 0; j < selectoresQr.length; j++) {
+    if (document.querySelector(selectoresQr[j])) return 'qr';
+}
+return null;
+"""
+
+# Código de salida cuando el perfil necesita escanear el QR (para alertar desde cron)
+SALIDA_REQUIERE_QR = 3
+
+# URLs que se bloquean con --bloquear-recursos (Network.setBlockedURLs): el scraper solo
+# lee texto, así que no hacen falta fotos de perfil, stickers, previews de imágenes ni fuentes
+URLS_BLOQUEADAS = [
+    "*pps.whatsapp.net/*",   # fotos de perfil
+    "*mmg.whatsapp.net/*",   # imágenes, stickers, audios y videos de los mensajes
+    "*media*.whatsapp.net/*",
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf"
+]
+
+# Mapear días y meses en español (sin acentos para coincidencia flexible)
+DIAS_SEMANA = {
+    0: "LUNES", 1: "MARTES", 2: "MIERCOLES", 3: "JUEVES",
+    4: "VIERNES", 5: "SABADO", 6: "DOMINGO"
+}
+
+MESES = {
+    1: "ENERO", 2: "FEBRERO", 3: "MARZO", 4: "ABRIL",
+    5: "MAYO", 6: "JUNIO", 7: "JULIO", 8: "AGOSTO",
+    9: "SEPTIEMBRE", 10: "OCTUBRE", 11: "NOVIEMBRE", 12: "DICIEMBRE"
+}
+
+# Mismo patrón que JS_EXTRAER_BURBUJAS, para el backend CDP que parsea en Python
+REGEX_LEER_MAS = re.compile(r'^(leer|lee|read|ver|show) m(á|a|o)(s|re)', re.IGNORECASE)
+
+# Clasificador de mensajes (filtrar_mensajes_del_dia): una sola pasada por línea, mismos criterios
+# que los bucles anteriores (subcadenas sobre el texto en mayúsculas)
+REGEX_EXCLUSION_COLORES = re.compile(
+    r'MODELOS Y COLORES|DISPONIBILIDAD|STOCK DISPONIBLE|COLORES DISPONIBLES', re.IGNORECASE
+)
+REGEX_ENCABEZADO_PRECIOS = re.compile(
+    r'BUEN D[IÍ]A TE DEJO LA LISTA DE HOY|LISTA DE PRECIOS|PRECIOS DEL D[IÍ]A|LISTA ACTUALIZADA', re.IGNORECASE
+)
+REGEX_MARCAS = re.compile(r'IPHONE|SAMSUNG|MOTOROLA|XIAOMI|INFINIX', re.IGNORECASE)
+# Encabezado con el que los proveedores anuncian la lista del día (es_mensaje_objetivo)
+REGEX_LISTA_DE_HOY = re.compile(r'LISTA DE HOY', re.IGNORECASE)
+
+def clasificar_mensaje(texto):
+    """Clasificar un mensaje leyéndolo una sola vez: lista de precios, de disponibilidad u otro.
+
+    Devuelve {"etiqueta", "puntaje", "rasgos"}. Las etiquetas son "lista_precios" (encabezado
+    de lista y "$ " en el texto), "lista_disponibilidad" (colores/stock, o más de 5 productos
+    sin ningún precio), "posible_lista" (menciona LISTA y es largo) y "otro". El puntaje es la
+    proporción de líneas con precio.
+
+    Los umbrales son los del filtro original: una línea cuenta como producto para la regla de
+    disponibilidad si tiene más de 10 caracteres y, para el control del encabezado, si tiene
+    más de 5 (rasgos "productos" y "lineas_marca").
+    """
+    rasgos = {"lineas": 0, "lineas_precio": 0, "lineas_marca": 0, "productos": 0, "encabezado": None,
+              "exclusion": None, "menciona_lista": False, "caracteres": len(texto)}
+    tiene_precios = "$ " in texto
+    for linea in texto.split('\n'):
+        linea = linea.strip()
+        if not linea:
+            continue
+        rasgos["lineas"] += 1
+        if len(linea) > 5:
+            if "$ " in linea:
+                rasgos["lineas_precio"] += 1
+            if REGEX_MARCAS.search(linea):
+                rasgos["lineas_marca"] += 1
+                if len(linea) > 10:
+                    rasgos["productos"] += 1
+        if not rasgos["encabezado"]:
+            m = REGEX_ENCABEZADO_PRECIOS.search(linea)
+            if m:
+                rasgos["encabezado"] = m.group(0).upper()
+        if not rasgos["exclusion"]:
+            m = REGEX_EXCLUSION_COLORES.search(linea)
+            if m:
+                rasgos["exclusion"] = m.group(0).upper()
+        if not rasgos["menciona_lista"] and "LISTA" in linea.upper():
+            rasgos["menciona_lista"] = True
+    
+    if rasgos["exclusion"] or (not tiene_precios and rasgos["productos"] > 5):
+        etiqueta = "lista_disponibilidad"
+    elif (rasgos["encabezado"] and tiene_precios and
+          not (rasgos["lineas_marca"] > 10 and rasgos["lineas_precio"] == 0)):
+        etiqueta = "lista_precios"
+    elif rasgos["menciona_lista"] and len(texto) > 500:
+        etiqueta = "posible_lista"
+    else:
+        etiqueta = "otro"
+    puntaje = round(rasgos["lineas_precio"] / rasgos["lineas"], 2) if rasgos["lineas"] else 0.0
+    return {"etiqueta": etiqueta, "puntaje": puntaje, "rasgos": rasgos}
+
+def parsear_snapshot_burbujas(snapshot):
+    """Convertir un DOMSnapshot.captureSnapshot en los mismos registros que JS_EXTRAER_BURBUJAS.
+
+    El snapshot trae el documento como tablas planas (parentIndex, nodeName, nodeValue,
+    attributes) que apuntan a una tabla de strings; los nodos vienen en orden de documento,
+    así que alcanza con un recorrido en preorden desde #main. Los campos de layout
+    (top, visible) quedan en None porque el snapshot se pide sin rectángulos.
+    """
+    cadenas = snapshot["strings"]
+    nodos = snapshot["documents"][0]["nodes"]
+    padres = nodos["parentIndex"]
+    tipos = nodos["nodeType"]
+    nombres = [cadenas[i] for i in nodos["nodeName"]]
+    valores = nodos["nodeValue"]
+    atributos = [
+        {cadenas[lista[k]]: cadenas[lista[k + 1]] for k in range(0, len(lista) - 1, 2)}
+        for lista in nodos["attributes"]
+    ]
+    hijos = [[] for _ in padres]
+    for i, padre in enumerate(padres):
+        if padre >= 0:
+            hijos[padre].append(i)
+
+    def descendientes(i):
+        pila = [i]
+        while pila:
+            actual = pila.pop()
+            yield actual
+            pila.extend(reversed(hijos[actual]))
+
+    def texto_de(i):
+        partes = []
+        for j in descendientes(i):
+            if tipos[j] == 3 and valores[j] >= 0:
+                partes.append(cadenas[valores[j]])
+            elif nombres[j] == "BR":
+                partes.append("\n")
+        return "".join(partes)
+
+    def clases(i):
+        return atributos[i].get("class", "").split()
+
+    raiz = next((i for i, a in enumerate(atributos) if a.get("id") == "main"), 0)
+    registros = []
+    pila = [raiz]
+    while pila:
+        i = pila.pop()
+        if "data-id" in atributos[i]:
+            # Burbuja: se lee completa y no se desciende (las burbujas anidadas no cuentan)
+            meta = cuerpo = boton = None
+            for j in descendientes(i):
+                if meta is None and "data-pre-plain-text" in atributos[j]:
+                    meta = j
+                if cuerpo is None and "selectable-text" in clases(j):
+                    cuerpo = j
+                if boton is None and ("read-more-button" in clases(j) or (
+                        atributos[j].get("role") == "button" and REGEX_LEER_MAS.match(texto_de(j).strip()))):
+                    boton = j
+            if cuerpo is None:
+                cuerpo = meta if meta is not None else i
+            registros.append({
+                "data_id": atributos[i]["data-id"],
+                "texto": texto_de(cuerpo).strip(),
+                "pre": atributos[meta]["data-pre-plain-text"] if meta is not None else None,
+                "truncado": boton is not None,
+                "indice": len(registros),
+                "top": None,
+                "visible": None
+            })
+            continue
+        pila.extend(reversed(hijos[i]))
+    return registros
+
+def parsear_pre_plain_text(valor, dia_primero=True):
+    """Obtener (timestamp, remitente) del atributo data-pre-plain-text de una burbuja.
+
+    `dia_primero` indica el orden de la fecha: True para "14/11/2025" (es-AR), False para
+    "11/14/2025" (en-US). Una fecha imposible en ese orden devuelve timestamp None.
+    """
+    if not valor:
+        return None, None
+    m = REGEX_PRE_PLAIN_TEXT.match(valor.strip())
+    if not m:
+        return None, None
+    hora, minuto, meridiano, primero, segundo, anio, remitente = m.groups()
+    dia, mes = (int(primero), int(segundo)) if dia_primero else (int(segundo), int(primero))
+    hora, anio = int(hora), int(anio)
+    if anio < 100:
+        anio += 2000
+    if meridiano:
+        hora = hora % 12 + (12 if meridiano.lower() == 'p' else 0)
+    try:
+        return datetime(anio, mes, dia, hora, int(minuto)), remitente.strip()
+    except ValueError:
+        return None, remitente.strip()
+
+def escribir_json(ruta, datos):
+    """Escribir un JSON de estado en un temporal y reemplazar el original con os.replace.
+
+    Quien lo lea al mismo tiempo (otro hilo u otro proceso) ve la versión anterior o la
+    nueva completas, nunca un archivo a medio escribir.
+    """
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+def formatear_fecha(fecha):
+    """Formato de fecha de los mensajes de GcGroup: "VIERNES 14 DE NOVIEMBRE" (sin acentos)"""
+    return f"{DIAS_SEMANA[fecha.weekday()]} {fecha.day:02d} DE {MESES[fecha.month]}"
+
+def interpretar_fecha(valor):
+    """Interpretar una fecha de la línea de comandos: AAAA-MM-DD, DD/MM/AAAA o solo el día del mes actual"""
+    valor = valor.strip()
+    for formato in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(valor, formato)
+        except ValueError:
+            pass
+    if valor.isdigit():
+        hoy = datetime.now()
+        return datetime(hoy.year, hoy.month, int(valor))
+    raise ValueError(f"fecha inválida: {valor!r} (usar AAAA-MM-DD, DD/MM/AAAA o el día del mes)")
+
+def ruta_perfil_chrome(perfil=None, user_data_dir=None):
+    """user-data-dir de Chrome del perfil (selenium_wsp[_<perfil>] o la ruta indicada), creado si no existe"""
+    # Determinar la ruta del perfil según el sistema operativo
+    nombre_perfil = f"selenium_wsp_{perfil}" if perfil else "selenium_wsp"
+    if user_data_dir:
+        user_data_dir = os.path.expanduser(user_data_dir)
+    elif platform.system() == 'Darwin':  # macOS
+        user_data_dir = os.path.expanduser(f"~/Library/Application Support/Google/Chrome/{nombre_perfil}")
+    elif platform.system() == 'Windows':
+        user_data_dir = f"C:/{nombre_perfil}"
+    else:  # Linux
+        user_data_dir = os.path.expanduser(f"~/.config/google-chrome/{nombre_perfil}")
+    
+    # Crear directorio si no existe
+    os.makedirs(user_data_dir, exist_ok=True)
+    return user_data_dir
+
+def contar_llamadas_webdriver(driver):
+    """Instrumentar el driver para contar cada comando enviado a chromedriver.
+
+    Todas las llamadas (incluidas las de WebElement: .text, .click(), .location...)
+    pasan por driver.execute, así que alcanza con envolver ese método. El total
+    queda en driver.llamadas_webdriver.
+    """
+    if getattr(driver, "llamadas_webdriver", None) is not None:
+        return driver
+    execute_original = driver.execute
+    driver.llamadas_webdriver = 0
+
+    def execute_contado(*args, **kwargs):
+        driver.llamadas_webdriver += 1
+        return execute_original(*args, **kwargs)
+
+    driver.execute = execute_contado
+    return driver
 
 class AutomatizadorWSP:
-    def __init__(self):
+    def __init__(self, fecha_objetivo=None, perfil=None, offline=False, forzar=False):
         """Inicializar el automatizador con configuración de Selenium"""
         self.driver = None
         self.mensaje_objetivo_encontrado = False
-        self.elemento_mensaje_objetivo = None
-        # Permitir al usuario indicar un día específico; si se deja vacío, usar hoy
-        self.fecha_hoy = self.solicitar_fecha_objetivo()
+        self.burbuja_objetivo = None
+        # Ignorar checkpoints y re-procesar aunque el mensaje no haya cambiado
+        self.forzar = forzar
+        self.proveedores_sin_cambios = set()
+        # Checkpoints de esta corrida; se escriben al cerrarla (el de GcGroup, solo si su procesamiento salió bien)
+        self.checkpoints_pendientes = {}
+        # Mensajes guardados en esta corrida por proveedor (se procesan sin releer el .txt)
+        self.textos_extraidos = {}
+        # Ejecutar procesar_gcgroup_refactor.py en un subproceso en lugar de en este proceso
+        self.procesamiento_aislado = False
+        # Guardar el DOM del chat abierto para reproducirlo sin sesión (replay_wsp.py)
+        self.capturar_dom = False
+        # Backend de extraer_burbujas: "js" (execute_script) o "cdp" (DOMSnapshot + parseo en Python)
+        self.backend_extraccion = "js"
+        # Sufijo del perfil de Chrome (None = perfil principal "selenium_wsp")
+        self.perfil = perfil
+        # Ruta explícita del user-data-dir (pool de perfiles); tiene prioridad sobre `perfil`
+        self.user_data_dir = None
+        # No descargar imágenes, multimedia ni fuentes (CDP Network.setBlockedURLs)
+        self.bloquear_recursos = False
+        # Orden de las fechas de data-pre-plain-text; con el idioma fijado en IDIOMA_WHATSAPP es día/mes
+        self.dia_primero = True
+        # Reintentos (y tope de tiempo total) para completar un mensaje que el DOM muestra truncado
+        self.reintentos_completitud = 2
+        self.presupuesto_completitud_s = 20
+        # Resultado del sondeo de arranque: "sesion", "requiere_qr" o None
+        self.estado_sesion = None
+        # Si WhatsApp pide el QR, esperar a que lo escaneen (solo tiene sentido en una terminal)
+        self.esperar_qr = sys.stdin is not None and sys.stdin.isatty()
+        # Tiempo hasta ver la lista de chats y memoria de Chrome del último arranque
+        self.metricas_navegador = {}
+        # Aciertos y fallos de la caché de títulos de chat en esta corrida (compartido con los workers)
+        self.estadisticas_cache_chats = {"aciertos": 0, "fallos": 0}
+        # Pool de perfiles: los procesos no escriben la caché de chats, devuelven los cambios al principal
+        self.diferir_cache_chats = False
+        self.cambios_cache_chats = []
+        # Ranking persistente de selectores (compartido con los workers del modo paralelo)
+        self.registro_selectores = RegistroSelectores()
+        # Duración y llamadas a WebDriver de cada fase; se guarda en output/trazas/ al terminar
+        self.traza = TrazaFases()
+        # Histórico SQLite de todo lo extraído (output/archivo_wsp.sqlite3)
+        self.archivo = ArchivoMensajes()
+        # Modo daemon: el hilo vigía y el procesamiento nunca usan el driver a la vez
+        self.lock_driver = threading.Lock()
+        # Modo sin internet: nunca consultar ni descargar chromedriver
+        self.offline = offline or os.environ.get("WSP_OFFLINE") == "1"
+        # Día objetivo (datetime, None para hoy). Los mensajes se eligen comparando su timestamp
+        # con fecha_objetivo; fecha_hoy ("VIERNES 14 DE NOVIEMBRE") queda solo para los mensajes de log
+        if fecha_objetivo is None:
+            self.fecha_hoy = self.obtener_fecha_hoy()
+            self.fecha_objetivo = datetime.now()
+        else:
+            self.fecha_hoy = formatear_fecha(fecha_objetivo)
+            self.fecha_objetivo = fecha_objetivo
+            print(f"🗓️ Fecha objetivo seleccionada: {self.fecha_hoy}")
         self.proveedores = {
             "Rodrigo Provee": {
                 "archivo_salida": "output/lista_rodrigo.txt",
@@ -41,104 +689,259 @@ class AutomatizadorWSP:
         }
         
     def obtener_fecha_hoy(self):
-        """Obtener la fecha de hoy en formato dinámico para buscar en WhatsApp"""
-        fecha_actual = datetime.now()
-        
-        # Mapear días y meses en español (sin acentos para coincidencia flexible)
-        dias_semana = {
-            0: "LUNES", 1: "MARTES", 2: "MIERCOLES", 3: "JUEVES", 
-            4: "VIERNES", 5: "SABADO", 6: "DOMINGO"
-        }
-        
-        meses = {
-            1: "ENERO", 2: "FEBRERO", 3: "MARZO", 4: "ABRIL",
-            5: "MAYO", 6: "JUNIO", 7: "JULIO", 8: "AGOSTO", 
-            9: "SEPTIEMBRE", 10: "OCTUBRE", 11: "NOVIEMBRE", 12: "DICIEMBRE"
-        }
-        
-        dia_semana = dias_semana[fecha_actual.weekday()]
-        dia = fecha_actual.day
-        mes = meses[fecha_actual.month]
-        # Formato: "VIERNES 14 DE NOVIEMBRE" (sin acentos para coincidencia flexible)
-        fecha_formateada = f"{dia_semana} {dia:02d} DE {mes}"
+        """Obtener la fecha de hoy en el formato de los encabezados de las listas (para los logs)"""
+        fecha_formateada = formatear_fecha(datetime.now())
         print(f"🗓️ Fecha objetivo: {fecha_formateada}")
         
         return fecha_formateada
 
-    def solicitar_fecha_objetivo(self):
-        """Pide al usuario un día (número) para buscar la lista de ese día. Si está vacío, usa hoy."""
+    def esperar(self, descripcion, condicion, timeout=10, intervalo=0.1):
+        """Esperar hasta que condicion(driver) sea verdadera o venza el plazo.
+
+        Devuelve el valor de la condición (None si venció el plazo) y registra cuánto
+        tardó realmente la espera.
+        """
+        inicio = time.time()
         try:
-            entrada = input("Ingrese el día del mes a extraer (ej: 6) o ENTER para hoy: ").strip()
-        except Exception:
-            entrada = ""
+            resultado = WebDriverWait(
+                self.driver, timeout, poll_frequency=intervalo,
+                ignored_exceptions=(StaleElementReferenceException, NoSuchElementException)
+            ).until(condicion)
+        except TimeoutException:
+            resultado = None
+        transcurrido = time.time() - inicio
+        estado = "✅" if resultado else "⌛"
+        print(f"   ⏱️ {estado} Espera '{descripcion}': {transcurrido:.2f}s (plazo {timeout}s)")
+        return resultado
 
-        if entrada == "":
-            return self.obtener_fecha_hoy()
+    def buscar_selector(self, objetivo, timeout=5):
+        """Buscar un objetivo lógico de SELECTORES probando primero el selector que ganó la última vez"""
+        elemento, _ = self.registro_selectores.buscar(self.driver, objetivo, SELECTORES[objetivo], timeout=timeout)
+        return elemento
 
-        # Intentar interpretar como número de día
+    def llamadas_webdriver(self):
+        """Comandos enviados a chromedriver por el driver actual (0 si todavía no hay navegador)"""
+        return getattr(self.driver, "llamadas_webdriver", 0) if self.driver else 0
+
+    def fase(self, nombre, **detalles):
+        """Registrar un bloque en la traza de la corrida: `with self.fase("guardar_archivo_txt"):`"""
+        return self.traza.fase(nombre, self.llamadas_webdriver, **detalles)
+
+    def esperar_dom_estable(self, descripcion, contenedor=None, quietud_ms=300, timeout=5):
+        """Esperar a que el contenedor deje de mutar (MutationObserver inyectado)"""
+        inicio = time.time()
         try:
-            dia_int = int(entrada)
-        except ValueError:
-            print("Valor inválido, se usará la fecha de hoy.")
-            return self.obtener_fecha_hoy()
+            resultado = self.driver.execute_async_script(
+                JS_ESPERAR_DOM_ESTABLE, contenedor, quietud_ms, timeout * 1000
+            )
+        except Exception as e:
+            print(f"   ⚠️ No se pudo observar el DOM ({descripcion}): {type(e).__name__}")
+            return False
+        transcurrido = time.time() - inicio
+        estable = bool(resultado and resultado.get("estable"))
+        estado = "✅" if estable else "⌛"
+        mutaciones = resultado.get("mutaciones", 0) if resultado else 0
+        print(f"   ⏱️ {estado} Espera '{descripcion}': {transcurrido:.2f}s ({mutaciones} mutaciones, plazo {timeout}s)")
+        return estable
 
-        # Usar el mismo mes y año actuales
-        hoy = datetime.now()
+    def extraer_burbujas(self):
+        """Leer todas las burbujas del chat abierto con un único execute_script.
+
+        Cada registro trae data_id, texto, remitente, timestamp (de data-pre-plain-text),
+        si está truncado ("Leer más" presente) y su posición.
+        Con backend_extraccion = "cdp" se usa extraer_burbujas_cdp (mismo formato) y, si el
+        driver no soporta CDP, se vuelve al script.
+        """
+        with self.fase("extraer_burbujas", backend=self.backend_extraccion):
+            registros = None
+            backend = "cdp" if self.backend_extraccion == "cdp" else "js"
+            if backend == "cdp":
+                registros = self.extraer_burbujas_cdp()
+                if registros is None:
+                    backend = "js"
+            if registros is None:
+                try:
+                    registros = self.driver.execute_script(JS_EXTRAER_BURBUJAS, None, None) or []
+                except Exception as e:
+                    print(f"   ⚠️ Error leyendo burbujas del chat: {e}")
+                    return []
+        for registro in registros:
+            registro["timestamp"], registro["remitente"] = parsear_pre_plain_text(registro.get("pre"), self.dia_primero)
+        truncados = sum(1 for r in registros if r["truncado"])
+        print(f"   📊 {len(registros)} burbujas leídas en una sola llamada ({truncados} truncadas, backend {backend})")
+        return registros
+
+    def extraer_burbujas_cdp(self):
+        """Leer las burbujas con un único DOMSnapshot.captureSnapshot y parsearlas en Python.
+
+        Devuelve None si el driver no expone CDP (no es Chromium) o la captura falla.
+        """
         try:
-            fecha_objetivo = datetime(hoy.year, hoy.month, dia_int)
+            snapshot = self.driver.execute_cdp_cmd("DOMSnapshot.captureSnapshot", {"computedStyles": []})
         except Exception as e:
-            print(f"Fecha inválida: {e}. Usando fecha de hoy.")
-            return self.obtener_fecha_hoy()
+            print(f"   ⚠️ DOMSnapshot no disponible ({type(e).__name__}), usando execute_script")
+            return None
+        return parsear_snapshot_burbujas(snapshot)
 
-        # Mapear días y meses (sin acentos)
-        dias_semana = {
-            0: "LUNES", 1: "MARTES", 2: "MIERCOLES", 3: "JUEVES", 
-            4: "VIERNES", 5: "SABADO", 6: "DOMINGO"
-        }
-        meses = {
-            1: "ENERO", 2: "FEBRERO", 3: "MARZO", 4: "ABRIL",
-            5: "MAYO", 6: "JUNIO", 7: "JULIO", 8: "AGOSTO", 
-            9: "SEPTIEMBRE", 10: "OCTUBRE", 11: "NOVIEMBRE", 12: "DICIEMBRE"
-        }
+    def leer_burbuja(self, data_id):
+        """Releer una única burbuja por data-id (mismo formato que extraer_burbujas)"""
+        try:
+            registros = self.driver.execute_script(JS_EXTRAER_BURBUJAS, data_id, None) or []
+        except Exception as e:
+            print(f"   ⚠️ Error releyendo burbuja {data_id}: {e}")
+            return None
+        if not registros:
+            return None
+        registro = registros[0]
+        registro["timestamp"], registro["remitente"] = parsear_pre_plain_text(registro.get("pre"), self.dia_primero)
+        return registro
 
-        dia_semana = dias_semana[fecha_objetivo.weekday()]
-        dia = fecha_objetivo.day
-        mes = meses[fecha_objetivo.month]
+    def recorrer_mensajes(self, hasta_fecha=None, max_mensajes=500, expandir_si=None, margen_px=200):
+        """Recorrer el chat abierto de abajo hacia arriba y devolver cada mensaje una sola vez.
 
-        fecha_formateada = f"{dia_semana} {dia:02d} DE {mes}"
-        print(f"🗓️ Fecha objetivo seleccionada: {fecha_formateada}")
-        return fecha_formateada
-    
-    def normalizar_texto(self, texto):
-        """Normalizar texto eliminando acentos para búsqueda flexible"""
-        # Diccionario de reemplazos de acentos
-        reemplazos = {
-            'Á': 'A', 'É': 'E', 'Í': 'I', 'Ó': 'O', 'Ú': 'U',
-            'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
-            'Ñ': 'N', 'ñ': 'n'
-        }
+        WhatsApp Web solo mantiene en el DOM los mensajes cercanos al viewport, así que se
+        sube de a un paso fijo (80% del alto del panel) y en cada paso se leen únicamente las
+        burbujas cercanas a la pantalla, deduplicadas por data-id. Los registros salen del más
+        nuevo al más viejo, con el mismo formato que extraer_burbujas, y no se retienen
+        WebElements. Se detiene al pasar `hasta_fecha`, al llegar a `max_mensajes` (None =
+        sin límite) o cuando WhatsApp no carga más historial. Si `expandir_si(registro)` es
+        verdadero y el mensaje está truncado, se expande mientras está en pantalla.
+        """
+        contenedor = self.buscar_selector("contenedor_chat")
+        if not contenedor:
+            print("   ⚠️ No se pudo encontrar el contenedor del chat")
+            return
+        self.driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight;", contenedor)
+        self.esperar_dom_estable("mensajes recientes renderizados", contenedor)
+        
+        vistos = set()
+        pasos_sin_novedades = 0
+        while True:
+            try:
+                registros = self.driver.execute_script(JS_EXTRAER_BURBUJAS, None, margen_px) or []
+            except Exception as e:
+                print(f"   ⚠️ Error leyendo burbujas visibles: {e}")
+                return
+            nuevos = [r for r in reversed(registros) if r["data_id"] not in vistos]
+            pasos_sin_novedades = 0 if nuevos else pasos_sin_novedades + 1
+            
+            for registro in nuevos:
+                vistos.add(registro["data_id"])
+                registro["timestamp"], registro["remitente"] = parsear_pre_plain_text(registro.get("pre"), self.dia_primero)
+                if hasta_fecha and registro["timestamp"] and registro["timestamp"].date() < hasta_fecha.date():
+                    print(f"   ✅ Recorrido hasta {registro['timestamp'].strftime('%d/%m/%Y')} ({len(vistos)} mensajes)")
+                    return
+                if registro["truncado"] and expandir_si and expandir_si(registro):
+                    self.expandir_leer_mas_en_pagina(data_ids=[registro["data_id"]], timeout=15)
+                    actualizado = self.leer_burbuja(registro["data_id"])
+                    if actualizado:
+                        registro = actualizado
+                yield registro
+                if max_mensajes and len(vistos) >= max_mensajes:
+                    print(f"   ✅ Presupuesto de {max_mensajes} mensajes alcanzado")
+                    return
+            
+            if pasos_sin_novedades >= 3:
+                print(f"   ⚠️ WhatsApp no cargó más historial ({len(vistos)} mensajes recorridos)")
+                return
+            # Subir un paso; al llegar arriba WhatsApp inserta los mensajes anteriores
+            self.driver.execute_script(
+                "arguments[0].scrollTop = Math.max(0, arguments[0].scrollTop - arguments[0].clientHeight * 0.8);",
+                contenedor
+            )
+            self.esperar_dom_estable("paso de scroll renderizado", contenedor, quietud_ms=250)
+
+    def releer_mensaje_objetivo(self, plazo=None):
+        """Volver a leer el mensaje objetivo por su data-id, aunque WhatsApp lo haya re-renderizado.
+
+        Una sola consulta por atributo (más la expansión si volvió a aparecer recortado).
+        Con `plazo` (segundos) la expansión es una única pasada que no puede excederlo.
+        Devuelve el texto, o None si la burbuja ya no está en el DOM.
+        """
+        burbuja = self.burbuja_objetivo
+        if not burbuja or not burbuja.get("data_id"):
+            return None
+        inicio = time.time()
+        actualizada = self.leer_burbuja(burbuja["data_id"])
+        if not actualizada:
+            print(f"   ⚠️ La burbuja {burbuja['data_id']} ya no está en el DOM")
+            return None
+        if actualizada["truncado"]:
+            if plazo is None:
+                self.expandir_leer_mas_en_pagina(data_ids=[burbuja["data_id"]], timeout=15)
+            else:
+                self.expandir_leer_mas_en_pagina(data_ids=[burbuja["data_id"]], timeout=plazo, max_pasadas=1)
+            actualizada = self.leer_burbuja(burbuja["data_id"]) or actualizada
+        # Un re-render puede traer el texto todavía recortado: nunca perder la versión expandida
+        if len(actualizada["texto"]) < len(burbuja.get("texto") or ""):
+            actualizada["texto"] = burbuja["texto"]
+        self.burbuja_objetivo = dict(burbuja, **actualizada)
+        print(f"   ♻️ Mensaje objetivo releído por data-id en {(time.time() - inicio) * 1000:.0f}ms")
+        return actualizada["texto"] or None
+
+    def obtener_version_chrome(self):
+        """Obtener la versión mayor de Chrome instalada (None si no se puede detectar)"""
+        if platform.system() == 'Windows':
+            comandos = [['reg', 'query', r'HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon', '/v', 'version']]
+        elif platform.system() == 'Darwin':
+            comandos = [['/Applications/Google Chrome.app/Contents/MacOS/Google Chrome', '--version']]
+        else:
+            comandos = [[binario, '--version'] for binario in
+                        ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser')]
         
-        texto_normalizado = texto
-        for acento, sin_acento in reemplazos.items():
-            texto_normalizado = texto_normalizado.replace(acento, sin_acento)
+        for comando in comandos:
+            try:
+                salida = subprocess.run(comando, capture_output=True, text=True, timeout=10).stdout
+            except Exception:
+                continue
+            m = re.search(r'(\d+)\.\d+\.\d+', salida)
+            if m:
+                return m.group(1)
+        return None
+
+    def resolver_chromedriver(self):
+        """Obtener la ruta de chromedriver desde la caché local, consultando la red solo si cambió Chrome"""
+        version = self.obtener_version_chrome()
+        try:
+            with open(RUTA_CACHE_CHROMEDRIVER, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        
+        ruta = cache.get(version) if version else None
+        if ruta and os.path.isfile(ruta):
+            print(f"   📦 chromedriver en caché para Chrome {version}: {ruta}")
+            return ruta
         
-        return texto_normalizado
+        if self.offline:
+            # Sin red: usar cualquier driver cacheado o el que esté en el PATH
+            candidatos = [r for r in cache.values() if os.path.isfile(r)]
+            ruta = candidatos[-1] if candidatos else shutil.which('chromedriver')
+            if ruta:
+                print(f"   📴 Modo offline: usando {ruta} (Chrome {version or 'desconocido'})")
+            else:
+                print("   ❌ Modo offline sin chromedriver en caché ni en el PATH")
+            return ruta
         
+        print(f"   🌐 Chrome {version or 'desconocido'} sin driver en caché, resolviendo con webdriver-manager...")
+        from webdriver_manager.chrome import ChromeDriverManager
+        ruta = ChromeDriverManager().install()
+        if version:
+            cache[version] = ruta
+            try:
+                os.makedirs(os.path.dirname(RUTA_CACHE_CHROMEDRIVER), exist_ok=True)
+                with open(RUTA_CACHE_CHROMEDRIVER, 'w', encoding='utf-8') as f:
+                    json.dump(cache, f, indent=2)
+            except OSError as e:
+                print(f"   ⚠️ No se pudo guardar la caché de chromedriver: {e}")
+        return ruta
+
     def configurar_navegador(self):
         """Configurar y abrir navegador con sesión persistente"""
         print("🔧 Configurando navegador...")
+        inicio = time.time()
         
-        # Determinar la ruta del perfil según el sistema operativo
-        import platform
-        if platform.system() == 'Darwin':  # macOS
-            user_data_dir = os.path.expanduser("~/Library/Application Support/Google/Chrome/selenium_wsp")
-        elif platform.system() == 'Windows':
-            user_data_dir = "C:/selenium_wsp"
-        else:  # Linux
-            user_data_dir = os.path.expanduser("~/.config/google-chrome/selenium_wsp")
-        
-        # Crear directorio si no existe
-        os.makedirs(user_data_dir, exist_ok=True)
+        user_data_dir = ruta_perfil_chrome(self.perfil, self.user_data_dir)
         print(f"📁 Usando perfil: {user_data_dir}")
         
         options = webdriver.ChromeOptions()
@@ -148,57 +951,159 @@ class AutomatizadorWSP:
         options.add_argument("--no-first-run")
         options.add_argument("--no-default-browser-check")
         options.add_argument("--disable-blink-features=AutomationControlled")
+        options.add_argument(f"--lang={IDIOMA_WHATSAPP}")
         options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
         options.add_experimental_option('useAutomationExtension', False)
         options.add_experimental_option("prefs", {
             "credentials_enable_service": False,
-            "profile.password_manager_enabled": False
+            "profile.password_manager_enabled": False,
+            "intl.accept_languages": f"{IDIOMA_WHATSAPP},es"
         })
         
         try:
-            self.driver = webdriver.Chrome(
-                service=Service(ChromeDriverManager().install()), 
+            ruta_driver = self.resolver_chromedriver()
+            tiempo_driver = time.time() - inicio
+            self.driver = contar_llamadas_webdriver(webdriver.Chrome(
+                service=Service(ruta_driver) if ruta_driver else Service(),
                 options=options
-            )
+            ))
+            print(f"⏱️ Arranque en frío del navegador: {time.time() - inicio:.2f}s "
+                  f"(resolución de chromedriver: {tiempo_driver:.2f}s)")
             
+            self.driver.set_script_timeout(60)
+            if self.bloquear_recursos:
+                self.bloquear_recursos_pesados()
+
             print("✅ Abriendo WhatsApp Web...")
+            inicio_carga = time.time()
             self.driver.get("https://web.whatsapp.com")
-            print("⏳ Esperando 8 segundos para cargar WhatsApp...")
-            time.sleep(30)
+            if not self.sondear_sesion():
+                return False
+            self.metricas_navegador = {
+                "recursos_bloqueados": self.bloquear_recursos,
+                "pagina_lista_s": round(time.time() - inicio_carga, 2),
+                "rss_mb": self.medir_memoria_chrome()
+            }
+            memoria = self.metricas_navegador["rss_mb"]
+            print(f"⏱️ WhatsApp Web listo en {self.metricas_navegador['pagina_lista_s']:.2f}s"
+                  + (f" | Chrome RSS: {memoria:.0f} MB" if memoria is not None else ""))
             return True
             
         except Exception as e:
             print(f"❌ Error configurando navegador: {e}")
             return False
     
+    def sondear_sesion(self, timeout=60):
+        """Esperar a que aparezca la lista de chats o el QR, lo que ocurra primero.
+
+        Deja el resultado en self.estado_sesion. Con el QR en pantalla falla enseguida,
+        salvo que esperar_qr esté activo (terminal interactiva): ahí espera el escaneo.
+        """
+        print("⏳ Esperando la lista de chats o el código QR...")
+        estado = self.esperar(
+            "sesión de WhatsApp",
+            lambda d: d.execute_script(JS_ESTADO_SESION, SELECTORES["campo_busqueda"], SELECTORES_QR),
+            timeout=timeout, intervalo=0.2
+        )
+        if estado == "qr":
+            self.estado_sesion = "requiere_qr"
+            print("📱 La sesión de este perfil no está vinculada: hay que escanear el código QR")
+            if not self.esperar_qr:
+                return False
+            print("⏳ Esperando el escaneo del QR (hasta 120s)...")
+            if not self.buscar_selector("campo_busqueda", timeout=120):
+                print("❌ No se escaneó el QR a tiempo")
+                return False
+        elif estado != "sesion":
+            print("❌ WhatsApp Web no terminó de cargar la lista de chats")
+            return False
+        else:
+            # Registrar el selector del campo de búsqueda que coincidió (ya está en pantalla)
+            self.buscar_selector("campo_busqueda", timeout=2)
+        self.estado_sesion = "sesion"
+        return True
+
+    def bloquear_recursos_pesados(self):
+        """Bloquear imágenes, multimedia y fuentes con CDP antes de abrir WhatsApp Web"""
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": URLS_BLOQUEADAS})
+            print(f"🚫 Bloqueando {len(URLS_BLOQUEADAS)} patrones de URL (imágenes, multimedia y fuentes)")
+        except Exception as e:
+            print(f"⚠️ No se pudieron bloquear recursos por CDP: {e}")
+
+    def medir_memoria_chrome(self):
+        """RSS total (MB) de chromedriver y todos los procesos de Chrome que lanzó; None sin psutil"""
+        try:
+            import psutil
+        except ImportError:
+            return None
+        try:
+            raiz = psutil.Process(self.driver.service.process.pid)
+            procesos = [raiz] + raiz.children(recursive=True)
+            total = 0
+            for proceso in procesos:
+                try:
+                    total += proceso.memory_info().rss
+                except psutil.Error:
+                    continue
+            return total / (1024 * 1024)
+        except Exception:
+            return None
+
+    def comparar_bloqueo_recursos(self):
+        """Medir el arranque con y sin --bloquear-recursos sobre el mismo perfil y mostrar la diferencia"""
+        print("📏 COMPARANDO ARRANQUE CON Y SIN BLOQUEO DE RECURSOS")
+        print("="*70)
+        mediciones = []
+        bloqueo_original = self.bloquear_recursos
+        try:
+            for bloquear in (False, True):
+                self.bloquear_recursos = bloquear
+                if not self.configurar_navegador():
+                    return False
+                # Dejar que la lista de chats termine de renderizar (fotos, previews) antes de medir memoria
+                panel = self.driver.find_elements(By.ID, "pane-side")
+                self.esperar_dom_estable("lista de chats renderizada", panel[0] if panel else None,
+                                         quietud_ms=2000, timeout=20)
+                self.metricas_navegador["rss_mb"] = self.medir_memoria_chrome()
+                mediciones.append(dict(self.metricas_navegador))
+                self.driver.quit()
+                self.driver = None
+        finally:
+            self.bloquear_recursos = bloqueo_original
+            if self.driver:
+                self.driver.quit()
+                self.driver = None
+        
+        print(f"\n   {'modo':<22}{'página lista':>14}{'Chrome RSS':>14}")
+        for medicion in mediciones:
+            modo = "con bloqueo" if medicion["recursos_bloqueados"] else "sin bloqueo"
+            memoria = f"{medicion['rss_mb']:.0f} MB" if medicion["rss_mb"] is not None else "(sin psutil)"
+            print(f"   {modo:<22}{medicion['pagina_lista_s']:>13.2f}s{memoria:>14}")
+        return True
+
     def buscar_mensaje_objetivo_hoy(self):
-        """Buscar específicamente el mensaje con la fecha de hoy - MÉTODO OPTIMIZADO"""
+        """Buscar la lista de precios del día objetivo entre las burbujas del chat abierto.
+
+        El día y el remitente de cada mensaje salen de su data-pre-plain-text, así que elegir
+        el mensaje es una comparación de fechas en Python: no depende de cómo escriba la fecha
+        el proveedor ni de las etiquetas "Hoy"/"Ayer". Gana la lista más reciente del día.
+        Si no está entre las burbujas renderizadas al abrir el chat, se sube con recorrer_mensajes.
+        """
         try:
-            print(f"🎯 Buscando mensaje: 'BUEN DIA TE DEJO LA LISTA DE HOY {self.fecha_hoy}'")
+            dia = self.fecha_objetivo.date()
+            print(f"🎯 Buscando la lista de precios del {dia.strftime('%d/%m/%Y')} ({self.fecha_hoy})")
             
             # PASO 1: Ir al final del chat (mensajes más recientes) SIN scroll excesivo
             print("📍 Posicionándose al final del chat...")
             try:
-                chat_container = None
-                selectores_chat = [
-                    '//div[@data-testid="chat-history"]',
-                    '//div[@data-testid="conversation-panel-messages"]', 
-                    '//div[contains(@class, "copyable-area")]'
-                ]
-                
-                for selector in selectores_chat:
-                    try:
-                        chat_container = WebDriverWait(self.driver, 5).until(
-                            EC.presence_of_element_located((By.XPATH, selector))
-                        )
-                        break
-                    except:
-                        continue
+                chat_container = self.buscar_selector("contenedor_chat")
                 
                 if chat_container:
                     # IR DIRECTAMENTE al final (mensajes más recientes)
                     self.driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight;", chat_container)
-                    time.sleep(2)
+                    self.esperar_dom_estable("mensajes recientes renderizados", chat_container)
                     print("   ✅ Posicionado al final del chat")
                 else:
                     print("   ⚠️ No se pudo encontrar contenedor del chat")
@@ -206,524 +1111,131 @@ class AutomatizadorWSP:
             except Exception as e:
                 print(f"   ⚠️ Error posicionándose al final: {e}")
             
-            # PASO 2: Buscar el elemento específico con la clase exacta que mencionaste
-            print("🔍 Buscando elemento con clase específica...")
-            selector_objetivo = '//div[@class="x9f619 x1hx0egp x1yrsyyn xizg8k xu9hqtb xwib8y2"]'
-            
-            elementos_encontrados = self.driver.find_elements(By.XPATH, selector_objetivo)
-            print(f"   📊 Encontrados {len(elementos_encontrados)} elementos con clase específica")
-            
-            # PASO 2.1: EXPANDIR MENSAJES LARGOS ANTES DE EXTRAER
+            # PASO 2: EXPANDIR MENSAJES LARGOS ANTES DE EXTRAER
             print("📖 Expandiendo mensajes largos antes de extraer...")
             self.expandir_mensaje_especifico()
             
-            # Re-buscar elementos después de la expansión
-            elementos_encontrados = self.driver.find_elements(By.XPATH, selector_objetivo)
-            print(f"   📊 Después de expandir: {len(elementos_encontrados)} elementos")
-            
-            # PASO 3: Buscar dentro de esos elementos el mensaje con la fecha de hoy
-            for i, elemento in enumerate(elementos_encontrados):
-                try:
-                    texto_elemento = elemento.text.strip()
-                    if not texto_elemento:
-                        continue
-                        
-                    # Convertir a mayúsculas y normalizar (sin acentos) para comparación
-                    texto_upper = texto_elemento.upper()
-                    texto_normalizado = self.normalizar_texto(texto_upper)
-                    fecha_normalizada = self.normalizar_texto(self.fecha_hoy)
-                    
-                    # EXCLUSIÓN: Ignorar completamente listas de colores
-                    if "LISTA DE MODELOS Y COLORES" in texto_normalizado:
-                        print(f"   ❌ Elemento {i+1} IGNORADO: Contiene 'LISTA DE MODELOS Y COLORES'")
-                        continue
-                    
-                    if "📱👇🏻📱" in texto_elemento:
-                        print(f"   ❌ Elemento {i+1} IGNORADO: Contiene emojis de lista de colores")
-                        continue
-                    
-                    # BÚSQUEDA: Mensaje con fecha de hoy (sin acentos para mayor flexibilidad)
-                    if (("BUEN DIA TE DEJO LA LISTA DE HOY" in texto_normalizado or 
-                         "LISTA DE HOY" in texto_normalizado) and 
-                        fecha_normalizada in texto_normalizado):
-                        
-                        print(f"   🎯 ¡MENSAJE OBJETIVO ENCONTRADO! (Elemento {i+1})")
-                        print(f"   📝 Longitud: {len(texto_elemento)} caracteres")
-                        print(f"   📝 Inicio: '{texto_elemento[:150]}...'")
-                        
-                        # VERIFICACIÓN DE COMPLETITUD
-                        if texto_elemento.endswith("…") or texto_elemento.endswith("...") or "Leer más" in texto_elemento:
-                            print(f"   ⚠️ MENSAJE PARECE INCOMPLETO - Aplicando expansión agresiva...")
-                            
-                            # ESTRATEGIA AGRESIVA: Expandir TODO en el área del mensaje
-                            try:
-                                self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", elemento)
-                                time.sleep(2)
-                                
-                                # Buscar TODOS los posibles botones "Leer más" en un área amplia
-                                selectores_expansion = [
-                                    './/span[contains(text(), "Leer más")]',
-                                    './/span[contains(text(), "Lee más")]',
-                                    './/span[contains(text(), "…")]',
-                                    './/span[contains(text(), "...")]',
-                                    './/*[contains(text(), "Read more")]',
-                                    './/div[@role="button"]',
-                                    './/*[contains(@class, "read-more")]'
-                                ]
-                                
-                                # También buscar en el contenedor padre y hermanos
-                                areas_busqueda = [elemento]
-                                try:
-                                    contenedor_padre = elemento.find_element(By.XPATH, '..')
-                                    areas_busqueda.append(contenedor_padre)
-                                    
-                                    # Y en el contenedor abuelo
-                                    contenedor_abuelo = contenedor_padre.find_element(By.XPATH, '..')
-                                    areas_busqueda.append(contenedor_abuelo)
-                                except:
-                                    pass
-                                
-                                total_botones_expandidos = 0
-                                
-                                for area in areas_busqueda:
-                                    for selector in selectores_expansion:
-                                        try:
-                                            botones = area.find_elements(By.XPATH, selector)
-                                            if botones:
-                                                print(f"     🎯 Encontrados {len(botones)} botones con '{selector}' en área")
-                                                
-                                                for j, boton in enumerate(botones):
-                                                    try:
-                                                        if boton.is_displayed() and boton.is_enabled():
-                                                            # Hacer scroll al botón específico
-                                                            self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", boton)
-                                                            time.sleep(1)
-                                                            
-                                                            # Múltiples métodos de clic
-                                                            click_exitoso = False
-                                                            
-                                                            # Método 1: JavaScript click
-                                                            try:
-                                                                self.driver.execute_script("arguments[0].click();", boton)
-                                                                click_exitoso = True
-                                                                print(f"       ✅ Botón {j+1} expandido con JS")
-                                                                time.sleep(3)  # Tiempo extendido para expansión
-                                                            except:
-                                                                pass
-                                                            
-                                                            # Método 2: Click directo
-                                                            if not click_exitoso:
-                                                                try:
-                                                                    boton.click()
-                                                                    click_exitoso = True
-                                                                    print(f"       ✅ Botón {j+1} expandido con click directo")
-                                                                    time.sleep(3)
-                                                                except:
-                                                                    pass
-                                                            
-                                                            # Método 3: Doble clic
-                                                            if not click_exitoso:
-                                                                try:
-                                                                    self.driver.execute_script("arguments[0].dispatchEvent(new MouseEvent('click', {bubbles: true}));", boton)
-                                                                    click_exitoso = True
-                                                                    print(f"       ✅ Botón {j+1} expandido con evento")
-                                                                    time.sleep(3)
-                                                                except:
-                                                                    pass
-                                                            
-                                                            if click_exitoso:
-                                                                total_botones_expandidos += 1
-                                                            
-                                                    except Exception as btn_error:
-                                                        continue
-                                        except:
-                                            continue
-                                
-                                print(f"   🎉 Total de botones expandidos en expansión agresiva: {total_botones_expandidos}")
-                                
-                                # Dar tiempo para que TODO se cargue
-                                time.sleep(5)
-                                
-                                # Re-extraer el texto después de la expansión agresiva
-                                tiempo_espera = 0
-                                max_espera = 15  # 15 segundos máximo
-                                
-                                while tiempo_espera < max_espera:
-                                    try:
-                                        texto_actualizado = elemento.text.strip()
-                                        if len(texto_actualizado) > len(texto_elemento) and not texto_actualizado.endswith("…"):
-                                            print(f"   🎉 ¡EXPANSIÓN EXITOSA! Texto expandido de {len(texto_elemento)} a {len(texto_actualizado)} caracteres")
-                                            texto_elemento = texto_actualizado
-                                            break
-                                        else:
-                                            time.sleep(1)
-                                            tiempo_espera += 1
-                                    except:
-                                        time.sleep(1)
-                                        tiempo_espera += 1
-                                
-                                if tiempo_espera >= max_espera:
-                                    print(f"   ⚠️ Tiempo de espera agotado, usando texto actual de {len(texto_elemento)} caracteres")
-                                    
-                            except Exception as e:
-                                print(f"   ⚠️ Error en expansión agresiva: {e}")
-                        
-                        # Guardar referencia al elemento
-                        self.mensaje_objetivo_encontrado = True
-                        self.elemento_mensaje_objetivo = elemento
-                        
-                        return texto_elemento
-                        
-                except Exception as e:
-                    print(f"   ⚠️ Error procesando elemento {i+1}: {e}")
-                    continue
-            
-            # PASO 4: Si no se encontró con la clase específica, búsqueda alternativa MÁS FLEXIBLE
-            print("🔄 Búsqueda alternativa: buscando mensaje más reciente del día...")
-            
-            # Buscar simplemente por "LISTA DE HOY" y el número del día (usar día seleccionado)
-            m = re.search(r"\b(\d{1,2})\b", self.fecha_hoy)
-            dia_numero = m.group(1).lstrip('0') if m else str(datetime.now().day)
-            selector_alternativo = f'//div[contains(text(), "LISTA DE HOY") and contains(text(), "{dia_numero}")]'
-            elementos_alternativos = self.driver.find_elements(By.XPATH, selector_alternativo)
-            
-            if elementos_alternativos:
-                print(f"   ✅ Encontrado en búsqueda alternativa!")
-                elemento_alternativo = elementos_alternativos[-1]  # Tomar el más reciente (último)
-                
-                # Buscar el contenedor padre que tenga todo el mensaje
-                contenedor_padre = elemento_alternativo
-                for nivel in range(10):  # Máximo 10 niveles hacia arriba
-                    try:
-                        contenedor_padre = contenedor_padre.find_element(By.XPATH, '..')
-                        texto_contenedor = contenedor_padre.text.strip()
-                        
-                        # Si el contenedor tiene suficiente contenido, usarlo
-                        if len(texto_contenedor) > 500:  # Mínimo para una lista
-                            print(f"   📦 Usando contenedor padre (nivel {nivel+1})")
-                            print(f"   📝 Longitud: {len(texto_contenedor)} caracteres")
-                            
-                            self.mensaje_objetivo_encontrado = True
-                            self.elemento_mensaje_objetivo = contenedor_padre
-                            
-                            return texto_contenedor
-                            
-                    except Exception as e:
+            # PASO 3: Leer todas las burbujas en una sola llamada y quedarse con las del día
+            burbujas = self.extraer_burbujas()
+            del_dia = [b for b in burbujas if b["timestamp"] and b["timestamp"].date() == dia]
+            print(f"   📅 {len(del_dia)} de {len(burbujas)} mensajes son del {dia.strftime('%d/%m/%Y')}")
+            candidatas = [b for b in del_dia if self.es_mensaje_objetivo(b, dia, b["indice"] + 1)]
+            
+            # PASO 4: Si ninguna calificó, expandir los mensajes del día que siguen recortados y reevaluar
+            recortadas = [b["data_id"] for b in del_dia if b["truncado"]]
+            if not candidatas and recortadas:
+                print(f"🔍 Expandiendo {len(recortadas)} mensaje(s) del día todavía recortados...")
+                self.expandir_leer_mas_en_pagina(data_ids=recortadas, timeout=15, max_pasadas=5)
+                for data_id in recortadas:
+                    actualizada = self.leer_burbuja(data_id)
+                    if actualizada and self.es_mensaje_objetivo(actualizada, dia, actualizada["indice"] + 1):
+                        candidatas.append(actualizada)
+            
+            # PASO 5: La lista puede estar fuera de la primera ventana (varios mensajes en el día o
+            # un --fecha pasado): subir con recorrer_mensajes hasta el día objetivo. Los registros
+            # salen del más nuevo al más viejo, así que el primero que califica es el último del día
+            if not candidatas:
+                print("🔎 Sin candidatos en la ventana inicial: recorriendo el chat hacia arriba...")
+                for registro in self.recorrer_mensajes(
+                    hasta_fecha=self.fecha_objetivo,
+                    expandir_si=lambda r: self.es_mensaje_objetivo(r, dia)
+                ):
+                    if self.es_mensaje_objetivo(registro, dia):
+                        candidatas.append(registro)
                         break
             
-            # PASO 5: BÚSQUEDA EXHAUSTIVA - Si aún no se encontró completo
-            print("🔍 BÚSQUEDA EXHAUSTIVA: Buscando versión completa en todo el chat...")
+            if not candidatas:
+                print("   ❌ No se encontró el mensaje objetivo")
+                return None
             
-            # Expandir TODOS los mensajes del día de hoy para asegurar completitud
-            self.expandir_todos_los_mensajes_hoy()
+            burbuja = candidatas[-1]  # La más reciente del día
+            texto_elemento = burbuja["texto"]
+            print(f"   🎯 ¡MENSAJE OBJETIVO ENCONTRADO! {burbuja['remitente']} a las {burbuja['timestamp'].strftime('%H:%M')}")
+            print(f"   📝 Longitud: {len(texto_elemento)} caracteres")
+            print(f"   📝 Inicio: '{texto_elemento[:150]}...'")
             
-            # Re-buscar después de expansión exhaustiva
-            elementos_exhaustivos = self.driver.find_elements(By.XPATH, selector_objetivo)
+            # VERIFICACIÓN DE COMPLETITUD
+            if burbuja["truncado"]:
+                print(f"   ⚠️ MENSAJE PARECE INCOMPLETO - Aplicando expansión agresiva...")
+                
+                # Expandir solo esta burbuja y releerla cuando haya crecido
+                resumen = self.expandir_leer_mas_en_pagina(data_ids=[burbuja["data_id"]], timeout=15)
+                actualizada = self.leer_burbuja(burbuja["data_id"])
+                
+                if resumen["expandidos"] and actualizada and len(actualizada["texto"]) > len(texto_elemento):
+                    print(f"   🎉 ¡EXPANSIÓN EXITOSA! Texto expandido de {len(texto_elemento)} a {len(actualizada['texto'])} caracteres")
+                    texto_elemento = actualizada["texto"]
+                else:
+                    print(f"   ⚠️ No se pudo expandir, usando texto actual de {len(texto_elemento)} caracteres")
             
-            for i, elemento in enumerate(elementos_exhaustivos):
-                try:
-                    texto_elemento = elemento.text.strip()
-                    if not texto_elemento:
-                        continue
-                        
-                    texto_upper = texto_elemento.upper()
-                    texto_normalizado = self.normalizar_texto(texto_upper)
-                    fecha_normalizada = self.normalizar_texto(self.fecha_hoy)
-                    
-                    # Solo mensajes con la fecha de hoy y que contengan precios
-                    if (fecha_normalizada in texto_normalizado and 
-                        ("BUEN DIA TE DEJO LA LISTA DE HOY" in texto_normalizado or 
-                         "LISTA DE HOY" in texto_normalizado) and
-                        "$ " in texto_elemento):
-                        
-                        # Verificar si es más completo que versiones anteriores
-                        if not texto_elemento.endswith("…") and not texto_elemento.endswith("..."):
-                            print(f"   🎉 ¡VERSIÓN COMPLETA ENCONTRADA! (Búsqueda exhaustiva)")
-                            print(f"   📝 Longitud: {len(texto_elemento)} caracteres")
-                            
-                            self.mensaje_objetivo_encontrado = True
-                            self.elemento_mensaje_objetivo = elemento
-                            
-                            return texto_elemento
-                        else:
-                            print(f"   ⚠️ Versión encontrada pero aún incompleta: {len(texto_elemento)} chars")
-                            
-                except Exception as e:
-                    continue
+            # Guardar referencia al elemento
+            self.mensaje_objetivo_encontrado = True
+            self.burbuja_objetivo = dict(burbuja, texto=texto_elemento)
             
-            print("   ❌ No se encontró el mensaje objetivo")
-            return None
+            return texto_elemento
             
         except Exception as e:
             print(f"❌ Error en búsqueda del mensaje objetivo: {e}")
             return None
     
-    def expandir_mensaje_especifico(self):
-        """Expandir específicamente mensajes que contengan la fecha de hoy - ACTUALIZADO CON HTML REAL"""
-        try:
-            print("🎯 Buscando mensajes específicos para expandir con selectores actualizados...")
-            
-            # Buscar botones "Lee más" usando la información HTML real proporcionada
-            botones_encontrados = []
-            
-            # Método 1: Buscar botones cerca de elementos que contengan la fecha
-            try:
-                elementos_con_fecha = self.driver.find_elements(By.XPATH, 
-                    f'//*[contains(text(), "{self.fecha_hoy}")]')
-                
-                for elemento in elementos_con_fecha:
-                    # Buscar botones "Lee más" cerca de este elemento usando los selectores reales
-                    try:
-                        # Selector específico basado en el HTML real proporcionado
-                        botones_cerca = elemento.find_elements(By.XPATH, 
-                            './/following-sibling::*//div[@role="button" and contains(@class, "read-more-button")]')
-                        botones_encontrados.extend(botones_cerca)
-                        
-                        # También buscar texto "Leer más" en divs con role="button"
-                        botones_texto = elemento.find_elements(By.XPATH, 
-                            './/following-sibling::*//div[@role="button" and contains(text(), "Leer más")]')
-                        botones_encontrados.extend(botones_texto)
-                        
-                        # Buscar en contenedor padre con clases específicas
-                        contenedor = elemento.find_element(By.XPATH, '..')
-                        botones_padre = contenedor.find_elements(By.XPATH, 
-                            './/div[@role="button" and contains(@class, "read-more-button")]')
-                        botones_encontrados.extend(botones_padre)
-                    except:
-                        continue
-                        
-            except Exception as e:
-                print(f"   ⚠️ Error buscando elementos con fecha: {e}")
-            
-            # Método 2: Buscar todos los botones "Lee más" visibles con selectores actualizados
-            try:
-                selectores_boton = [
-                    # Selector principal basado en HTML real
-                    '//div[@role="button" and contains(@class, "read-more-button")]',
-                    '//div[@role="button" and contains(text(), "Leer más")]',
-                    '//div[@role="button" and contains(@class, "xuxw1ft") and contains(text(), "Leer más")]',
-                    # Selectores de fallback
-                    '//span[contains(text(), "Lee más")]',
-                    '//span[contains(text(), "…")]',
-                    '//*[contains(text(), "Read more")]',
-                    '//*[@role="button" and contains(text(), "más")]'
-                ]
-                
-                for selector in selectores_boton:
-                    botones = self.driver.find_elements(By.XPATH, selector)
-                    if botones:
-                        print(f"   📍 Selector '{selector[:60]}...' encontró {len(botones)} botones")
-                    botones_encontrados.extend(botones)
-                    
-            except Exception as e:
-                print(f"   ⚠️ Error buscando botones Lee más: {e}")
-            
-            # Eliminar duplicados por posición
-            botones_unicos = []
-            posiciones_vistas = set()
-            
-            for boton in botones_encontrados:
-                try:
-                    location = boton.location
-                    pos_key = f"{location['x']},{location['y']}"
-                    if pos_key not in posiciones_vistas:
-                        posiciones_vistas.add(pos_key)
-                        botones_unicos.append(boton)
-                except:
-                    botones_unicos.append(boton)
-            
-            print(f"   📊 Encontrados {len(botones_unicos)} botones únicos para expandir")
-            
-            # Expandir cada botón con métodos optimizados para la estructura HTML real
-            expandidos = 0
-            for i, boton in enumerate(botones_unicos):
-                try:
-                    if boton.is_displayed() and boton.is_enabled():
-                        # Hacer scroll hacia el botón
-                        self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", boton)
-                        time.sleep(1)
-                        
-                        # Intentar hacer clic con múltiples métodos optimizados para el HTML real
-                        click_exitoso = self.hacer_click_optimizado_leer_mas(boton, i + 1)
-                        if click_exitoso:
-                            expandidos += 1
-                            print(f"   ✅ Botón {i+1} expandido exitosamente")
-                            time.sleep(2)  # Tiempo para que se expanda
-                        else:
-                            print(f"   ❌ No se pudo expandir botón {i+1}")
-                        
-                except Exception as e:
-                    print(f"   ⚠️ Error procesando botón {i+1}: {e}")
-                    continue
-            
-            print(f"✅ Total de botones expandidos: {expandidos}")
-            
-        except Exception as e:
-            print(f"⚠️ Error expandiendo mensajes específicos: {e}")
+    def es_mensaje_objetivo(self, burbuja, dia=None, numero=None):
+        """¿Es la lista de precios del día? El día sale del timestamp de la burbuja, no del texto.
 
-    def hacer_click_optimizado_leer_mas(self, boton, numero_boton):
-        """Método optimizado para hacer clic en botones 'Leer más' con la estructura HTML real"""
-        try:
-            # Obtener información del botón para debugging
-            try:
-                tag_name = boton.tag_name
-                classes = boton.get_attribute("class")
-                role = boton.get_attribute("role")
-                texto = boton.text
-                print(f"     🎯 Botón {numero_boton}: <{tag_name}> role='{role}' texto='{texto[:20]}'")
-            except:
-                print(f"     🎯 Botón {numero_boton}: Información no accesible")
-            
-            # Método 1: Clic JavaScript directo (más compatible con elementos complejos)
-            try:
-                self.driver.execute_script("arguments[0].click();", boton)
-                print(f"       ✅ Método 1 (JS click): Exitoso")
-                return True
-            except Exception as e:
-                print(f"       ⚠️ Método 1 falló: {type(e).__name__}")
-            
-            # Método 2: Trigger de evento click manualmente
-            try:
-                self.driver.execute_script("""
-                    var evt = new MouseEvent('click', {
-                        view: window,
-                        bubbles: true,
-                        cancelable: true,
-                        clientX: arguments[0].getBoundingClientRect().left + arguments[0].offsetWidth/2,
-                        clientY: arguments[0].getBoundingClientRect().top + arguments[0].offsetHeight/2
-                    });
-                    arguments[0].dispatchEvent(evt);
-                """, boton)
-                print(f"       ✅ Método 2 (Event dispatch): Exitoso")
-                return True
-            except Exception as e:
-                print(f"       ⚠️ Método 2 falló: {type(e).__name__}")
-            
-            # Método 3: Clic directo con WebDriver
-            try:
-                boton.click()
-                print(f"       ✅ Método 3 (Direct click): Exitoso")
-                return True
-            except Exception as e:
-                print(f"       ⚠️ Método 3 falló: {type(e).__name__}")
-            
-            # Método 4: Clic usando ActionChains (para casos complejos)
-            try:
-                from selenium.webdriver.common.action_chains import ActionChains
-                actions = ActionChains(self.driver)
-                actions.move_to_element(boton).click().perform()
-                print(f"       ✅ Método 4 (ActionChains): Exitoso")
-                return True
-            except Exception as e:
-                print(f"       ⚠️ Método 4 falló: {type(e).__name__}")
-            
-            # Método 5: Focus + Enter (simular teclado)
-            try:
-                self.driver.execute_script("arguments[0].focus();", boton)
-                boton.send_keys('\ue007')  # Enter key
-                print(f"       ✅ Método 5 (Focus + Enter): Exitoso")
-                return True
-            except Exception as e:
-                print(f"       ⚠️ Método 5 falló: {type(e).__name__}")
-            
-            print(f"       ❌ Todos los métodos fallaron para botón {numero_boton}")
+        Vale una lista de precios según clasificar_mensaje o, como antes, un encabezado
+        "LISTA DE HOY" (con la burbuja recortada los precios pueden estar detrás del "Leer más").
+        Regla compartida con el backfill y el motor de Playwright.
+        """
+        dia = dia or self.fecha_objetivo.date()
+        if not burbuja["texto"] or not burbuja.get("timestamp") or burbuja["timestamp"].date() != dia:
             return False
-            
-        except Exception as e:
-            print(f"       ❌ Error general en click optimizado: {e}")
+        clasificacion = clasificar_mensaje(burbuja["texto"])
+        if clasificacion["etiqueta"] == "lista_disponibilidad":
+            if numero:
+                print(f"   ❌ Elemento {numero} IGNORADO: es una lista de disponibilidad ({clasificacion['rasgos']['exclusion']})")
             return False
-    
-    def expandir_todos_los_mensajes_hoy(self):
-        """Expansión exhaustiva de TODOS los mensajes que puedan contener la lista de hoy - ACTUALIZADO CON HTML REAL"""
-        try:
-            print("🚀 EXPANSIÓN EXHAUSTIVA: Expandiendo todos los mensajes posibles con selectores actualizados...")
-            
-            # Buscar TODOS los botones "Lee más" visibles en la página usando selectores basados en HTML real
-            selectores_exhaustivos = [
-                # Selectores principales basados en HTML real proporcionado
-                '//div[@role="button" and contains(@class, "read-more-button")]',
-                '//div[@role="button" and contains(text(), "Leer más")]',
-                '//div[@role="button" and contains(@class, "xuxw1ft") and contains(text(), "Leer más")]',
-                '//div[@role="button" and contains(@class, "x1ypdohk") and contains(text(), "Leer más")]',
-                # Selectores de fallback tradicionales
-                '//span[contains(text(), "Lee más")]',
-                '//span[contains(text(), "…")]', 
-                '//span[contains(text(), "...")]',
-                '//*[contains(text(), "Read more")]',
-                '//div[@role="button" and contains(., "más")]',
-                '//*[contains(@class, "read-more")]'
-            ]
-            
-            todos_los_botones = []
-            
-            for selector in selectores_exhaustivos:
-                try:
-                    botones = self.driver.find_elements(By.XPATH, selector)
-                    if botones:
-                        print(f"   📊 Selector '{selector[:50]}...' encontró {len(botones)} botones")
-                    todos_los_botones.extend(botones)
-                except:
-                    continue
-            
-            # Eliminar duplicados por posición
-            botones_unicos = []
-            posiciones_vistas = set()
-            
-            for boton in todos_los_botones:
-                try:
-                    if boton.is_displayed():
-                        location = boton.location
-                        pos_key = f"{location['x']},{location['y']}"
-                        if pos_key not in posiciones_vistas:
-                            posiciones_vistas.add(pos_key)
-                            botones_unicos.append(boton)
-                except:
-                    continue
-            
-            print(f"   🎯 Total de botones únicos encontrados: {len(botones_unicos)}")
-            
-            # Expandir todos los botones encontrados con método optimizado
-            expandidos_exitosos = 0
-            
-            for i, boton in enumerate(botones_unicos):
-                print(f"   🔄 Procesando botón {i+1}/{len(botones_unicos)}...")
-                
+        return clasificacion["etiqueta"] == "lista_precios" or bool(REGEX_LISTA_DE_HOY.search(burbuja["texto"]))
+
+    def expandir_leer_mas_en_pagina(self, data_ids=None, contiene=None, timeout=10, max_pasadas=3):
+        """Expandir todos los "Leer más" con una rutina inyectada en la página.
+
+        Cada pasada es una sola llamada: el navegador hace los clics y espera con un
+        MutationObserver a que los mensajes crezcan. Se repite solo si WhatsApp muestra
+        un nuevo "Leer más" (mensajes muy largos). Devuelve un resumen acumulado.
+        """
+        with self.fase("expandir_leer_mas", solo_ids=bool(data_ids)):
+            resumen = {"encontrados": 0, "expandidos": 0, "fallidos": 0, "ms": 0, "data_ids": []}
+            for pasada in range(max_pasadas):
                 try:
-                    # Verificar que el botón sigue siendo válido
-                    if not (boton.is_displayed() and boton.is_enabled()):
-                        print(f"     ⚠️ Botón {i+1} ya no es válido")
-                        continue
-                        
-                    # Scroll hacia el botón
-                    self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", boton)
-                    time.sleep(0.5)
-                    
-                    # Usar el método optimizado de clic
-                    click_exitoso = self.hacer_click_optimizado_leer_mas(boton, i + 1)
-                    if click_exitoso:
-                        expandidos_exitosos += 1
-                        print(f"     ✅ Botón {i+1} expandido exitosamente")
-                        time.sleep(1.5)  # Tiempo para que se expanda
-                    else:
-                        print(f"     ❌ No se pudo expandir botón {i+1}")
-                        
+                    resultado = self.driver.execute_async_script(
+                        JS_EXPANDIR_LEER_MAS, data_ids, contiene, timeout * 1000
+                    )
                 except Exception as e:
-                    print(f"     ❌ Error procesando botón {i+1}: {e}")
-                    continue
-                
-                # Cada 3 expansiones, pausa para que WhatsApp procese
-                if (i + 1) % 3 == 0:
-                    print(f"   ⏳ Pausa de procesamiento ({i+1}/{len(botones_unicos)})")
-                    time.sleep(2)
-            
-            print(f"🎉 EXPANSIÓN EXHAUSTIVA COMPLETADA")
-            print(f"   ✅ Botones expandidos exitosamente: {expandidos_exitosos}/{len(botones_unicos)}")
-            
-            # Dar tiempo para que todos los mensajes se carguen completamente
-            time.sleep(3)
-            
-        except Exception as e:
-            print(f"❌ Error en expansión exhaustiva: {e}")
+                    print(f"   ⚠️ Error en expansión inyectada: {type(e).__name__}")
+                    break
+                if not resultado or not resultado["encontrados"]:
+                    break
+                for clave in ("encontrados", "expandidos", "fallidos", "ms"):
+                    resumen[clave] += resultado[clave]
+                resumen["data_ids"].extend(resultado["data_ids"])
+                print(f"   📖 Pasada {pasada + 1}: {resultado['expandidos']}/{resultado['encontrados']} expandidos "
+                      f"({resultado['fallidos']} fallidos) en {resultado['ms']} ms")
+                if not resultado["expandidos"]:
+                    break
+            print(f"✅ Expansión: {resumen['expandidos']} expandidos, {resumen['fallidos']} fallidos, "
+                  f"{resumen['ms']} ms en el navegador")
+        return resumen
+
+    def expandir_mensaje_especifico(self):
+        """Expandir los mensajes truncados del chat antes de extraer"""
+        print("🎯 Expandiendo mensajes truncados en una sola pasada del navegador...")
+        return self.expandir_leer_mas_en_pagina()
+    
+    def expandir_todos_los_mensajes_hoy(self):
+        """Expansión exhaustiva de TODOS los mensajes que puedan contener la lista de hoy"""
+        print("🚀 EXPANSIÓN EXHAUSTIVA: Expandiendo todos los mensajes posibles...")
+        resumen = self.expandir_leer_mas_en_pagina(timeout=15, max_pasadas=5)
+        print(f"🎉 EXPANSIÓN EXHAUSTIVA COMPLETADA")
+        return resumen
     
     def ir_al_final_del_chat(self):
         """Ir directamente al final del chat para obtener SOLO los mensajes más recientes (hoy)"""
@@ -731,22 +1243,7 @@ class AutomatizadorWSP:
             print("📍 Yendo al final del chat para buscar SOLO mensajes de hoy...")
             
             # Encontrar el contenedor del chat
-            chat_container = None
-            selectores = [
-                '//div[@data-testid="chat-history"]',
-                '//div[@data-testid="conversation-panel-messages"]', 
-                '//div[contains(@class, "copyable-area")]'
-            ]
-            
-            for selector in selectores:
-                try:
-                    chat_container = WebDriverWait(self.driver, 5).until(
-                        EC.presence_of_element_located((By.XPATH, selector))
-                    )
-                    print(f"   ✅ Contenedor encontrado con: {selector}")
-                    break
-                except:
-                    continue
+            chat_container = self.buscar_selector("contenedor_chat")
             
             if not chat_container:
                 print("   ⚠️ No se pudo encontrar el contenedor del chat")
@@ -754,13 +1251,13 @@ class AutomatizadorWSP:
             
             # Ir al final del chat (mensajes más recientes)
             self.driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight;", chat_container)
-            time.sleep(2)
+            self.esperar_dom_estable("mensajes recientes renderizados", chat_container)
             print("   ✅ Posicionado al final del chat (mensajes más recientes)")
             
             # NO hacer scroll hacia arriba - mantener solo en la zona más reciente
             # Solo un pequeño ajuste para asegurar que los mensajes estén completamente visibles
             self.driver.execute_script("arguments[0].scrollTop = arguments[0].scrollTop - 100;", chat_container)
-            time.sleep(1)
+            self.esperar_dom_estable("ajuste de scroll", chat_container, quietud_ms=150)
             
             print("   🎯 Enfocado en mensajes más recientes (zona de hoy)")
             return True
@@ -771,377 +1268,45 @@ class AutomatizadorWSP:
     
     def expandir_mensajes_largos(self):
         """Expandir mensajes que tengan 'Lee más...' con múltiples pasadas"""
-        try:
-            print("📖 Expandiendo mensajes largos...")
-            total_expandidos = 0
-            max_intentos = 5  # Máximo 5 pasadas para evitar bucle infinito
-            
-            for intento in range(max_intentos):
-                # RE-BUSCAR botones "Lee más..." en CADA iteración para evitar stale elements
-                print(f"   🔄 Pasada {intento + 1}: Re-buscando botones 'Lee más'...")
-                
-                # Buscar botones "Lee más..." con múltiples selectores - RENOVADOS EN CADA PASADA
-                def buscar_botones_leer_mas():
-                    botones_encontrados = []
-                    
-                    # Selector 1: Elementos span con texto
-                    try:
-                        botones_span = self.driver.find_elements(By.XPATH, 
-                            '//span[contains(text(), "Lee más") or contains(text(), "Read more") or '
-                            'contains(text(), "Show more") or contains(text(), "Ver más") or '
-                            'contains(text(), "más...") or contains(text(), "...")]'
-                        )
-                        botones_encontrados.extend(botones_span)
-                    except:
-                        pass
-                    
-                    # Selector 2: Div con clase read-more-button
-                    try:
-                        botones_div_class = self.driver.find_elements(By.XPATH, 
-                            '//div[contains(@class, "read-more-button")]'
-                        )
-                        botones_encontrados.extend(botones_div_class)
-                    except:
-                        pass
-                    
-                    # Selector 3: Cualquier elemento con texto "Leer más"
-                    try:
-                        botones_general = self.driver.find_elements(By.XPATH, 
-                            '//*[contains(text(), "Leer más") or contains(text(), "Read more")]'
-                        )
-                        botones_encontrados.extend(botones_general)
-                    except:
-                        pass
-                    
-                    # Selector 4: Elementos clickeables con role="button"
-                    try:
-                        botones_role = self.driver.find_elements(By.XPATH, 
-                            '//div[@role="button" and contains(text(), "más")]'
-                        )
-                        botones_encontrados.extend(botones_role)
-                    except:
-                        pass
-                    
-                    # Selector 5: Elementos que contengan "…" (pueden ser botones cortados)
-                    try:
-                        botones_puntos = self.driver.find_elements(By.XPATH, 
-                            '//*[contains(text(), "…") and not(ancestor::*[contains(@class, "message")])]'
-                        )
-                        botones_encontrados.extend(botones_puntos)
-                    except:
-                        pass
-                    
-                    # Eliminar duplicados basándose en posición
-                    botones_unicos = []
-                    posiciones_vistas = set()
-                    
-                    for boton in botones_encontrados:
-                        try:
-                            # Usar la posición del elemento como identificador único
-                            location = boton.location
-                            pos_key = f"{location['x']},{location['y']}"
-                            if pos_key not in posiciones_vistas:
-                                posiciones_vistas.add(pos_key)
-                                botones_unicos.append(boton)
-                        except:
-                            # Si no se puede obtener la posición, incluirlo de todos modos
-                            botones_unicos.append(boton)
-                    
-                    return botones_unicos
-                
-                botones_leer_mas = buscar_botones_leer_mas()
-                
-                if not botones_leer_mas:
-                    if intento == 0:
-                        print("   ℹ️ No se encontraron mensajes para expandir")
-                        # Debug: buscar elementos similares
-                        try:
-                            debug_elements = self.driver.find_elements(By.XPATH, '//*[contains(text(), "más")]')
-                            if debug_elements:
-                                print(f"   🔍 Debug: Encontrados {len(debug_elements)} elementos con 'más':")
-                                for elem in debug_elements[:3]:  # Mostrar solo los primeros 3
-                                    try:
-                                        print(f"     - <{elem.tag_name}> '{elem.text[:50]}...'")
-                                    except:
-                                        print(f"     - <elemento no accesible>")
-                        except:
-                            pass
-                    break
-                
-                print(f"   � Encontrados {len(botones_leer_mas)} botones en esta pasada")
-                
-                expandidos_en_pasada = 0
-                # Procesar cada botón INMEDIATAMENTE después de encontrarlo
-                for i in range(len(botones_leer_mas)):
-                    try:
-                        # RE-BUSCAR el botón específico para evitar stale reference
-                        botones_actuales = buscar_botones_leer_mas()
-                        
-                        if i >= len(botones_actuales):
-                            print(f"     ⚠️ Botón {i+1} ya no existe (posiblemente expandido)")
-                            continue
-                            
-                        boton = botones_actuales[i]
-                        
-                        # Verificar si el botón aún es válido y visible
-                        try:
-                            if not (boton.is_displayed() and boton.is_enabled()):
-                                continue
-                        except:
-                            print(f"     ⚠️ Botón {i+1} se volvió inválido")
-                            continue
-                        
-                        # Obtener información del botón ANTES de hacer clic
-                        try:
-                            texto_boton = boton.text[:30] if boton.text else "Sin texto"
-                            tag_name = boton.tag_name
-                        except:
-                            texto_boton = "No accesible"
-                            tag_name = "unknown"
-                        
-                        print(f"     🎯 Clickeando botón {i+1}: <{tag_name}> '{texto_boton}'...")
-                        
-                        # Hacer scroll hacia el botón
-                        try:
-                            self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", boton)
-                            time.sleep(1)
-                        except:
-                            print(f"     ⚠️ No se pudo hacer scroll al botón {i+1}")
-                            continue
-                        
-                        # Intentar hacer clic con manejo robusto de errores
-                        click_exitoso = False
-                        
-                        # Método 1: JavaScript click
-                        try:
-                            self.driver.execute_script("arguments[0].click();", boton)
-                            click_exitoso = True
-                            print(f"       ✅ Click exitoso con JavaScript")
-                            time.sleep(2)
-                        except Exception as e:
-                            print(f"       ⚠️ Fallo JavaScript click: {type(e).__name__}")
-                        
-                        # Método 2: Click directo si el primero falló
-                        if not click_exitoso:
-                            try:
-                                boton.click()
-                                click_exitoso = True
-                                print(f"       ✅ Click exitoso directo")
-                                time.sleep(2)
-                            except Exception as e:
-                                print(f"       ⚠️ Fallo click directo: {type(e).__name__}")
-                        
-                        if click_exitoso:
-                            expandidos_en_pasada += 1
-                            print(f"       🎉 Mensaje expandido exitosamente!")
-                            
-                            # Pausa para que se cargue completamente
-                            time.sleep(1.5)
-                            
-                            # Cada 2 expansiones exitosas, pausa más larga
-                            if expandidos_en_pasada % 2 == 0:
-                                print(f"       ⏳ Pausa de procesamiento...")
-                                time.sleep(3)
-                        else:
-                            print(f"       ❌ No se pudo hacer click en botón {i+1}")
-                        
-                    except Exception as e:
-                        print(f"       ⚠️ Error procesando botón {i+1}: {type(e).__name__}")
-                        continue
-                
-                total_expandidos += expandidos_en_pasada
-                print(f"   ✅ Expandidos en esta pasada: {expandidos_en_pasada}")
-                
-                # Si no se expandió ninguno en esta pasada, salir del bucle
-                if expandidos_en_pasada == 0:
-                    break
-                
-                # Pausa entre pasadas para que WhatsApp procese los cambios
-                time.sleep(3)  # Aumentado tiempo entre pasadas
-            
-            print(f"✅ Total de mensajes expandidos: {total_expandidos}")
-            
-            # VERIFICACIÓN ADICIONAL: Buscar mensajes que aún puedan estar cortados
-            if total_expandidos > 0:
-                print("   🔍 Verificación final: Buscando mensajes que puedan estar incompletos...")
-                try:
-                    # Buscar elementos que terminen con "..." o estén cortados
-                    elementos_cortados = self.driver.find_elements(By.XPATH, 
-                        '//*[contains(text(), "...") or contains(text(), "…")]'
-                    )
-                    if elementos_cortados:
-                        print(f"   ⚠️ Detectados {len(elementos_cortados)} elementos que pueden estar cortados")
-                        
-                        # Intentar hacer scroll y volver a expandir
-                        for elem in elementos_cortados[:3]:  # Solo los primeros 3
-                            try:
-                                self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", elem)
-                                time.sleep(1)
-                                texto = elem.text
-                                if "…" in texto or "..." in texto:
-                                    print(f"   🔄 Reintentando expansión para: '{texto[:50]}...'")
-                                    # Buscar botones "Lee más" cerca de este elemento
-                                    botones_cerca = elem.find_elements(By.XPATH, './/following-sibling::*//span[contains(text(), "Lee más")]')
-                                    if botones_cerca:
-                                        botones_cerca[0].click()
-                                        time.sleep(2)
-                            except:
-                                continue
-                                
-                except Exception as e:
-                    print(f"   ⚠️ Error en verificación final: {e}")
-            
-            # Hacer scroll final para asegurar que todos los mensajes estén cargados
-            if total_expandidos > 0:
-                print("   📜 Haciendo scroll final para cargar contenido expandido...")
-                try:
-                    # Buscar el contenedor del chat con múltiples selectores
-                    chat_container = None
-                    selectores_chat = [
-                        '//div[@data-testid="chat-history"]',  # Corregido el typo
-                        '//div[@data-testid="conversation-panel-messages"]', 
-                        '//div[contains(@class, "copyable-area")]'
-                    ]
-                    
-                    for selector in selectores_chat:
-                        try:
-                            chat_container = self.driver.find_element(By.XPATH, selector)
-                            break
-                        except:
-                            continue
-                    
-                    if chat_container:
-                        self.driver.execute_script("arguments[0].scrollTop = 0;", chat_container)
-                        time.sleep(2)  # Más tiempo para cargar
-                        # Scroll hacia abajo para cargar todo el contenido
-                        self.driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight;", chat_container)
-                        time.sleep(1)
-                    else:
-                        print("   ⚠️ No se pudo encontrar contenedor para scroll final")
-                        
-                except Exception as scroll_error:
-                    print(f"   ⚠️ Error en scroll final: {scroll_error}")
-                    print("   ℹ️ Continuando sin scroll final...")
-        
-        except Exception as e:
-            print(f"⚠️ Error al expandir mensajes: {e}")
-            print("   ℹ️ Continuando con la extracción...")
+        print("📖 Expandiendo mensajes largos...")
+        return self.expandir_leer_mas_en_pagina(max_pasadas=5)
     
     def filtrar_mensajes_del_dia(self, textos, filtro_inicio):
-        """Filtrar mensajes que contengan palabras clave de listas de precios (NO colores)"""
+        """Filtrar mensajes que contengan palabras clave de listas de precios (NO colores).
+
+        Cada mensaje se clasifica en una sola pasada (clasificar_mensaje). Si ninguno es una
+        lista de precios, se toma como último recurso el primer mensaje largo que menciona LISTA
+        (cualquiera sea su etiqueta, igual que el filtro de emergencia original).
+        """
         mensajes_filtrados = []
+        posible_lista = None
         
         print(f"🔍 Filtrando {len(textos)} mensajes buscando SOLO listas de precios...")
         
         for i, texto in enumerate(textos):
-            texto_upper = texto.upper()
-            
-            # EXCLUIR específicamente listas de colores/modelos
-            criterios_exclusion = [
-                "LISTA DE MODELOS Y COLORES",
-                "MODELOS Y COLORES DEL DÍA",
-                "MODELOS Y COLORES",
-                "DISPONIBILIDAD",
-                "STOCK DISPONIBLE", 
-                "COLORES DISPONIBLES"
-            ]
-            
-            # Verificar si el mensaje debe ser excluido
-            excluir_mensaje = False
-            for criterio_exclusion in criterios_exclusion:
-                if criterio_exclusion in texto_upper:
-                    excluir_mensaje = True
-                    print(f"   ❌ Mensaje {i+1} EXCLUIDO: Contiene '{criterio_exclusion}' (es lista de colores)")
-                    break
-            
-            # Verificación adicional: Si contiene productos sin precios ($), excluir
-            if not excluir_mensaje and "$ " not in texto:
-                # Contar líneas de productos vs líneas con precios
-                lineas = texto.split('\n')
-                lineas_con_productos = 0
-                lineas_con_precios = 0
-                
-                for linea in lineas:
-                    linea_clean = linea.strip()
-                    if len(linea_clean) > 10:  # Líneas significativas
-                        if any(marca in linea_clean.upper() for marca in ['IPHONE', 'SAMSUNG', 'MOTOROLA', 'XIAOMI', 'INFINIX']):
-                            lineas_con_productos += 1
-                        if '$ ' in linea_clean:
-                            lineas_con_precios += 1
-                
-                # Si hay muchos productos pero ningún precio, es lista de colores
-                if lineas_con_productos > 5 and lineas_con_precios == 0:
-                    excluir_mensaje = True
-                    print(f"   ❌ Mensaje {i+1} EXCLUIDO: {lineas_con_productos} productos sin precios (lista de disponibilidad)")
-            
-            
-            if excluir_mensaje:
-                continue
-            
-            # Buscar SOLO mensajes con precios reales
-            criterios_busqueda = [
-                # Mensajes tradicionales con precios (deben contener $)
-                "BUEN DIA TE DEJO LA LISTA DE HOY",
-                "BUEN DÍA TE DEJO LA LISTA DE HOY", 
-                # Mensajes de precios específicos
-                "LISTA DE PRECIOS",
-                "PRECIOS DEL DIA", 
-                "PRECIOS DEL DÍA",
-                "LISTA ACTUALIZADA"
-            ]
-            
-            encontrado = False
-            tipo_mensaje = ""
-            
-            for criterio in criterios_busqueda:
-                if criterio in texto_upper:
-                    # VERIFICACIÓN OBLIGATORIA: DEBE contener precios ($) para CUALQUIER criterio
-                    if "$ " not in texto:
-                        print(f"   ⚠️ Mensaje {i+1} contiene '{criterio}' pero NO tiene precios ($) - RECHAZADO")
-                        continue  # Saltar si no tiene precios
-                    
-                    # Verificación adicional: Contar ratio precios vs productos
-                    lineas = texto.split('\n')
-                    productos_encontrados = 0
-                    precios_encontrados = 0
-                    
-                    for linea in lineas:
-                        linea_clean = linea.strip()
-                        if len(linea_clean) > 5:
-                            if any(marca in linea_clean.upper() for marca in ['IPHONE', 'SAMSUNG', 'MOTOROLA', 'XIAOMI', 'INFINIX']):
-                                productos_encontrados += 1
-                            if '$ ' in linea_clean:
-                                precios_encontrados += 1
-                    
-                    # Debe haber una proporción razonable de precios por productos
-                    if productos_encontrados > 10 and precios_encontrados == 0:
-                        print(f"   ⚠️ Mensaje {i+1} tiene {productos_encontrados} productos pero 0 precios - RECHAZADO (es lista de disponibilidad)")
-                        continue
-                    
-                    encontrado = True
-                    tipo_mensaje = criterio
-                    print(f"   ✅ Mensaje VÁLIDO: {productos_encontrados} productos, {precios_encontrados} precios")
-                    break
-            
-            if encontrado:
-                print(f"   ✅ Mensaje {i+1} aceptado: Contiene '{tipo_mensaje}' CON PRECIOS")
+            clasificacion = clasificar_mensaje(texto)
+            etiqueta, rasgos = clasificacion["etiqueta"], clasificacion["rasgos"]
+            resumen_rasgos = (f"{rasgos['lineas']} líneas, {rasgos['lineas_precio']} con precio, "
+                              f"{rasgos['lineas_marca']} con marca, encabezado={rasgos['encabezado']!r}, "
+                              f"exclusión={rasgos['exclusion']!r}")
+            
+            if etiqueta == "lista_precios":
+                print(f"   ✅ Mensaje {i+1} aceptado: {etiqueta} (puntaje {clasificacion['puntaje']}) - {resumen_rasgos}")
                 print(f"   📝 Longitud: {len(texto)} caracteres")
                 print(f"   📝 Inicio: '{texto[:100]}...'")
                 mensajes_filtrados.append(texto)
             else:
-                print(f"   ❌ Mensaje {i+1} rechazado: No contiene criterios de búsqueda")
+                print(f"   ❌ Mensaje {i+1} rechazado: {etiqueta} (puntaje {clasificacion['puntaje']}) - {resumen_rasgos}")
                 print(f"   📝 Vista previa: '{texto[:100]}...'")
+                if posible_lista is None and rasgos["menciona_lista"] and len(texto) > 500:
+                    posible_lista = (i, texto)
                 
-        if not mensajes_filtrados:
-            print("   ⚠️ NINGÚN mensaje pasó el filtro. Aplicando filtro de emergencia...")
-            # Filtro de emergencia: aceptar cualquier mensaje que contenga "LISTA" y sea largo
-            for i, texto in enumerate(textos):
-                texto_upper = texto.upper()
-                if ("LISTA" in texto_upper and len(texto) > 500):  # Mensajes largos con "LISTA"
-                    print(f"   🆘 FILTRO DE EMERGENCIA: Aceptando mensaje {i+1} (contiene LISTA y es largo)")
-                    print(f"   📝 Longitud: {len(texto)} caracteres")
-                    mensajes_filtrados.append(texto)
-                    break  # Solo tomar el primero que encuentre
+        if not mensajes_filtrados and posible_lista:
+            # Último recurso: un mensaje largo que menciona LISTA (sin encabezado reconocido)
+            i, texto = posible_lista
+            print(f"   🆘 NINGÚN mensaje pasó el filtro: se acepta el mensaje {i+1} (contiene LISTA y es largo)")
+            print(f"   📝 Longitud: {len(texto)} caracteres")
+            mensajes_filtrados.append(texto)
                 
         return mensajes_filtrados
     
@@ -1164,20 +1329,141 @@ class AutomatizadorWSP:
             print(f"   ❌ Error verificando mensaje de hoy: {e}")
             return False
 
+    def leer_cache_chats(self):
+        """Leer la caché de títulos de chat de todos los proveedores"""
+        try:
+            with open(RUTA_CACHE_CHATS, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def actualizar_cache_chat(self, config, titulo=None, acierto=None):
+        """Guardar el título que abrió el chat y/o sumar un acierto o fallo de la caché"""
+        cambio = {
+            "nombre_corto": config["nombre_corto"],
+            "titulo": titulo,
+            "acierto": acierto,
+            "momento": datetime.now().isoformat(timespec='seconds')
+        }
+        with _lock_cache_chats:
+            if acierto is not None:
+                self.estadisticas_cache_chats["aciertos" if acierto else "fallos"] += 1
+            if self.diferir_cache_chats:
+                self.cambios_cache_chats.append(cambio)
+                return
+        self.aplicar_cambios_cache_chats([cambio])
+
+    def aplicar_cambios_cache_chats(self, cambios):
+        """Volcar cambios de actualizar_cache_chat al archivo (los del pool llegan desde otros procesos)"""
+        if not cambios:
+            return
+        with _lock_cache_chats:
+            cache = self.leer_cache_chats()
+            for cambio in cambios:
+                entrada = cache.setdefault(cambio["nombre_corto"], {"titulo": None, "aciertos": 0, "fallos": 0})
+                if cambio["titulo"]:
+                    entrada["titulo"] = cambio["titulo"]
+                    entrada["ultimo_uso"] = cambio["momento"]
+                if cambio["acierto"] is not None:
+                    entrada["aciertos" if cambio["acierto"] else "fallos"] += 1
+            try:
+                escribir_json(RUTA_CACHE_CHATS, cache)
+            except OSError as e:
+                print(f"⚠️ No se pudo guardar la caché de chats: {e}")
+
+    def reportar_cache_chats(self):
+        """Mostrar aciertos y fallos de la caché de chats (corrida actual e histórico)"""
+        aciertos = self.estadisticas_cache_chats["aciertos"]
+        intentos = aciertos + self.estadisticas_cache_chats["fallos"]
+        if intentos:
+            print(f"🗂️ Caché de chats: {aciertos}/{intentos} aciertos en esta corrida ({aciertos / intentos:.0%})")
+        for nombre_corto, entrada in self.leer_cache_chats().items():
+            total = entrada["aciertos"] + entrada["fallos"]
+            if total:
+                print(f"   • {nombre_corto}: '{entrada['titulo']}' {entrada['aciertos']}/{total} aciertos históricos")
+
+    def abrir_chat(self, chat, titulo_chat):
+        """Hacer clic en un chat y esperar a que su encabezado aparezca en el panel"""
+        chat.click()
+        abierto = self.esperar(
+            "conversación abierta",
+            lambda d: d.execute_script(
+                "var h = document.querySelector('#main header');"
+                "return !!h && h.innerText.indexOf(arguments[0]) !== -1;", titulo_chat
+            ),
+            timeout=10
+        )
+        print(f"✅ Chat abierto: {titulo_chat}")
+        return bool(abierto)
+
+    def escribir_busqueda(self, search_box, texto):
+        """Vaciar el campo de búsqueda de chats y escribir un texto nuevo"""
+        # Hacer clic nuevamente y limpiar completamente
+        self.driver.execute_script("arguments[0].click();", search_box)
+        
+        # Limpiar usando Ctrl+A y Delete
+        search_box.send_keys('\ue009' + 'a')  # Ctrl+A (seleccionar todo)
+        search_box.send_keys('\ue017')  # Delete
+        self.esperar("campo de búsqueda vacío", lambda d: not search_box.text.strip(), timeout=2)
+        
+        search_box.send_keys(texto)
+
+    def abrir_chat_cacheado(self, titulo_chat):
+        """Abrir un chat por su título exacto: directo desde la barra lateral o con una sola búsqueda"""
+        def chat_exacto(driver):
+            return driver.execute_script(
+                "var spans = document.querySelectorAll('#pane-side span[title]');"
+                "for (var i = 0; i < spans.length; i++) {"
+                "    if (spans[i].getAttribute('title') === arguments[0]) return spans[i];"
+                "}"
+                "return null;", titulo_chat
+            )
+        
+        chat = chat_exacto(self.driver)
+        if chat:
+            print(f"   ⚡ '{titulo_chat}' visible en la barra lateral")
+            return self.abrir_chat(chat, titulo_chat)
+        
+        search_box = self.buscar_selector("campo_busqueda", timeout=10)
+        if not search_box:
+            return False
+        self.escribir_busqueda(search_box, titulo_chat)
+        chat = self.esperar(f"título exacto '{titulo_chat}'", chat_exacto, timeout=3, intervalo=0.25)
+        if chat:
+            return self.abrir_chat(chat, titulo_chat)
+        return False
+
     def buscar_y_abrir_chat(self, nombre_proveedor, config):
-        """Buscar y abrir el chat del proveedor con búsqueda flexible"""
+        """Buscar y abrir el chat del proveedor con búsqueda flexible.
+
+        Primero prueba el título que funcionó la última vez (output/chats_wsp.json) y solo
+        si falla recorre los nombres alternativos.
+        """
         try:
             print(f"🔍 Buscando chat: {nombre_proveedor}")
             
+            titulo_cacheado = self.leer_cache_chats().get(config["nombre_corto"], {}).get("titulo")
+            if titulo_cacheado:
+                print(f"   🗂️ Probando el chat de la última corrida: '{titulo_cacheado}'")
+                try:
+                    abierto = self.abrir_chat_cacheado(titulo_cacheado)
+                except Exception as e:
+                    print(f"   ⚠️ Error abriendo el chat cacheado: {e}")
+                    abierto = False
+                self.actualizar_cache_chat(config, titulo_cacheado if abierto else None, acierto=abierto)
+                if abierto:
+                    return True
+                print("   🔄 El chat cacheado no apareció: búsqueda completa")
+            
             # Buscar el campo de búsqueda y hacer clic para asegurar que esté activo
-            search_box = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, '//div[@contenteditable="true"][@data-tab="3"]'))
-            )
+            search_box = self.buscar_selector("campo_busqueda", timeout=10)
+            if not search_box:
+                print("❌ No apareció el campo de búsqueda de chats")
+                return False
             
             # Hacer clic explícito en el campo de búsqueda para activarlo
             print("   🎯 Activando campo de búsqueda...")
             self.driver.execute_script("arguments[0].click();", search_box)
-            time.sleep(1)
             
             # Intentar con el nombre completo primero
             nombres_a_probar = [nombre_proveedor] + config.get("busqueda_alternativa", [])
@@ -1185,38 +1471,26 @@ class AutomatizadorWSP:
             for nombre_busqueda in nombres_a_probar:
                 print(f"   🔎 Probando con: '{nombre_busqueda}'")
                 
-                # Hacer clic nuevamente y limpiar completamente
-                self.driver.execute_script("arguments[0].click();", search_box)
-                time.sleep(0.5)
-                
-                # Limpiar usando Ctrl+A y Delete
-                search_box.send_keys('\ue009' + 'a')  # Ctrl+A (seleccionar todo)
-                time.sleep(0.3)
-                search_box.send_keys('\ue017')  # Delete
-                time.sleep(0.5)
-                
                 # Escribir el nombre del proveedor
-                search_box.send_keys(nombre_busqueda)
-                time.sleep(3)
+                self.escribir_busqueda(search_box, nombre_busqueda)
                 
-                # Buscar en la lista de chats
-                chat_list = self.driver.find_elements(By.XPATH, '//span[@title]')
-                chat_match = None
+                # Esperar a que los resultados muestren un chat que coincida
+                def chat_coincidente(driver):
+                    for chat in driver.find_elements(By.XPATH, '//span[@title]'):
+                        titulo = chat.get_attribute("title").lower()
+                        # Búsqueda más flexible
+                        if (nombre_busqueda.lower() in titulo or 
+                            any(alt.lower() in titulo for alt in config.get("busqueda_alternativa", []))):
+                            return chat
+                    return None
                 
-                for chat in chat_list:
-                    titulo = chat.get_attribute("title").lower()
-                    # Búsqueda más flexible
-                    if (nombre_busqueda.lower() in titulo or 
-                        any(alt.lower() in titulo for alt in config.get("busqueda_alternativa", []))):
-                        chat_match = chat
-                        print(f"   ✅ Encontrado: '{chat.get_attribute('title')}'")
-                        break
+                chat_match = self.esperar(f"resultados para '{nombre_busqueda}'", chat_coincidente, timeout=3, intervalo=0.25)
                 
                 if chat_match:
-                    # Hacer clic en el chat
-                    chat_match.click()
-                    time.sleep(4)
-                    print(f"✅ Chat abierto: {chat.get_attribute('title')}")
+                    titulo_chat = chat_match.get_attribute('title')
+                    print(f"   ✅ Encontrado: '{titulo_chat}'")
+                    self.abrir_chat(chat_match, titulo_chat)
+                    self.actualizar_cache_chat(config, titulo_chat)
                     return True
             
             print(f"❌ No se encontró ningún chat para: {nombre_proveedor}")
@@ -1231,23 +1505,14 @@ class AutomatizadorWSP:
         try:
             print("📝 Extrayendo mensaje objetivo con método optimizado...")
             
-            # OPCIÓN 1: Si ya tenemos el mensaje guardado
-            if (hasattr(self, 'mensaje_objetivo_encontrado') and self.mensaje_objetivo_encontrado and 
-                hasattr(self, 'elemento_mensaje_objetivo') and self.elemento_mensaje_objetivo):
-                
+            # OPCIÓN 1: Si ya tenemos el mensaje, releerlo por su data-id (sobrevive a re-renders)
+            if self.mensaje_objetivo_encontrado and self.burbuja_objetivo:
                 print("   🎯 Usando mensaje objetivo encontrado anteriormente")
-                try:
-                    # Verificar si el elemento sigue siendo válido
-                    if self.elemento_mensaje_objetivo.is_displayed():
-                        texto_completo = self.elemento_mensaje_objetivo.text.strip()
-                        if texto_completo:
-                            print(f"   ✅ Mensaje extraído exitosamente: {len(texto_completo)} caracteres")
-                            return [texto_completo]
-                    else:
-                        print("   ⚠️ Elemento guardado ya no está visible, re-buscando...")
-                except Exception as e:
-                    print(f"   ⚠️ Error con elemento guardado: {e}")
-                    print("   🔄 Re-buscando mensaje objetivo...")
+                texto_completo = self.releer_mensaje_objetivo()
+                if texto_completo:
+                    print(f"   ✅ Mensaje extraído exitosamente: {len(texto_completo)} caracteres")
+                    return [texto_completo]
+                print("   🔄 Re-buscando mensaje objetivo...")
             
             # OPCIÓN 2: Buscar el mensaje objetivo desde cero
             mensaje_encontrado = self.buscar_mensaje_objetivo_hoy()
@@ -1263,198 +1528,38 @@ class AutomatizadorWSP:
             print(f"❌ Error en extracción optimizada: {e}")
             return []
 
-    def extraer_mensajes_desde_ultima_etiqueta(self):
-        """MÉTODO REFACTORIZADO: Extracción directa y optimizada del mensaje objetivo"""
-        try:
-            print("📝 Iniciando extracción optimizada del mensaje objetivo...")
-            
-            # EXTRACCIÓN DIRECTA: Usar el nuevo método optimizado
-            mensajes_extraidos = self.extraer_mensaje_objetivo_optimizado()
-            
-            if mensajes_extraidos:
-                print(f"📊 Mensaje extraído exitosamente: {len(mensajes_extraidos[0])} caracteres")
-                return mensajes_extraidos
-            else:
-                print("⚠️ No se pudo extraer el mensaje con el método optimizado")
-                return []
-            
-        except Exception as e:
-            print(f"❌ Error en extracción desde última etiqueta: {e}")
-            return []
-    
-    def extraer_mensajes_por_etiquetas_dom(self):
-        """Método original de extracción por etiquetas DOM"""
-        try:
-            print("� Buscando última etiqueta de fecha...")
-            
-            # Buscar todas las etiquetas de fecha (Hoy, Ayer, fechas específicas)
-            # Incluir el selector específico proporcionado para el elemento "Hoy"
-            selectores_fecha = [
-                # Selector específico para el elemento "Hoy" con las clases exactas
-                '//span[contains(@class, "x140p0ai") and contains(@class, "x1gufx9m") and contains(@class, "x1s928wv") and text()="Hoy"]',
-                # Selector más general pero específico para "Hoy"
-                '//span[contains(@class, "x140p0ai") and text()="Hoy"]',
-                # Selectores originales como fallback
-                '//span[contains(@class, "x140p0ai") and (text()="Hoy" or text()="Ayer" or text()="Today" or text()="Yesterday")]',
-                '//span[text()="Hoy" or text()="Ayer" or text()="Today" or text()="Yesterday"]',
-                '//div[contains(@class, "x1n2onr6")]//span[contains(@class, "x140p0ai")]'
-            ]
-            
-            ultima_etiqueta = None
-            etiqueta_hoy_encontrada = False
-            
-            for selector in selectores_fecha:
-                try:
-                    etiquetas = self.driver.find_elements(By.XPATH, selector)
-                    if etiquetas:
-                        # Priorizar específicamente la etiqueta "Hoy"
-                        for etiqueta in reversed(etiquetas):  # Empezar por las más recientes
-                            texto_etiqueta = etiqueta.text.strip()
-                            if texto_etiqueta in ["Hoy", "Today"]:
-                                ultima_etiqueta = etiqueta
-                                etiqueta_hoy_encontrada = True
-                                print(f"   🎯 Etiqueta 'Hoy' encontrada: '{texto_etiqueta}'")
-                                break
-                        
-                        # Si encontramos "Hoy", salir del bucle principal
-                        if etiqueta_hoy_encontrada:
-                            break
-                            
-                        # Si no encontramos "Hoy", usar la última etiqueta como fallback
-                        if not ultima_etiqueta:
-                            ultima_etiqueta = etiquetas[-1]
-                            texto_etiqueta = ultima_etiqueta.text
-                            print(f"   ✅ Última etiqueta encontrada (fallback): '{texto_etiqueta}'")
-                except:
-                    continue
-            
-            if not ultima_etiqueta:
-                print("   ⚠️ No se encontró ninguna etiqueta de fecha")
-                return []
-            
-            # Verificar si realmente encontramos la etiqueta "Hoy"
-            texto_final = ultima_etiqueta.text.strip()
-            if not etiqueta_hoy_encontrada:
-                print(f"   ⚠️ ADVERTENCIA: No se encontró etiqueta 'Hoy', usando '{texto_final}' como fallback")
-                print("   💡 Esto podría significar que no hay mensajes de hoy o que la estructura del DOM cambió")
-            else:
-                print(f"   ✅ Confirmado: Procesando mensajes desde etiqueta 'Hoy'")
-            
-            # Buscar todos los mensajes que están después de esta etiqueta
-            textos = []
-            
-            try:
-                # Encontrar el contenedor padre de la etiqueta
-                contenedor_etiqueta = ultima_etiqueta
-                for _ in range(10):  # Subir hasta 10 niveles para encontrar el contenedor principal
-                    contenedor_etiqueta = contenedor_etiqueta.find_element(By.XPATH, '..')
-                    
-                    # Buscar todos los mensajes siguientes en el chat
-                    selectores_mensajes = [
-                        './/following::div[contains(@class, "copyable-text")]',
-                        './/following::span[contains(@class, "selectable-text")]',
-                        './/following::div[@data-testid="msg-container"]//span',
-                        './/following::div[contains(@class, "message")]//span[contains(@class, "selectable-text")]'
-                    ]
-                    
-                    for selector_msg in selectores_mensajes:
-                        try:
-                            mensajes = contenedor_etiqueta.find_elements(By.XPATH, selector_msg)
-                            if mensajes:
-                                print(f"   📋 Encontrados {len(mensajes)} mensajes después de la etiqueta")
-                                for msg in mensajes:
-                                    texto = msg.text.strip()
-                                    if texto and len(texto) > 2:
-                                        textos.append(texto)
-                                if textos:
-                                    break
-                        except:
-                            continue
-                    
-                    if textos:
-                        break
-                        
-            except Exception as e:
-                print(f"   ⚠️ Error buscando mensajes después de etiqueta: {e}")
-            
-            # Si no encontró mensajes con el método anterior, usar método directo
-            if not textos:
-                print("   🔄 Intentando método directo...")
-                try:
-                    # Buscar mensajes directamente después de cualquier etiqueta de fecha
-                    mensajes_directos = self.driver.find_elements(By.XPATH, 
-                        '//span[text()="Hoy" or text()="Ayer"]/ancestor::div[1]/following-sibling::div//span[contains(@class, "selectable-text")]'
-                    )
-                    
-                    if not mensajes_directos:
-                        # Método alternativo más amplio
-                        mensajes_directos = self.driver.find_elements(By.XPATH, 
-                            '//div[contains(@class, "copyable-text")]'
-                        )
-                        # Tomar solo los últimos 20 mensajes
-                        mensajes_directos = mensajes_directos[-20:] if len(mensajes_directos) > 20 else mensajes_directos
-                    
-                    for msg in mensajes_directos:
-                        texto = msg.text.strip()
-                        if texto and len(texto) > 2:
-                            textos.append(texto)
-                            
-                except Exception as e:
-                    print(f"   ⚠️ Error en método directo: {e}")
+    def extraer_mensajes_desde_ultima_etiqueta(self):
+        """MÉTODO REFACTORIZADO: Extracción directa y optimizada del mensaje objetivo"""
+        try:
+            print("📝 Iniciando extracción optimizada del mensaje objetivo...")
             
-            # Eliminar duplicados manteniendo orden
-            textos_unicos = []
-            for texto in textos:
-                if texto not in textos_unicos:
-                    textos_unicos.append(texto)
+            # EXTRACCIÓN DIRECTA: Usar el nuevo método optimizado
+            mensajes_extraidos = self.extraer_mensaje_objetivo_optimizado()
             
-            print(f"📊 Total mensajes extraídos desde última etiqueta: {len(textos_unicos)}")
-            return textos_unicos
+            if mensajes_extraidos:
+                print(f"📊 Mensaje extraído exitosamente: {len(mensajes_extraidos[0])} caracteres")
+                return mensajes_extraidos
+            else:
+                print("⚠️ No se pudo extraer el mensaje con el método optimizado")
+                return []
             
         except Exception as e:
-            print(f"❌ Error extrayendo mensajes desde última etiqueta: {e}")
+            print(f"❌ Error en extracción desde última etiqueta: {e}")
             return []
     
     def extraer_mensajes_fallback(self):
-        """Método de fallback para extraer mensajes si no se encuentra la etiqueta 'Hoy'"""
+        """Método de fallback: todos los textos del chat abierto, sin elegir por fecha"""
         try:
             print("🔄 Ejecutando extracción de fallback...")
             
-            # Intentar múltiples selectores para los mensajes
-            selectores_mensajes = [
-                '//div[@class="copyable-text"]',
-                '//div[contains(@class, "copyable-text")]',
-                '//span[@class="_ao3e selectable-text copyable-text"]',
-                '//div[@data-testid="conversation-panel-messages"]//span',
-                '//div[contains(@class, "message")]//span[contains(@class, "selectable-text")]'
-            ]
-            
-            textos = []
-            mensajes_encontrados = False
+            textos = [b["texto"] for b in self.extraer_burbujas() if len(b["texto"]) > 2]
             
-            for selector in selectores_mensajes:
-                try:
-                    mensajes_divs = self.driver.find_elements(By.XPATH, selector)
-                    if mensajes_divs:
-                        print(f"   ✅ Mensajes encontrados con selector fallback: {selector}")
-                        for msg in mensajes_divs:
-                            texto = msg.text.strip()
-                            if texto and len(texto) > 2:
-                                textos.append(texto)
-                        mensajes_encontrados = True
-                        break
-                except Exception as e:
-                    continue
-            
-            if not mensajes_encontrados:
+            if not textos:
                 print("   ⚠️ Método de fallback también falló")
                 return []
             
             # Eliminar duplicados manteniendo orden
-            textos_unicos = []
-            for texto in textos:
-                if texto not in textos_unicos:
-                    textos_unicos.append(texto)
+            textos_unicos = list(dict.fromkeys(textos))
             
             print(f"📊 Total mensajes fallback extraídos: {len(textos_unicos)}")
             return textos_unicos
@@ -1492,76 +1597,208 @@ class AutomatizadorWSP:
         """Limpiar el campo de búsqueda para el siguiente proveedor"""
         try:
             print("🧹 Limpiando campo de búsqueda...")
-            search_box = WebDriverWait(self.driver, 5).until(
-                EC.presence_of_element_located((By.XPATH, '//div[@contenteditable="true"][@data-tab="3"]'))
-            )
+            # Limpiar variables del mensaje objetivo para el siguiente proveedor
+            self.mensaje_objetivo_encontrado = False
+            self.burbuja_objetivo = None
+            
+            search_box = self.buscar_selector("campo_busqueda")
+            if not search_box:
+                print("⚠️ No se encontró el campo de búsqueda para limpiar")
+                return
             
             # Hacer clic y limpiar
             self.driver.execute_script("arguments[0].click();", search_box)
-            time.sleep(0.5)
             search_box.send_keys('\ue009' + 'a')  # Ctrl+A
-            time.sleep(0.3)
             search_box.send_keys('\ue017')  # Delete
-            time.sleep(0.5)
-            
-            # Limpiar variables del mensaje objetivo para el siguiente proveedor
-            self.mensaje_objetivo_encontrado = False
-            self.elemento_mensaje_objetivo = None
+            self.esperar("campo de búsqueda vacío", lambda d: not search_box.text.strip(), timeout=2)
             
         except Exception as e:
             print(f"⚠️ Error limpiando búsqueda: {e}")
 
-    def verificar_mensaje_completo(self, mensaje, numero_mensaje):
-        """Verificar si un mensaje está completo o fue cortado"""
+    def verificar_mensaje_completo(self, data_id, quietud_ms=300, timeout=3):
+        """Decidir con el DOM si una burbuja está completa (sin "Leer más" y con texto estable).
+
+        Devuelve el estado de JS_VERIFICAR_BURBUJA con la clave "completo", o None si no se
+        pudo observar.
+        """
         try:
-            # Verificaciones para detectar mensajes incompletos
-            mensaje_lower = mensaje.lower()
-            
-            # 1. Verificar si termina abruptamente (con "..." o "…")
-            if mensaje.endswith("…") or mensaje.endswith("..."):
-                print(f"   ⚠️ Mensaje {numero_mensaje} parece estar cortado (termina con puntos suspensivos)")
-                return False
-            
-            # 2. Verificar si hay palabras cortadas al final
-            ultima_linea = mensaje.strip().split('\n')[-1].strip()
-            if ultima_linea and len(ultima_linea) > 0:
-                # Si la última línea termina con una palabra muy corta o extraña
-                palabras_ultima_linea = ultima_linea.split()
-                if palabras_ultima_linea:
-                    ultima_palabra = palabras_ultima_linea[-1]
-                    # Palabras sospechosamente cortas que podrían estar cortadas
-                    if len(ultima_palabra) <= 3 and not ultima_palabra.isdigit() and "$" not in ultima_palabra:
-                        print(f"   ⚠️ Mensaje {numero_mensaje} posiblemente cortado (última palabra: '{ultima_palabra}')")
-                        return False
-            
-            # 3. Verificar estructura típica de lista completa
-            lineas = mensaje.split('\n')
-            tiene_header = False
-            tiene_productos = False
-            
-            for linea in lineas:
-                linea_clean = linea.strip().upper()
-                if "BUEN DIA" in linea_clean or "LISTA" in linea_clean:
-                    tiene_header = True
-                if any(marca in linea_clean for marca in ['IPHONE', 'SAMSUNG', 'MOTOROLA', 'XIAOMI']):
-                    tiene_productos = True
-            
-            # Un mensaje completo debería tener header y productos
-            if not (tiene_header and tiene_productos):
-                print(f"   ⚠️ Mensaje {numero_mensaje} no tiene estructura completa (header: {tiene_header}, productos: {tiene_productos})")
-                return False
-            
-            # 4. Verificar longitud razonable
-            if len(mensaje) < 500:
-                print(f"   ⚠️ Mensaje {numero_mensaje} es muy corto ({len(mensaje)} caracteres) para ser una lista completa")
-                return False
-            
-            print(f"   ✅ Mensaje {numero_mensaje} parece estar completo ({len(mensaje)} caracteres)")
-            return True
-            
+            estado = self.driver.execute_async_script(JS_VERIFICAR_BURBUJA, data_id, quietud_ms, timeout * 1000)
+        except Exception as e:
+            print(f"   ⚠️ No se pudo verificar la burbuja {data_id}: {type(e).__name__}")
+            return None
+        estado["completo"] = estado["existe"] and not estado["truncado"] and estado["estable"]
+        return estado
+
+    def completar_mensaje(self, mensaje, numero_mensaje):
+        """Asegurar que el mensaje filtrado sea la versión completa de su burbuja.
+
+        Si el DOM la muestra truncada o todavía creciendo, se expande y relee solo esa burbuja
+        (por data-id), como mucho reintentos_completitud veces. presupuesto_completitud_s acota
+        el total: cada observación y cada expansión reciben como plazo el tiempo que queda.
+        Devuelve la versión más larga obtenida.
+        """
+        burbuja = self.burbuja_objetivo
+        if not burbuja or not burbuja.get("data_id") or (burbuja.get("texto") or "").strip() != mensaje.strip():
+            # Sin burbuja asociada (extracción por texto) no hay hechos del DOM para verificar
+            print(f"   ℹ️ Mensaje {numero_mensaje} sin burbuja asociada, se guarda tal como se extrajo")
+            return mensaje
+        
+        limite = time.time() + self.presupuesto_completitud_s
+        mejor = mensaje
+        for intento in range(self.reintentos_completitud + 1):
+            restante = limite - time.time()
+            if restante <= 0.5:
+                print(f"   ⚠️ Mensaje {numero_mensaje}: sin tiempo para verificarlo, se guarda la versión de {len(mejor)} caracteres")
+                return mejor
+            estado = self.verificar_mensaje_completo(burbuja["data_id"], timeout=min(3, restante))
+            if estado is None or not estado["existe"]:
+                print(f"   ⚠️ Mensaje {numero_mensaje}: la burbuja ya no está en el DOM, se guarda la versión actual")
+                return mejor
+            if estado["completo"]:
+                if estado["largo"] > len(mejor):
+                    mejor = self.releer_mensaje_objetivo() or mejor
+                print(f"   ✅ Mensaje {numero_mensaje} completo ({len(mejor)} caracteres, texto estable en {estado['ms']}ms)")
+                return mejor
+            
+            motivo = "tiene 'Leer más'" if estado["truncado"] else f"siguió cambiando ({estado['cambios']} cambios)"
+            restante = limite - time.time()
+            if intento == self.reintentos_completitud or restante <= 0.5:
+                print(f"   ⚠️ Mensaje {numero_mensaje} {motivo}; sin reintentos/tiempo, se guarda la versión de {len(mejor)} caracteres")
+                return mejor
+            print(f"   🔄 Mensaje {numero_mensaje} {motivo} - reintento {intento + 1}/{self.reintentos_completitud}")
+            with self.fase("reintento_extraccion", mensaje=numero_mensaje, intento=intento + 1):
+                texto = self.releer_mensaje_objetivo(plazo=restante)
+            if texto and len(texto) > len(mejor):
+                mejor = texto
+        return mejor
+
+    def capturar_dom_chat(self, nombre_corto):
+        """Guardar el HTML del panel de conversación en output/capturas/ para el replay offline"""
+        try:
+            html = self.driver.execute_script(
+                "var m = document.querySelector('#main'); return m ? m.outerHTML : null;"
+            )
+            if not html:
+                print("⚠️ No hay panel de conversación para capturar")
+                return None
+            os.makedirs("output/capturas", exist_ok=True)
+            ruta = f"output/capturas/chat_{nombre_corto}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+            with open(ruta, 'w', encoding='utf-8') as f:
+                f.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+                        '<style>.selectable-text{white-space:pre-wrap}</style></head>\n<body>\n')
+                f.write(html)
+                f.write('\n</body></html>\n')
+            print(f"📸 DOM del chat capturado: {ruta} ({len(html)} caracteres)")
+            return ruta
+        except Exception as e:
+            print(f"⚠️ Error capturando el DOM del chat: {e}")
+            return None
+
+    def leer_checkpoints(self):
+        """Leer los checkpoints de todos los proveedores"""
+        try:
+            with open(RUTA_CHECKPOINTS, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def leer_ultima_burbuja(self):
+        """La burbuja más reciente del chat abierto tal como se ve (sin expandir "Leer más")"""
+        try:
+            contenedor = self.buscar_selector("contenedor_chat")
+            if contenedor:
+                self.driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight;", contenedor)
+                self.esperar_dom_estable("mensajes recientes renderizados", contenedor)
+            burbujas = self.extraer_burbujas()
+            return burbujas[-1] if burbujas else None
+        except Exception as e:
+            print(f"   ⚠️ No se pudo leer la última burbuja: {e}")
+            return None
+
+    def chat_sin_cambios(self, config, ultima):
+        """Indicar, antes de buscar y expandir nada, que el chat no recibió mensajes desde el último checkpoint.
+
+        Compara la burbuja más reciente (data-id y texto visible, recortado si tiene "Leer más")
+        con la que había cuando se procesó la lista del día objetivo.
+        """
+        if self.forzar or not ultima or not ultima.get("data_id"):
+            return False
+        checkpoint = self.leer_checkpoints().get(config["nombre_corto"])
+        if not checkpoint or checkpoint.get("dia") != self.fecha_objetivo.date().isoformat():
+            return False
+        hash_ultima = hashlib.sha256(ultima["texto"].encode('utf-8')).hexdigest()
+        return checkpoint.get("ultimo_data_id") == ultima["data_id"] and checkpoint.get("hash_ultimo") == hash_ultima
+
+    def mensaje_sin_cambios(self, config):
+        """Indicar si el mensaje objetivo es el mismo (id y contenido) que el último procesado"""
+        burbuja = self.burbuja_objetivo
+        if self.forzar or not burbuja or not burbuja.get("data_id"):
+            return False
+        checkpoint = self.leer_checkpoints().get(config["nombre_corto"])
+        if not checkpoint:
+            return False
+        hash_actual = hashlib.sha256(burbuja["texto"].encode('utf-8')).hexdigest()
+        return checkpoint.get("data_id") == burbuja["data_id"] and checkpoint.get("hash") == hash_actual
+
+    def registrar_checkpoint(self, nombre_proveedor, config, ultima=None):
+        """Anotar el mensaje objetivo recién guardado; se persiste en confirmar_checkpoints.
+
+        `ultima` es la burbuja más reciente del chat antes de expandir (ver chat_sin_cambios).
+        """
+        burbuja = self.burbuja_objetivo
+        if not burbuja or not burbuja.get("data_id"):
+            return
+        entrada = {
+            "nombre_corto": config["nombre_corto"],
+            "data_id": burbuja["data_id"],
+            "hash": hashlib.sha256(burbuja["texto"].encode('utf-8')).hexdigest(),
+            "fecha_objetivo": self.fecha_hoy,
+            "dia": (burbuja.get("timestamp") or self.fecha_objetivo).date().isoformat(),
+            "procesado": datetime.now().isoformat(timespec='seconds')
+        }
+        if ultima and ultima.get("data_id"):
+            entrada["ultimo_data_id"] = ultima["data_id"]
+            entrada["hash_ultimo"] = hashlib.sha256(ultima["texto"].encode('utf-8')).hexdigest()
+        self.checkpoints_pendientes[nombre_proveedor] = entrada
+
+    def confirmar_checkpoints(self, procesamiento_gcgroup=False):
+        """Persistir los checkpoints pendientes de la corrida.
+
+        El de GcGroup se descarta si su procesamiento no terminó bien: ejecutar_procesamiento_automatico
+        borra productos_ram.json antes de regenerarlo y, con el checkpoint escrito, las corridas
+        siguientes darían la lista por "sin cambios" y la web quedaría sin productos.
+        """
+        pendientes, self.checkpoints_pendientes = self.checkpoints_pendientes, {}
+        if not procesamiento_gcgroup and pendientes.pop("GcGroup", None):
+            print("⚠️ Checkpoint de GcGroup no guardado: la próxima corrida vuelve a procesar la lista")
+        if not pendientes:
+            return
+        with _lock_checkpoints:
+            checkpoints = self.leer_checkpoints()
+            for entrada in pendientes.values():
+                entrada = dict(entrada)
+                checkpoints[entrada.pop("nombre_corto")] = entrada
+            try:
+                escribir_json(RUTA_CHECKPOINTS, checkpoints)
+            except OSError as e:
+                print(f"⚠️ No se pudieron guardar los checkpoints: {e}")
+
+    def archivar_mensajes(self, config, textos, burbuja=None):
+        """Guardar en el archivo histórico los mensajes recién extraídos (sin duplicados).
+
+        Un error de SQLite se informa y no corta la corrida: el .txt ya quedó guardado.
+        `burbuja` (por defecto burbuja_objetivo) aporta el día y el data-id.
+        """
+        burbuja = burbuja or self.burbuja_objetivo or {}
+        # El día sale del timestamp del mensaje objetivo; si no hay, del día pedido o de hoy
+        fecha = burbuja.get("timestamp") or self.fecha_objetivo
+        data_ids = [burbuja.get("data_id") if texto == burbuja.get("texto") else None for texto in textos]
+        try:
+            nuevos = self.archivo.guardar(config["nombre_corto"], fecha, textos, data_ids)
+            print(f"🗄️ Archivo histórico: {nuevos} mensaje(s) nuevo(s) de {config['nombre_corto']} "
+                  f"para el {fecha.strftime('%d/%m/%Y')}")
         except Exception as e:
-            print(f"   ⚠️ Error verificando completitud del mensaje {numero_mensaje}: {e}")
-            return True  # En caso de error, asumir que está completo
+            print(f"⚠️ No se pudo archivar los mensajes de {config['nombre_corto']}: {e}")
 
     def procesar_proveedor(self, nombre_proveedor, config):
         """Procesar un proveedor específico"""
@@ -1569,187 +1806,611 @@ class AutomatizadorWSP:
         print(f"🏪 PROCESANDO: {nombre_proveedor}")
         print(f"{'='*60}")
         
-        # Abrir chat
-        if not self.buscar_y_abrir_chat(nombre_proveedor, config):
+        with self.fase("procesar_proveedor", proveedor=nombre_proveedor):
+            # Abrir chat
+            with self.fase("buscar_y_abrir_chat", proveedor=nombre_proveedor):
+                chat_abierto = self.buscar_y_abrir_chat(nombre_proveedor, config)
+            if not chat_abierto:
+                return False
+            
+            if self.capturar_dom:
+                with self.fase("capturar_dom_chat", proveedor=nombre_proveedor):
+                    self.capturar_dom_chat(config["nombre_corto"])
+            
+            # CHECKPOINT RÁPIDO: si la última burbuja es la misma que cuando se procesó la lista,
+            # no llegó nada nuevo y se evitan la búsqueda y la expansión de "Leer más"
+            with self.fase("leer_ultima_burbuja", proveedor=nombre_proveedor):
+                ultima = self.leer_ultima_burbuja()
+            if self.chat_sin_cambios(config, ultima):
+                print(f"⏭️  {nombre_proveedor} sin mensajes nuevos desde la última corrida - se conserva {config['archivo_salida']}")
+                self.proveedores_sin_cambios.add(nombre_proveedor)
+                self.limpiar_busqueda()
+                return True
+            
+            # NUEVA VERIFICACIÓN: Comprobar si hay mensaje objetivo de hoy
+            with self.fase("verificar_chat_tiene_mensajes_hoy", proveedor=nombre_proveedor):
+                tiene_mensaje_hoy = self.verificar_chat_tiene_mensajes_hoy()
+            if not tiene_mensaje_hoy:
+                print(f"⏭️  SALTANDO {nombre_proveedor}: No tiene mensaje objetivo de hoy")
+                return False
+            
+            print(f"✅ Confirmado: {nombre_proveedor} tiene mensaje objetivo de hoy - Continuando...")
+            
+            # CHECKPOINT: si es el mismo mensaje que la última corrida, no hay nada nuevo que hacer
+            if self.mensaje_sin_cambios(config):
+                print(f"⏭️  {nombre_proveedor} sin cambios desde la última corrida - se conserva {config['archivo_salida']}")
+                self.proveedores_sin_cambios.add(nombre_proveedor)
+                self.limpiar_busqueda()
+                return True
+            
+            # EXTRACCIÓN DIRECTA: Sin scroll excesivo hacia atrás
+            print("📝 Extrayendo mensaje objetivo directamente...")
+            with self.fase("extraccion", proveedor=nombre_proveedor):
+                mensajes = self.extraer_mensajes_desde_ultima_etiqueta()
+            if not mensajes:
+                print(f"⚠️ No se encontraron mensajes para {nombre_proveedor}")
+                return False
+            
+            # Filtrar mensajes del día
+            with self.fase("filtrar_mensajes_del_dia", proveedor=nombre_proveedor):
+                mensajes_filtrados = self.filtrar_mensajes_del_dia(mensajes, config["filtro_inicio"])
+            print(f"🎯 Mensajes filtrados del día: {len(mensajes_filtrados)}")
+            
+            # VALIDACIÓN: completitud según el DOM (sin "Leer más" y texto estable), con reintentos acotados
+            with self.fase("verificar_mensaje_completo", proveedor=nombre_proveedor, mensajes=len(mensajes_filtrados)):
+                mensajes_completos = [
+                    self.completar_mensaje(mensaje, i + 1) for i, mensaje in enumerate(mensajes_filtrados)
+                ]
+            
+            if not mensajes_completos:
+                print(f"⚠️ No se encontraron mensajes completos del día para {nombre_proveedor}")
+                print(f"⛔ No se guardarán mensajes viejos ni fallback.")
+            
+            # Guardar archivo
+            with self.fase("guardar_archivo_txt", proveedor=nombre_proveedor):
+                exito = self.guardar_archivo_txt(
+                    mensajes_completos, 
+                    config["archivo_salida"], 
+                    nombre_proveedor
+                )
+            if exito and mensajes_completos:
+                self.textos_extraidos[nombre_proveedor] = mensajes_completos
+                self.archivar_mensajes(config, mensajes_completos)
+                self.registrar_checkpoint(nombre_proveedor, config, ultima)
+            
+            # Limpiar búsqueda para el próximo proveedor
+            with self.fase("limpiar_busqueda", proveedor=nombre_proveedor):
+                self.limpiar_busqueda()
+            
+            return exito
+    
+    def procesar_proveedor_en_navegador_propio(self, nombre_proveedor, config):
+        """Worker del modo paralelo: abre un navegador propio para un único proveedor.
+
+        Cada worker usa el perfil "selenium_wsp_<nombre_corto>" porque Chrome no permite
+        dos instancias sobre el mismo user-data-dir. Cada perfil se vincula una única vez
+        escaneando el QR (WhatsApp admite varios dispositivos vinculados por cuenta).
+        """
+        worker = AutomatizadorWSP(fecha_objetivo=self.fecha_objetivo, perfil=config["nombre_corto"],
+                                  offline=self.offline, forzar=self.forzar)
+        worker.proveedores = self.proveedores
+        worker.registro_selectores = self.registro_selectores
+        worker.estadisticas_cache_chats = self.estadisticas_cache_chats
+        worker.capturar_dom = self.capturar_dom
+        worker.backend_extraccion = self.backend_extraccion
+        worker.traza = self.traza
+        worker.procesamiento_aislado = self.procesamiento_aislado
+        worker.bloquear_recursos = self.bloquear_recursos
+        worker.dia_primero = self.dia_primero
+        inicio = time.time()
+        try:
+            with worker.fase("configurar_navegador", proveedor=nombre_proveedor):
+                navegador_listo = worker.configurar_navegador()
+            if not navegador_listo:
+                if worker.estado_sesion == "requiere_qr":
+                    self.estado_sesion = "requiere_qr"
+                return False
+            # procesar_proveedor guarda archivo_salida apenas termina este chat
+            exito = worker.procesar_proveedor(nombre_proveedor, config)
+            self.proveedores_sin_cambios.update(worker.proveedores_sin_cambios)
+            self.textos_extraidos.update(worker.textos_extraidos)
+            self.checkpoints_pendientes.update(worker.checkpoints_pendientes)
+            return exito
+        except Exception as e:
+            print(f"❌ Error en worker de {nombre_proveedor}: {e}")
             return False
+        finally:
+            if worker.driver:
+                worker.driver.quit()
+            print(f"🔒 [{nombre_proveedor}] Navegador cerrado ({time.time() - inicio:.1f}s)")
+
+    def procesar_proveedores_en_paralelo(self, nombres_proveedores):
+        """Procesar varios proveedores a la vez, un navegador por chat"""
+        print(f"⚡ MODO PARALELO: {len(nombres_proveedores)} chats en simultáneo")
+        resultados = {}
+        with ThreadPoolExecutor(max_workers=len(nombres_proveedores)) as executor:
+            futuros = {
+                executor.submit(self.procesar_proveedor_en_navegador_propio, nombre, self.proveedores[nombre]): nombre
+                for nombre in nombres_proveedores
+            }
+            for futuro in as_completed(futuros):
+                nombre = futuros[futuro]
+                try:
+                    resultados[nombre] = futuro.result()
+                except Exception as e:
+                    print(f"❌ Error procesando {nombre}: {e}")
+                    resultados[nombre] = False
+                print(f"🏁 {nombre} terminado: {'✅' if resultados[nombre] else '❌'}")
+        return resultados
+
+    def procesar_todos_proveedores(self, paralelo=False, proveedores=None):
+        """Procesar los proveedores configurados (por defecto solo GcGroup).
+
+        En modo paralelo se procesan todos los proveedores de self.proveedores, cada uno
+        en su propio navegador, así el tiempo total es el del chat más lento.
+        """
+        if proveedores is None:
+            proveedores = list(self.proveedores) if paralelo else ["GcGroup"]
         
-        # NUEVA VERIFICACIÓN: Comprobar si hay mensaje objetivo de hoy
-        if not self.verificar_chat_tiene_mensajes_hoy():
-            print(f"⏭️  SALTANDO {nombre_proveedor}: No tiene mensaje objetivo de hoy")
-            return False
+        print(f"🚀 INICIANDO AUTOMATIZACIÓN DE WHATSAPP PARA: {', '.join(proveedores)}")
+        print("="*70)
+        inicio = time.time()
         
-        print(f"✅ Confirmado: {nombre_proveedor} tiene mensaje objetivo de hoy - Continuando...")
+        # En modo secuencial todos los chats comparten un único navegador
+        if not paralelo:
+            with self.fase("configurar_navegador"):
+                navegador_listo = self.configurar_navegador()
+            if not navegador_listo:
+                self.traza.guardar()
+                return False
         
-        # EXTRACCIÓN DIRECTA: Sin scroll excesivo hacia atrás
-        print("📝 Extrayendo mensaje objetivo directamente...")
-        mensajes = self.extraer_mensajes_desde_ultima_etiqueta()
-        if not mensajes:
-            print(f"⚠️ No se encontraron mensajes para {nombre_proveedor}")
+        resultados = {}
+        try:
+            if paralelo:
+                resultados = self.procesar_proveedores_en_paralelo(proveedores)
+            else:
+                for nombre_proveedor in proveedores:
+                    config = self.proveedores[nombre_proveedor]
+                    resultados[nombre_proveedor] = self.procesar_proveedor(nombre_proveedor, config)
+            
+            self.finalizar_extraccion(resultados, inicio)
+            return True
+        except Exception as e:
+            print(f"❌ Error general: {e}")
             return False
+        finally:
+            self.registro_selectores.guardar()
+            self.registro_selectores.reportar()
+            if self.driver:
+                self.driver.quit()
+                print("🔒 Navegador cerrado")
+            self.traza.reportar()
+            self.traza.guardar()
+    
+    def finalizar_extraccion(self, resultados, inicio):
+        """Mostrar estadísticas y resumen y, si GcGroup trajo una lista nueva, procesarla"""
+        # Estadísticas de eficiencia
+        chats_procesados = sum(1 for exito in resultados.values() if exito)
+        chats_saltados = len(resultados) - chats_procesados
         
-        # Filtrar mensajes del día
-        mensajes_filtrados = self.filtrar_mensajes_del_dia(mensajes, config["filtro_inicio"])
-        print(f"🎯 Mensajes filtrados del día: {len(mensajes_filtrados)}")
+        # Mostrar estadísticas de eficiencia
+        print(f"\n{'='*70}")
+        print("📊 ESTADÍSTICAS DE EFICIENCIA")
+        print(f"{'='*70}")
+        print(f"✅ Chats procesados (con mensajes de hoy): {chats_procesados}")
+        print(f"⏭️  Chats saltados (sin mensajes de hoy): {chats_saltados}")
+        print(f"⚡ Eficiencia: Se evitó procesar {chats_saltados} chat(s) innecesario(s)")
+        print(f"⏱️ Tiempo total de extracción: {time.time() - inicio:.1f}s")
+        self.reportar_cache_chats()
         
-        # VALIDACIÓN: Verificar si algún mensaje está incompleto
-        mensajes_completos = []
-        for i, mensaje in enumerate(mensajes_filtrados):
-            esta_completo = self.verificar_mensaje_completo(mensaje, i + 1)
-            if esta_completo:
-                mensajes_completos.append(mensaje)
+        # Mostrar resumen final
+        self.mostrar_resumen(resultados)
+        # Si GcGroup fue exitoso (y trajo algo nuevo), ejecutar procesamiento automático
+        procesado = False
+        if resultados.get("GcGroup") and "GcGroup" in self.proveedores_sin_cambios:
+            print("\n⏭️  GcGroup sin cambios: se omite el procesamiento automático (usar --forzar para repetirlo)")
+        elif resultados.get("GcGroup"):
+            with self.fase("ejecutar_procesamiento_automatico", aislado=self.procesamiento_aislado):
+                procesado = self.ejecutar_procesamiento_automatico(self.textos_extraidos.get("GcGroup"))
+        else:
+            print("\n⚠️ No se ejecutará el procesamiento automático porque no hubo extracción exitosa de GcGroup")
+        self.confirmar_checkpoints(procesado)
+
+    def importar_chat_exportado(self, ruta, nombre_proveedor="GcGroup", dia_primero=None):
+        """Sacar la lista del día de un "Exportar chat" de WhatsApp (.txt o .zip), sin navegador.
+
+        El archivo se lee en streaming (chat_exportado.leer_mensajes); entre los mensajes del
+        día objetivo gana la lista de precios más reciente según clasificar_mensaje (o, si no
+        hay, el primer mensaje largo que menciona LISTA, igual que filtrar_mensajes_del_dia). El
+        resultado se guarda, archiva y post-procesa igual que una extracción desde WhatsApp Web.
+        Con dia_primero None el orden día/mes se deduce del archivo (detectar_dia_primero).
+        """
+        config = self.proveedores[nombre_proveedor]
+        fecha = self.fecha_objetivo.date()
+        if dia_primero is None:
+            try:
+                dia_primero = chat_exportado.detectar_dia_primero(ruta)
+            except (OSError, ValueError, zipfile.BadZipFile) as e:
+                print(f"❌ No se pudo leer el chat exportado: {e}")
+                return False
+            if dia_primero is None:
+                print("⚠️ No se pudo deducir el orden de las fechas (ningún día mayor que 12): se asume día/mes"
+                      " (usar --orden-fecha mes-dia si el teléfono está en inglés de EE. UU.)")
+                dia_primero = True
             else:
-                print(f"   🔄 Intentando re-extraer mensaje {i + 1}...")
-                # Intentar re-extraer el mensaje
-                mensajes_reextraidos = self.extraer_mensajes_desde_ultima_etiqueta()
-                if mensajes_reextraidos:
-                    # Tomar el mensaje más largo/completo
-                    mensaje_mejor = max(mensajes_reextraidos, key=len)
-                    if self.verificar_mensaje_completo(mensaje_mejor, i + 1):
-                        mensajes_completos.append(mensaje_mejor)
-                        print(f"   ✅ Mensaje {i + 1} re-extraído exitosamente")
-                    else:
-                        print(f"   ⚠️ Mensaje {i + 1} sigue incompleto, guardando versión actual")
-                        mensajes_completos.append(mensaje)
+                print(f"📅 Orden de fechas del chat exportado: {'día/mes' if dia_primero else 'mes/día'}")
+        print(f"📥 IMPORTANDO CHAT EXPORTADO DE {nombre_proveedor}: {ruta} (lista del {fecha.strftime('%d/%m/%Y')})")
+        print("="*70)
+        inicio = time.time()
+        lista, posible_lista, leidos = None, None, 0
+        try:
+            with self.fase("importar_chat_exportado", proveedor=nombre_proveedor):
+                for mensaje in chat_exportado.leer_mensajes(ruta, fecha, dia_primero):
+                    leidos += 1
+                    clasificacion = clasificar_mensaje(mensaje["texto"])
+                    if clasificacion["etiqueta"] == "lista_precios":
+                        lista = mensaje
+                    elif (posible_lista is None and clasificacion["rasgos"]["menciona_lista"]
+                          and len(mensaje["texto"]) > 500):
+                        posible_lista = mensaje
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            print(f"❌ No se pudo leer el chat exportado: {e}")
+            return False
         
-        if not mensajes_completos:
-            print(f"⚠️ No se encontraron mensajes completos del día para {nombre_proveedor}")
-            print(f"⛔ No se guardarán mensajes viejos ni fallback.")
+        print(f"📊 {leidos} mensaje(s) del día leídos en {time.time() - inicio:.2f}s")
+        elegido = lista or posible_lista
+        exito = False
+        if not elegido:
+            print(f"⚠️ El chat exportado no tiene la lista de {nombre_proveedor} del {fecha.strftime('%d/%m/%Y')}")
+        else:
+            print(f"🎯 Lista de las {elegido['timestamp'].strftime('%H:%M')} de {elegido['remitente']} "
+                  f"({len(elegido['texto'])} caracteres)")
+            # Sin data-id: el archivo histórico usa el timestamp del mensaje y deduplica por contenido
+            self.burbuja_objetivo = {"data_id": None, "texto": elegido["texto"], "timestamp": elegido["timestamp"]}
+            mensajes = [elegido["texto"]]
+            with self.fase("guardar_archivo_txt", proveedor=nombre_proveedor):
+                exito = self.guardar_archivo_txt(mensajes, config["archivo_salida"], nombre_proveedor)
+            if exito:
+                self.textos_extraidos[nombre_proveedor] = mensajes
+                self.archivar_mensajes(config, mensajes)
         
-        # Guardar archivo
-        exito = self.guardar_archivo_txt(
-            mensajes_completos, 
-            config["archivo_salida"], 
-            nombre_proveedor
-        )
+        self.finalizar_extraccion({nombre_proveedor: exito}, inicio)
+        self.traza.guardar()
+        return exito
+
+    def procesar_con_playwright(self, perfiles=None, proveedores=None):
+        """Extraer con el motor asíncrono de Playwright (motor_playwright.py).
+
+        Los perfiles corren a la vez en un único event loop; cada uno recorre sus proveedores
+        en una sola pestaña. El cierre (resumen, procesamiento de GcGroup) es el mismo que con Selenium.
+        """
+        from motor_playwright import MotorPlaywright
         
-        # Limpiar búsqueda para el próximo proveedor
-        self.limpiar_busqueda()
+        print("🎭 INICIANDO AUTOMATIZACIÓN DE WHATSAPP CON PLAYWRIGHT")
+        print("="*70)
+        inicio = time.time()
+        try:
+            resultados = asyncio.run(MotorPlaywright(self).procesar(perfiles, proveedores))
+            if resultados is None:
+                return False
+            self.finalizar_extraccion(resultados, inicio)
+            return True
+        except Exception as e:
+            print(f"❌ Error general (Playwright): {e}")
+            return False
+        finally:
+            self.registro_selectores.guardar()
+            self.traza.reportar()
+            self.traza.guardar()
+
+    def procesar_pool_perfiles(self, perfiles):
+        """Procesar varias cuentas de WhatsApp a la vez: un proceso y un navegador por perfil.
+
+        `perfiles` es {"<nombre>": {"proveedores": [...], "perfil": "<sufijo>" | None,
+        "user_data_dir": "<ruta>"}} (ver leer_perfiles). Cada proceso recorre sus
+        proveedores en su propio navegador y devuelve resultados, textos, ranking de
+        selectores y traza; acá se juntan y se hace un único post-procesamiento.
+        """
+        print(f"👥 POOL DE PERFILES: {len(perfiles)} cuenta(s) en paralelo")
+        for nombre, perfil in perfiles.items():
+            print(f"   • {nombre}: {', '.join(perfil['proveedores'])}")
+        print("="*70)
+        inicio = time.time()
+        opciones = {
+            "fecha": self.fecha_objetivo,
+            "offline": self.offline,
+            "forzar": self.forzar,
+            "capturar_dom": self.capturar_dom,
+            "backend_extraccion": self.backend_extraccion,
+            "bloquear_recursos": self.bloquear_recursos,
+            "dia_primero": self.dia_primero
+        }
         
-        return exito
+        resultados = {}
+        try:
+            with ProcessPoolExecutor(max_workers=len(perfiles)) as executor:
+                futuros = {
+                    executor.submit(procesar_perfil, nombre, perfil, opciones): nombre
+                    for nombre, perfil in perfiles.items()
+                }
+                for futuro in as_completed(futuros):
+                    nombre = futuros[futuro]
+                    try:
+                        salida = futuro.result()
+                    except Exception as e:
+                        print(f"❌ Error en el proceso del perfil {nombre}: {e}")
+                        resultados.update({p: False for p in perfiles[nombre]["proveedores"]})
+                        continue
+                    resultados.update(salida["resultados"])
+                    self.proveedores_sin_cambios.update(salida["sin_cambios"])
+                    self.textos_extraidos.update(salida["textos_extraidos"])
+                    self.checkpoints_pendientes.update(salida["checkpoints"])
+                    self.registro_selectores.fusionar(salida["selectores"])
+                    for clave, cantidad in salida["cache_chats"].items():
+                        self.estadisticas_cache_chats[clave] += cantidad
+                    self.aplicar_cambios_cache_chats(salida["cambios_cache_chats"])
+                    if salida["estado_sesion"] == "requiere_qr":
+                        print(f"📱 El perfil {nombre} necesita escanear el QR")
+                        self.estado_sesion = "requiere_qr"
+                    self.traza.incorporar(salida["traza"])
+                    exitosos = sum(1 for exito in salida["resultados"].values() if exito)
+                    print(f"🏁 Perfil {nombre} terminado: {exitosos}/{len(salida['resultados'])} proveedores "
+                          f"({time.time() - inicio:.1f}s)")
+            
+            self.finalizar_extraccion(resultados, inicio)
+            return True
+        except Exception as e:
+            print(f"❌ Error general en el pool de perfiles: {e}")
+            return False
+        finally:
+            self.registro_selectores.guardar()
+            self.registro_selectores.reportar()
+            self.traza.reportar()
+            self.traza.guardar()
     
-    def procesar_todos_proveedores(self):
-        """Procesar solo el proveedor GcGroup automáticamente"""
-        print("🚀 INICIANDO AUTOMATIZACIÓN DE WHATSAPP SOLO PARA GcGroup")
-        print("="*70)
+    def recolectar_listas_del_rango(self, desde, hasta):
+        """Recorrer el chat abierto hacia atrás una sola vez y juntar la lista de cada día del rango.
+
+        Usa recorrer_mensajes hasta pasar `desde` (o hasta que WhatsApp no cargue más
+        historial); las listas truncadas se expanden mientras están en pantalla. Devuelve
+        {datetime del día: burbuja}, con la última lista publicada de cada día.
+        """
+        def lista_del_rango(registro):
+            """Una lista de precios publicada dentro del rango (según su timestamp)"""
+            timestamp = registro["timestamp"]
+            return (timestamp is not None and desde.date() <= timestamp.date() <= hasta.date()
+                    and self.es_mensaje_objetivo(registro, timestamp.date()))
         
-        # Estadísticas de eficiencia
-        chats_procesados = 0
-        chats_saltados = 0
+        listas = {}
+        mensajes = self.recorrer_mensajes(hasta_fecha=desde, max_mensajes=None, expandir_si=lista_del_rango)
+        for burbuja in mensajes:
+            if not lista_del_rango(burbuja):
+                continue
+            dia = datetime.combine(burbuja["timestamp"].date(), datetime.min.time())
+            anterior = listas.get(dia)
+            if not anterior or (burbuja["timestamp"] or datetime.min) > (anterior["timestamp"] or datetime.min):
+                listas[dia] = burbuja
+                print(f"   📅 Lista del {dia.strftime('%d/%m/%Y')}: {len(burbuja['texto'])} caracteres")
+        return listas
+
+    def procesar_rango(self, desde, hasta, proveedores=None):
+        """Backfill: en una sola sesión del navegador, guardar un archivo por día con la lista del rango.
+
+        Cada lista se guarda junto a archivo_salida con la fecha en el nombre
+        (output/lista_gcgroup_2025-11-14.txt). No ejecuta el procesamiento automático.
+        """
+        proveedores = proveedores or ["GcGroup"]
+        print(f"🗓️ BACKFILL del {desde.strftime('%d/%m/%Y')} al {hasta.strftime('%d/%m/%Y')} para: {', '.join(proveedores)}")
+        print("="*70)
+        inicio = time.time()
         
-        # Configurar navegador
-        if not self.configurar_navegador():
+        self.traza = TrazaFases("backfill")
+        with self.fase("configurar_navegador"):
+            navegador_listo = self.configurar_navegador()
+        if not navegador_listo:
+            self.traza.guardar()
             return False
         
         resultados = {}
         try:
-            nombre_proveedor = "GcGroup"
-            config = self.proveedores[nombre_proveedor]
-            
-            # Intentar procesar proveedor
-            exito = self.procesar_proveedor(nombre_proveedor, config)
-            
-            if exito:
-                chats_procesados += 1
-            else:
-                chats_saltados += 1
+            for nombre_proveedor in proveedores:
+                config = self.proveedores[nombre_proveedor]
+                with self.fase("buscar_y_abrir_chat", proveedor=nombre_proveedor):
+                    chat_abierto = self.buscar_y_abrir_chat(nombre_proveedor, config)
+                if not chat_abierto:
+                    resultados[nombre_proveedor] = False
+                    continue
                 
-            resultados[nombre_proveedor] = exito
-            
-            # Mostrar estadísticas de eficiencia
-            print(f"\n{'='*70}")
-            print("📊 ESTADÍSTICAS DE EFICIENCIA")
-            print(f"{'='*70}")
-            print(f"✅ Chats procesados (con mensajes de hoy): {chats_procesados}")
-            print(f"⏭️  Chats saltados (sin mensajes de hoy): {chats_saltados}")
-            print(f"⚡ Eficiencia: Se evitó procesar {chats_saltados} chat(s) innecesario(s)")
+                with self.fase("recolectar_listas_del_rango", proveedor=nombre_proveedor):
+                    listas = self.recolectar_listas_del_rango(desde, hasta)
+                base, extension = os.path.splitext(config["archivo_salida"])
+                with self.fase("guardar_archivo_txt", proveedor=nombre_proveedor, archivos=len(listas)):
+                    for dia, burbuja in sorted(listas.items()):
+                        self.guardar_archivo_txt([burbuja["texto"]], f"{base}_{dia.strftime('%Y-%m-%d')}{extension}", nombre_proveedor)
+                        self.archivar_mensajes(config, [burbuja["texto"]], burbuja)
+                
+                dias_faltantes = (hasta.date() - desde.date()).days + 1 - len(listas)
+                print(f"📊 {nombre_proveedor}: {len(listas)} día(s) con lista, {dias_faltantes} sin lista")
+                resultados[nombre_proveedor] = bool(listas)
+                self.limpiar_busqueda()
             
-            # Mostrar resumen final
             self.mostrar_resumen(resultados)
-            # Si fue exitoso, ejecutar procesamiento automático
-            if exito:
-                print("\n⏳ Ejecutando procesamiento automático en 3 segundos...")
-                time.sleep(3)
-                self.ejecutar_procesamiento_automatico()
-            else:
-                print("\n⚠️ No se ejecutará el procesamiento automático porque no hubo extracción exitosa")
+            print(f"⏱️ Backfill completo en {time.time() - inicio:.1f}s")
+            return any(resultados.values())
+        except Exception as e:
+            print(f"❌ Error general en el backfill: {e}")
+            return False
+        finally:
+            self.registro_selectores.guardar()
+            self.registro_selectores.reportar()
+            if self.driver:
+                self.driver.quit()
+                print("🔒 Navegador cerrado")
+            self.traza.reportar()
+            self.traza.guardar()
+
+    def instalar_vigia_chats(self, proveedores):
+        """Inyectar el MutationObserver que vigila la lista de chats de los proveedores dados"""
+        vigilados = [
+            {
+                "nombre": nombre,
+                "terminos": [nombre] + self.proveedores[nombre].get("busqueda_alternativa", []),
+                "filtros": self.proveedores[nombre]["filtro_inicio"]
+            }
+            for nombre in proveedores
+        ]
+        chats = self.driver.execute_script(JS_INSTALAR_VIGIA, vigilados)
+        if chats is False:
+            print("⚠️ No se encontró la lista de chats para instalar el vigía")
+            return False
+        print(f"👁️ Vigía instalado en la lista de chats ({chats} chat(s) de proveedores visibles)")
+        return True
+
+    def vigilar_chats(self, cola, detener, proveedores, plazo_ms=5000):
+        """Hilo vigía del modo daemon: pasa a la cola cada lista nueva que detecta el observer"""
+        while not detener.is_set():
+            try:
+                with self.lock_driver:
+                    eventos = self.driver.execute_async_script(JS_ESPERAR_EVENTOS_VIGIA, plazo_ms)
+                    if eventos is None:
+                        print("👁️ El vigía no está en la página: reinstalando...")
+                        eventos = [] if self.instalar_vigia_chats(proveedores) else None
+            except Exception as e:
+                print(f"⚠️ Error vigilando la lista de chats: {e}")
+                eventos = None
+            
+            if eventos is None:
+                # Sin vigía (o con el driver ocupado en una recarga): reintentar más tarde
+                detener.wait(plazo_ms / 1000)
+                continue
+            for evento in eventos:
+                print(f"🔔 Novedad en {evento['titulo']}: {evento['vista_previa'][:60]!r}")
+                cola.put(evento["proveedor"])
+
+    def procesar_en_daemon(self, nombre_proveedor):
+        """Procesar un proveedor que avisó el vigía y, si es GcGroup con lista nueva, publicarla"""
+        inicio = time.time()
+        # Una traza por ciclo, así cada lista recibida queda con sus propios tiempos
+        self.traza = TrazaFases(f"daemon_{self.proveedores[nombre_proveedor]['nombre_corto']}")
+        try:
+            # El daemon puede quedar corriendo de un día para el otro
+            self.fecha_objetivo = datetime.now()
+            self.fecha_hoy = formatear_fecha(self.fecha_objetivo)
+            self.proveedores_sin_cambios.discard(nombre_proveedor)
+            exito = self.procesar_proveedor(nombre_proveedor, self.proveedores[nombre_proveedor])
+            procesado = False
+            if nombre_proveedor == "GcGroup" and exito and "GcGroup" not in self.proveedores_sin_cambios:
+                with self.fase("ejecutar_procesamiento_automatico", aislado=self.procesamiento_aislado):
+                    procesado = self.ejecutar_procesamiento_automatico(self.textos_extraidos.get("GcGroup"))
+            self.confirmar_checkpoints(procesado)
+            self.registro_selectores.guardar()
+        except Exception as e:
+            print(f"❌ Error procesando {nombre_proveedor} en modo daemon: {e}")
+        print(f"⏱️ {nombre_proveedor}: ciclo del daemon completo en {time.time() - inicio:.1f}s")
+        self.traza.guardar()
+
+    def recargar_whatsapp(self, proveedores):
+        """Recargar la pestaña para acotar la memoria de Chrome y volver a instalar el vigía"""
+        print("♻️ Recargando WhatsApp Web para liberar memoria...")
+        inicio = time.time()
+        self.driver.refresh()
+        if not self.buscar_selector("campo_busqueda", timeout=90):
+            print("⚠️ WhatsApp Web no terminó de cargar después de la recarga")
+            return False
+        print(f"♻️ Recarga completa en {time.time() - inicio:.1f}s")
+        return self.instalar_vigia_chats(proveedores)
+
+    def ejecutar_daemon(self, proveedores=None, recarga_min=30):
+        """Modo residente: mantiene WhatsApp Web abierto y procesa cada lista apenas llega.
+
+        Un hilo vigía espera (del lado del navegador) los eventos del MutationObserver de la
+        lista de chats y los pone en una cola; este hilo los consume, agrupando los avisos
+        repetidos de un mismo proveedor. Al arrancar se procesa una vez cada proveedor (los
+        checkpoints evitan repetir lo que ya se publicó) y cada `recarga_min` minutos se
+        recarga la pestaña.
+        """
+        proveedores = proveedores or ["GcGroup"]
+        print(f"🛰️ MODO DAEMON: vigilando {', '.join(proveedores)} (recarga cada {recarga_min} min)")
+        print("="*70)
+        self.traza = TrazaFases("daemon_arranque")
+        with self.fase("configurar_navegador"):
+            navegador_listo = self.configurar_navegador()
+        self.traza.guardar()
+        if not navegador_listo:
+            return False
+        
+        cola = queue.Queue()
+        detener = threading.Event()
+        # Lo que haya llegado mientras el daemon estaba apagado
+        for nombre in proveedores:
+            cola.put(nombre)
+        self.instalar_vigia_chats(proveedores)
+        vigia = threading.Thread(target=self.vigilar_chats, args=(cola, detener, proveedores), daemon=True)
+        vigia.start()
+        
+        ultima_recarga = time.time()
+        try:
+            while True:
+                try:
+                    pendientes = {cola.get(timeout=1)}
+                except queue.Empty:
+                    pendientes = set()
+                while not cola.empty():
+                    pendientes.add(cola.get_nowait())
+                
+                with self.lock_driver:
+                    for nombre in proveedores:
+                        if nombre in pendientes:
+                            self.procesar_en_daemon(nombre)
+                    if pendientes:
+                        # Lo que cambió en la lista por abrir y buscar los chats no es novedad
+                        self.driver.execute_script("if (window.__wspVigia) window.__wspVigia.tomarBase();")
+                        print("👁️ Esperando nuevas listas... (Ctrl+C para salir)")
+                    if time.time() - ultima_recarga >= recarga_min * 60:
+                        self.recargar_whatsapp(proveedores)
+                        ultima_recarga = time.time()
+        except KeyboardInterrupt:
+            print("\n🛑 Daemon detenido por el usuario")
             return True
         except Exception as e:
-            print(f"❌ Error general: {e}")
+            print(f"❌ Error general en modo daemon: {e}")
             return False
         finally:
+            detener.set()
+            vigia.join(timeout=10)
+            self.registro_selectores.guardar()
+            self.registro_selectores.reportar()
             if self.driver:
                 self.driver.quit()
                 print("🔒 Navegador cerrado")
     
-    def ejecutar_procesamiento_automatico(self):
-        """Ejecutar scripts de procesamiento automáticamente"""
+    def ejecutar_procesamiento_automatico(self, textos=None):
+        """Regenerar productos_ram.json y el archivo de difusión a partir de la lista de GcGroup.
+
+        Por defecto llama a procesar_gcgroup_refactor en este mismo proceso con el texto ya
+        extraído (`textos`); sin textos en memoria procesa output/lista_gcgroup.txt. Con
+        procesamiento_aislado = True ejecuta el script en un subproceso.
+        """
         print(f"\n{'='*70}")
         print("🔄 INICIANDO PROCESAMIENTO AUTOMÁTICO")
         print(f"{'='*70}")
+        inicio = time.time()
         
-        scripts_a_ejecutar = [
-            {
-                "nombre": "procesar_gcgroup_refactor.py",
-                "descripcion": "Procesamiento específico de GCGroup - Genera productos_ram.json directamente"
-            }
-        ]
+        # Se borra recién acá: si el proveedor no cambió, el JSON publicado se conserva
+        borrar_productos_json()
         
-        for script in scripts_a_ejecutar:
-            print(f"\n🚀 Ejecutando: {script['nombre']}")
-            print(f"📝 {script['descripcion']}")
-            print("-" * 50)
-            
-            try:
-                # Verificar que el archivo del script existe
-                if not os.path.exists(script['nombre']):
-                    print(f"❌ Archivo no encontrado: {script['nombre']}")
-                    continue
-                
-                # Ejecutar el script y capturar la salida
-                resultado = subprocess.run(
-                    [sys.executable, script['nombre']], 
-                    capture_output=True, 
-                    text=True,
-                    encoding='utf-8',
-                    errors='replace',  # Reemplazar caracteres problemáticos en lugar de fallar
-                    cwd=os.getcwd()
-                )
-                
-                # Mostrar la salida del script
-                if resultado.stdout:
-                    # Filtrar líneas vacías
-                    lineas = [linea for linea in resultado.stdout.split('\n') if linea.strip()]
-                    for linea in lineas:
-                        try:
-                            # Intentar imprimir la línea tal como está
-                            print(f"   {linea}")
-                        except UnicodeEncodeError:
-                            # Si hay problemas de encoding, limpiar caracteres problemáticos
-                            linea_limpia = linea.encode('ascii', errors='ignore').decode('ascii')
-                            print(f"   {linea_limpia}")
-                
-                if resultado.stderr:
-                    print(f"⚠️ Advertencias/Errores:")
-                    lineas_error = [linea for linea in resultado.stderr.split('\n') if linea.strip()]
-                    for linea in lineas_error:
-                        try:
-                            print(f"   {linea}")
-                        except UnicodeEncodeError:
-                            linea_limpia = linea.encode('ascii', errors='ignore').decode('ascii')
-                            print(f"   {linea_limpia}")
-                
-                if resultado.returncode == 0:
-                    print(f"✅ {script['nombre']} ejecutado exitosamente")
-                    
-                    # Pausa especial después de procesar_gcgroup_refactor.py para generar archivo de difusión
-                    if script['nombre'] == 'procesar_gcgroup_refactor.py':
-                        print("⏳ Esperando 3 segundos para que se genere el archivo de difusión...")
-                        time.sleep(3)
-                else:
-                    print(f"❌ Error ejecutando {script['nombre']} (código: {resultado.returncode})")
-                    
-            except Exception as e:
-                print(f"❌ Error ejecutando {script['nombre']}: {e}")
+        if self.procesamiento_aislado:
+            exito = self.ejecutar_script_procesamiento(
+                "procesar_gcgroup_refactor.py",
+                "Procesamiento específico de GCGroup - Genera productos_ram.json directamente"
+            )
+        else:
+            exito = self.procesar_gcgroup_en_proceso(textos)
+        print(f"⏱️ Procesamiento: {time.time() - inicio:.2f}s")
+        
+        if not exito:
+            print("\n⚠️ El procesamiento automático terminó con errores")
+            return False
         
         print(f"\n{'='*70}")
         print("🎉 PROCESAMIENTO AUTOMÁTICO COMPLETADO")
@@ -1760,6 +2421,75 @@ class AutomatizadorWSP:
         print("   • Productos categorizados (JSON) - productos_ram.json actualizado")
         print("   • Archivo de difusión para WhatsApp (TXT)")
         print("\n🌐 El archivo productos_ram.json ha sido actualizado para la web")
+        return True
+
+    def procesar_gcgroup_en_proceso(self, textos=None):
+        """Procesar la lista de GcGroup importando ProcesadorGCGroup (sin arrancar otro intérprete)"""
+        print("\n🚀 Procesando GCGroup en este proceso")
+        print("-" * 50)
+        try:
+            if textos:
+                return procesar_gcgroup_refactor.procesar_texto("\n".join(textos))
+            print("ℹ️ Sin texto en memoria: se procesa output/lista_gcgroup.txt")
+            return procesar_gcgroup_refactor.main()
+        except Exception as e:
+            print(f"❌ Error procesando GCGroup: {e}")
+            return False
+
+    def ejecutar_script_procesamiento(self, nombre, descripcion):
+        """Modo aislado: ejecutar un script de procesamiento en un subproceso y mostrar su salida"""
+        print(f"\n🚀 Ejecutando: {nombre}")
+        print(f"📝 {descripcion}")
+        print("-" * 50)
+        
+        try:
+            # Verificar que el archivo del script existe
+            if not os.path.exists(nombre):
+                print(f"❌ Archivo no encontrado: {nombre}")
+                return False
+            
+            # Ejecutar el script y capturar la salida
+            resultado = subprocess.run(
+                [sys.executable, nombre], 
+                capture_output=True, 
+                text=True,
+                encoding='utf-8',
+                errors='replace',  # Reemplazar caracteres problemáticos en lugar de fallar
+                cwd=os.getcwd()
+            )
+            
+            # Mostrar la salida del script
+            if resultado.stdout:
+                # Filtrar líneas vacías
+                lineas = [linea for linea in resultado.stdout.split('\n') if linea.strip()]
+                for linea in lineas:
+                    try:
+                        # Intentar imprimir la línea tal como está
+                        print(f"   {linea}")
+                    except UnicodeEncodeError:
+                        # Si hay problemas de encoding, limpiar caracteres problemáticos
+                        linea_limpia = linea.encode('ascii', errors='ignore').decode('ascii')
+                        print(f"   {linea_limpia}")
+            
+            if resultado.stderr:
+                print(f"⚠️ Advertencias/Errores:")
+                lineas_error = [linea for linea in resultado.stderr.split('\n') if linea.strip()]
+                for linea in lineas_error:
+                    try:
+                        print(f"   {linea}")
+                    except UnicodeEncodeError:
+                        linea_limpia = linea.encode('ascii', errors='ignore').decode('ascii')
+                        print(f"   {linea_limpia}")
+            
+            if resultado.returncode == 0:
+                print(f"✅ {nombre} ejecutado exitosamente")
+                return True
+            print(f"❌ Error ejecutando {nombre} (código: {resultado.returncode})")
+            return False
+                
+        except Exception as e:
+            print(f"❌ Error ejecutando {nombre}: {e}")
+            return False
 
     def mostrar_resumen(self, resultados):
         """Mostrar resumen de la ejecución"""
@@ -1791,23 +2521,163 @@ class AutomatizadorWSP:
         
         print(f"{'='*70}")
 
-def main():
-    """Función principal"""
-    # Borrar productos_ram.json antes de iniciar, si existe
+def borrar_productos_json():
+    """Borrar productos_ram.json antes de regenerarlo, si existe"""
     try:
         ruta_json = os.path.abspath(
             os.path.join(os.path.dirname(__file__), "..", "public", "productos_ram.json")
         )
         if os.path.isfile(ruta_json):
             os.remove(ruta_json)
-            print(f"🗑️ Eliminado antes de iniciar: {ruta_json}")
+            print(f"🗑️ Eliminado antes de regenerar: {ruta_json}")
         else:
             print(f"ℹ️ No existe productos_ram.json para borrar: {ruta_json}")
     except Exception as e:
-        print(f"⚠️ No se pudo borrar productos_ram.json antes de iniciar: {e}")
+        print(f"⚠️ No se pudo borrar productos_ram.json antes de regenerar: {e}")
+
+def leer_perfiles(ruta):
+    """Leer el pool de perfiles desde un JSON como:
+
+    {
+        "principal": {"perfil": null, "proveedores": ["GcGroup"]},
+        "segunda_linea": {"perfil": "linea2", "proveedores": ["Rodrigo Provee", "Kadabra Provee"]}
+    }
+
+    "perfil" es el sufijo del user-data-dir (selenium_wsp_<perfil>; null = selenium_wsp y,
+    si falta, se usa el nombre del perfil); "user_data_dir" permite indicar la ruta completa.
+    """
+    with open(ruta, 'r', encoding='utf-8') as f:
+        perfiles = json.load(f)
+    if not isinstance(perfiles, dict) or not perfiles:
+        raise ValueError(f"{ruta}: se esperaba un objeto con al menos un perfil")
+    for nombre, perfil in perfiles.items():
+        if not perfil.get("proveedores"):
+            raise ValueError(f"{ruta}: el perfil '{nombre}' no tiene proveedores")
+    return perfiles
+
+def procesar_perfil(nombre_perfil, perfil, opciones):
+    """Worker del pool de perfiles (corre en su propio proceso).
+
+    Abre un navegador con el user-data-dir del perfil, procesa sus proveedores y devuelve
+    todo lo que el proceso principal necesita juntar (solo tipos serializables).
+    """
+    automatizador = AutomatizadorWSP(fecha_objetivo=opciones["fecha"], perfil=perfil.get("perfil", nombre_perfil),
+                                     offline=opciones["offline"], forzar=opciones["forzar"])
+    automatizador.user_data_dir = perfil.get("user_data_dir")
+    automatizador.capturar_dom = opciones["capturar_dom"]
+    automatizador.backend_extraccion = opciones["backend_extraccion"]
+    automatizador.bloquear_recursos = opciones["bloquear_recursos"]
+    automatizador.dia_primero = opciones["dia_primero"]
+    automatizador.diferir_cache_chats = True
+    resultados = {nombre: False for nombre in perfil["proveedores"]}
+    try:
+        with automatizador.fase("configurar_navegador", perfil=nombre_perfil):
+            navegador_listo = automatizador.configurar_navegador()
+        if navegador_listo:
+            for nombre_proveedor in perfil["proveedores"]:
+                resultados[nombre_proveedor] = automatizador.procesar_proveedor(
+                    nombre_proveedor, automatizador.proveedores[nombre_proveedor]
+                )
+    except Exception as e:
+        print(f"❌ [{nombre_perfil}] Error procesando el perfil: {e}")
+    finally:
+        if automatizador.driver:
+            automatizador.driver.quit()
+            print(f"🔒 [{nombre_perfil}] Navegador cerrado")
+    return {
+        "resultados": resultados,
+        "sin_cambios": sorted(automatizador.proveedores_sin_cambios),
+        "textos_extraidos": automatizador.textos_extraidos,
+        "checkpoints": automatizador.checkpoints_pendientes,
+        "selectores": automatizador.registro_selectores.datos,
+        "cache_chats": automatizador.estadisticas_cache_chats,
+        "cambios_cache_chats": automatizador.cambios_cache_chats,
+        "estado_sesion": automatizador.estado_sesion,
+        "traza": automatizador.traza.exportar()
+    }
 
-    automatizador = AutomatizadorWSP()
-    automatizador.procesar_todos_proveedores()
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Extrae las listas de precios de WhatsApp Web")
+    parser.add_argument("--paralelo", action="store_true",
+                        help="Procesar todos los proveedores a la vez, un navegador por chat")
+    parser.add_argument("--offline", action="store_true",
+                        help="No consultar la red para chromedriver (usar solo la caché local o el PATH)")
+    parser.add_argument("--forzar", action="store_true",
+                        help="Re-procesar aunque el mensaje del proveedor no haya cambiado desde la última corrida")
+    parser.add_argument("--capturar-dom", action="store_true",
+                        help="Guardar el HTML de cada chat en output/capturas/ para el replay offline")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Quedar residente con WhatsApp Web abierto y procesar cada lista nueva apenas llega")
+    parser.add_argument("--recarga-min", type=int, default=30,
+                        help="Modo daemon: minutos entre recargas de la pestaña (acota la memoria de Chrome)")
+    parser.add_argument("--bloquear-recursos", action="store_true",
+                        help="No descargar imágenes, multimedia ni fuentes (menos red, CPU y memoria)")
+    parser.add_argument("--medir-bloqueo", action="store_true",
+                        help="Medir carga de WhatsApp Web y memoria de Chrome con y sin --bloquear-recursos")
+    parser.add_argument("--sondear-sesion", action="store_true",
+                        help=f"Solo verificar si el perfil tiene sesión (sale con {SALIDA_REQUIERE_QR} si pide el QR)")
+    parser.add_argument("--perfiles", metavar="JSON",
+                        help="Pool de perfiles: varias cuentas de WhatsApp en paralelo, un proceso por perfil")
+    parser.add_argument("--procesamiento-aislado", action="store_true",
+                        help="Ejecutar procesar_gcgroup_refactor.py en un subproceso en lugar de en este proceso")
+    parser.add_argument("--importar-chat", metavar="RUTA",
+                        help="Sin navegador: leer la lista del día de un 'Exportar chat' de WhatsApp (.txt o .zip)")
+    parser.add_argument("--proveedor", default="GcGroup",
+                        help="Con --importar-chat: proveedor al que pertenece el chat exportado")
+    parser.add_argument("--orden-fecha", choices=["auto", "dia-mes", "mes-dia"], default="auto",
+                        help="Con --importar-chat: orden de las fechas del archivo (auto: deducirlo)")
+    parser.add_argument("--motor", choices=["selenium", "playwright"], default="selenium",
+                        help="Motor del navegador: Selenium o Playwright asíncrono (perfiles concurrentes en un solo proceso)")
+    parser.add_argument("--backend", choices=["js", "cdp"], default="js",
+                        help="Extracción de burbujas: execute_script (js) o DOMSnapshot de CDP (cdp)")
+    parser.add_argument("--fecha", type=interpretar_fecha,
+                        help="Día a extraer: AAAA-MM-DD, DD/MM/AAAA o el día del mes actual (por defecto hoy)")
+    parser.add_argument("--desde", type=interpretar_fecha,
+                        help="Backfill: primer día del rango; guarda un archivo por día en una sola sesión")
+    parser.add_argument("--hasta", type=interpretar_fecha,
+                        help="Backfill: último día del rango (por defecto hoy)")
+    args = parser.parse_args()
+    if args.hasta and not args.desde:
+        parser.error("--hasta requiere --desde")
+    if args.desde and args.desde > (args.hasta or datetime.now()):
+        parser.error("--desde no puede ser posterior a --hasta")
+
+    # El daemon siempre busca la lista del día en curso
+    fecha_objetivo = None if args.daemon else args.fecha
+    automatizador = AutomatizadorWSP(fecha_objetivo=fecha_objetivo, offline=args.offline, forzar=args.forzar)
+    automatizador.capturar_dom = args.capturar_dom
+    automatizador.backend_extraccion = args.backend
+    automatizador.procesamiento_aislado = args.procesamiento_aislado
+    automatizador.bloquear_recursos = args.bloquear_recursos
+    if args.importar_chat:
+        if args.proveedor not in automatizador.proveedores:
+            parser.error(f"--proveedor desconocido: {args.proveedor}")
+        dia_primero = {"auto": None, "dia-mes": True, "mes-dia": False}[args.orden_fecha]
+        exito = automatizador.importar_chat_exportado(args.importar_chat, args.proveedor, dia_primero)
+    elif args.sondear_sesion:
+        automatizador.esperar_qr = False
+        exito = automatizador.configurar_navegador()
+        if automatizador.driver:
+            automatizador.driver.quit()
+    elif args.medir_bloqueo:
+        exito = automatizador.comparar_bloqueo_recursos()
+    elif args.daemon:
+        exito = automatizador.ejecutar_daemon(recarga_min=args.recarga_min)
+    elif args.desde:
+        exito = automatizador.procesar_rango(args.desde, args.hasta or datetime.now())
+    elif args.motor == "playwright":
+        exito = automatizador.procesar_con_playwright(leer_perfiles(args.perfiles) if args.perfiles else None)
+    elif args.perfiles:
+        exito = automatizador.procesar_pool_perfiles(leer_perfiles(args.perfiles))
+    else:
+        exito = automatizador.procesar_todos_proveedores(paralelo=args.paralelo)
+    
+    # Códigos de salida para cron: 0 ok, 1 error, SALIDA_REQUIERE_QR si hay que vincular el perfil
+    if automatizador.estado_sesion == "requiere_qr":
+        print(f"📱 Se requiere escanear el QR de WhatsApp Web (código de salida {SALIDA_REQUIERE_QR})")
+        sys.exit(SALIDA_REQUIERE_QR)
+    sys.exit(0 if exito else 1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
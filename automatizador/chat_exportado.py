@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Lectura en streaming de un "Exportar chat" de WhatsApp (.txt o .zip con el .txt adentro)
+Parte el archivo en mensajes con su fecha, hora y remitente sin cargarlo en memoria: solo
+se arma el texto de los mensajes del día pedido y la lectura termina al pasar ese día, así
+que exportaciones de varios años y cientos de MB se recorren con memoria constante.
+
+Formatos reconocidos (Android e iOS, 24 h o a. m./p. m.):
+    14/11/2025, 09:00 - GcGroup: BUEN DIA TE DEJO LA LISTA DE HOY...
+    [14/11/25, 9:00:12 a. m.] GcGroup: BUEN DIA TE DEJO LA LISTA DE HOY...
+"""
+
+import io
+import os
+import re
+import zipfile
+from datetime import datetime
+
+# Encabezado de cada mensaje: fecha, hora, a. m./p. m. opcional y el resto de la línea
+REGEX_ENCABEZADO_EXPORTADO = re.compile(
+    r'^[\u200e\u200f]?\[?(\d{1,2})/(\d{1,2})/(\d{2,4}),?\s+(\d{1,2}):(\d{2})(?::\d{2})?'
+    r'\s*(?:([ap])\.?\s*m\.?)?\]?\s*(?:-\s+)?(.*)$',
+    re.IGNORECASE
+)
+
+
+def parsear_encabezado(linea, dia_primero=True):
+    """(timestamp, remitente, texto) si la línea abre un mensaje; None si es continuación.
+
+    Los avisos del sistema (cifrado, cambios de grupo) no tienen remitente: devuelven remitente None.
+    """
+    if not linea or not (linea[0].isdigit() or linea[0] in '[\u200e\u200f'):
+        return None
+    m = REGEX_ENCABEZADO_EXPORTADO.match(linea)
+    if not m:
+        return None
+    primero, segundo, anio, hora, minuto, meridiano, resto = m.groups()
+    dia, mes = (int(primero), int(segundo)) if dia_primero else (int(segundo), int(primero))
+    hora, anio = int(hora), int(anio)
+    if anio < 100:
+        anio += 2000
+    if meridiano:
+        hora = hora % 12 + (12 if meridiano.lower() == 'p' else 0)
+    try:
+        timestamp = datetime(anio, mes, dia, hora, int(minuto))
+    except ValueError:
+        return None
+    remitente, separador, texto = resto.partition(": ")
+    if not separador or len(remitente) > 60:
+        return timestamp, None, resto
+    return timestamp, remitente.strip('\u200e\u200f '), texto
+
+
+def detectar_dia_primero(ruta):
+    """Deducir el orden de las fechas del archivo: True día/mes, False mes/día, None si no se sabe.
+
+    Android e iOS exportan con el formato de fecha del teléfono ("14/11/25" o "11/14/25"). El
+    orden queda claro en la primera fecha con un número mayor que 12; se deja de leer ahí.
+    """
+    for linea in abrir_lineas(ruta):
+        if not linea or not (linea[0].isdigit() or linea[0] in '[\u200e\u200f'):
+            continue
+        m = REGEX_ENCABEZADO_EXPORTADO.match(linea)
+        if not m:
+            continue
+        primero, segundo = int(m.group(1)), int(m.group(2))
+        if primero > 12 >= segundo:
+            return True
+        if segundo > 12 >= primero:
+            return False
+    return None
+
+
+def abrir_lineas(ruta):
+    """Iterar las líneas del chat exportado: el .txt directo o el primer .txt dentro del .zip"""
+    if zipfile.is_zipfile(ruta):
+        with zipfile.ZipFile(ruta) as archivo_zip:
+            nombres = [n for n in archivo_zip.namelist() if n.lower().endswith(".txt")]
+            if not nombres:
+                raise ValueError(f"{ruta}: el zip no contiene ningún .txt")
+            # iOS lo llama _chat.txt; Android, "Chat de WhatsApp con <contacto>.txt"
+            nombre = next((n for n in nombres if os.path.basename(n) == "_chat.txt"), nombres[0])
+            with archivo_zip.open(nombre) as binario:
+                yield from io.TextIOWrapper(binario, encoding='utf-8-sig', errors='replace')
+        return
+    with open(ruta, 'r', encoding='utf-8-sig', errors='replace') as f:
+        yield from f
+
+
+def leer_mensajes(ruta, fecha=None, dia_primero=True):
+    """Generar los mensajes del chat exportado como {"timestamp", "remitente", "texto"}.
+
+    Con `fecha` (date) solo se arma el texto de los mensajes de ese día y la lectura se
+    corta en el primer mensaje posterior (las exportaciones están en orden cronológico).
+    """
+    actual = None
+    for linea in abrir_lineas(ruta):
+        linea = linea.rstrip('\r\n')
+        encabezado = parsear_encabezado(linea, dia_primero)
+        if encabezado is None:
+            # Continuación del mensaje anterior (las listas ocupan muchas líneas)
+            if actual is not None:
+                actual["lineas"].append(linea)
+            continue
+
+        if actual is not None:
+            yield {"timestamp": actual["timestamp"], "remitente": actual["remitente"],
+                   "texto": "\n".join(actual["lineas"]).strip()}
+            actual = None
+        timestamp, remitente, texto = encabezado
+        if fecha and timestamp.date() > fecha:
+            return
+        if fecha and timestamp.date() < fecha:
+            continue
+        actual = {"timestamp": timestamp, "remitente": remitente, "lineas": [texto]}
+
+    if actual is not None:
+        yield {"timestamp": actual["timestamp"], "remitente": actual["remitente"],
+               "texto": "\n".join(actual["lineas"]).strip()}
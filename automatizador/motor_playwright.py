@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Motor alternativo del automatizador de WhatsApp sobre Playwright asíncrono
+Implementa los mismos pasos que AutomatizadorWSP (abrir el chat, expandir, extraer) con
+locators que esperan solos y los mismos scripts del navegador, pero sin una llamada HTTP
+bloqueante por comando: varias páginas avanzan a la vez en un único event loop.
+
+WhatsApp Web admite una sola pestaña activa por sesión, así que la concurrencia real es
+entre perfiles (un contexto persistente por cuenta) o entre páginas del replay offline.
+El filtrado, el guardado, el archivo y los checkpoints son los de AutomatizadorWSP.
+
+El perfil persistente se abre con el Chrome instalado (channel="chrome"), el mismo que usa
+Selenium: alternar --motor selenium/playwright sobre un mismo perfil no mezcla versiones de
+navegador ni invalida la sesión vinculada. El replay offline usa el Chromium de Playwright.
+
+Requiere: pip install playwright (y, solo para el replay, playwright install chromium)
+
+Uso:
+    python automatizador_wsp_completo.py --motor playwright
+    python automatizador_wsp_completo.py --motor playwright --perfiles perfiles.json
+"""
+
+import os
+import time
+import asyncio
+
+from automatizador_wsp_completo import (
+    JS_ESPERAR_DOM_ESTABLE, JS_EXTRAER_BURBUJAS, JS_EXPANDIR_LEER_MAS, JS_ESTADO_SESION,
+    SELECTORES, SELECTORES_QR, URLS_BLOQUEADAS, IDIOMA_WHATSAPP,
+    parsear_snapshot_burbujas, parsear_pre_plain_text, ruta_perfil_chrome
+)
+
+
+def como_funcion(script, asincrono=False):
+    """Adaptar un script de Selenium (arguments[...] y, si es asíncrono, el callback al final)
+    a una función para page.evaluate, que recibe los argumentos como una lista"""
+    if asincrono:
+        return ("(args) => new Promise((listo) => { (function () {\n" + script +
+                "\n}).apply(null, args.concat([listo])); })")
+    return "(args) => (function () {\n" + script + "\n}).apply(null, args)"
+
+
+FN_ESPERAR_DOM_ESTABLE = como_funcion(JS_ESPERAR_DOM_ESTABLE, asincrono=True)
+FN_EXTRAER_BURBUJAS = como_funcion(JS_EXTRAER_BURBUJAS)
+FN_EXPANDIR_LEER_MAS = como_funcion(JS_EXPANDIR_LEER_MAS, asincrono=True)
+FN_ESTADO_SESION = como_funcion(JS_ESTADO_SESION)
+
+
+class MotorPlaywright:
+    def __init__(self, automatizador, headless=False):
+        # Configuración, reglas de selección, filtros y guardado vienen del automatizador Selenium
+        self.automatizador = automatizador
+        self.headless = headless
+        self.playwright = None
+
+    async def iniciar(self):
+        """Arrancar Playwright (dependencia opcional)"""
+        try:
+            from playwright.async_api import async_playwright
+        except ImportError:
+            print("❌ Playwright no está instalado: pip install playwright")
+            return False
+        self.playwright = await async_playwright().start()
+        return True
+
+    async def cerrar(self):
+        """Detener Playwright"""
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+
+    def xpath(self, objetivo):
+        """Un único locator XPath con todas las alternativas de SELECTORES (primero la ganadora)"""
+        ordenados = self.automatizador.registro_selectores.ordenar(objetivo, SELECTORES[objetivo])
+        return "xpath=" + " | ".join(ordenados)
+
+    async def abrir_contexto(self, user_data_dir):
+        """Chrome instalado con el perfil persistente; con bloquear_recursos corta imágenes y multimedia por CDP"""
+        contexto = await self.playwright.chromium.launch_persistent_context(
+            user_data_dir,
+            channel="chrome",
+            headless=self.headless,
+            no_viewport=True,
+            locale=IDIOMA_WHATSAPP,
+            args=["--start-maximized", "--no-first-run", "--no-default-browser-check",
+                  "--disable-blink-features=AutomationControlled", f"--lang={IDIOMA_WHATSAPP}"]
+        )
+        pagina = contexto.pages[0] if contexto.pages else await contexto.new_page()
+        if self.automatizador.bloquear_recursos:
+            try:
+                cdp = await contexto.new_cdp_session(pagina)
+                await cdp.send("Network.enable")
+                await cdp.send("Network.setBlockedURLs", {"urls": URLS_BLOQUEADAS})
+                print(f"🚫 Bloqueando {len(URLS_BLOQUEADAS)} patrones de URL (imágenes, multimedia y fuentes)")
+            except Exception as e:
+                print(f"⚠️ No se pudieron bloquear recursos por CDP: {e}")
+        return contexto, pagina
+
+    async def sondear_sesion(self, pagina, timeout=60):
+        """Esperar la lista de chats o el QR, lo que aparezca primero (como AutomatizadorWSP.sondear_sesion)"""
+        try:
+            estado = await pagina.wait_for_function(
+                FN_ESTADO_SESION, arg=[SELECTORES["campo_busqueda"], SELECTORES_QR],
+                polling=200, timeout=timeout * 1000
+            )
+            estado = await estado.json_value()
+        except Exception:
+            estado = None
+        if estado == "qr":
+            self.automatizador.estado_sesion = "requiere_qr"
+            print("📱 La sesión de este perfil no está vinculada: hay que escanear el código QR")
+            return False
+        if estado != "sesion":
+            print("❌ WhatsApp Web no terminó de cargar la lista de chats")
+            return False
+        self.automatizador.estado_sesion = self.automatizador.estado_sesion or "sesion"
+        return True
+
+    async def abrir_chat(self, pagina, nombre_proveedor, config):
+        """Abrir el chat del proveedor: primero el título cacheado, después la búsqueda flexible"""
+        automatizador = self.automatizador
+        titulo_cacheado = automatizador.leer_cache_chats().get(config["nombre_corto"], {}).get("titulo")
+        nombres_a_probar = [nombre_proveedor] + config.get("busqueda_alternativa", [])
+        if titulo_cacheado:
+            nombres_a_probar.insert(0, titulo_cacheado)
+
+        campo = pagina.locator(self.xpath("campo_busqueda")).first
+        for i, nombre_busqueda in enumerate(nombres_a_probar):
+            cacheado = bool(titulo_cacheado) and i == 0
+            await campo.fill(nombre_busqueda)
+            # El primer título de la barra lateral que coincida (exacto si viene de la caché)
+            try:
+                titulo = await (await pagina.wait_for_function(
+                    """([buscado, alternativas, exacto]) => {
+                        var spans = document.querySelectorAll('#pane-side span[title]');
+                        for (var i = 0; i < spans.length; i++) {
+                            var titulo = spans[i].getAttribute('title');
+                            if (exacto ? titulo === buscado : titulo.toLowerCase().indexOf(buscado.toLowerCase()) !== -1 ||
+                                alternativas.some(function (alt) { return titulo.toLowerCase().indexOf(alt.toLowerCase()) !== -1; })) {
+                                return titulo;
+                            }
+                        }
+                        return null;
+                    }""",
+                    arg=[nombre_busqueda, config.get("busqueda_alternativa", []), cacheado],
+                    polling=250, timeout=3000
+                )).json_value()
+            except Exception:
+                titulo = None
+
+            abierto = False
+            if titulo:
+                try:
+                    await pagina.locator("#pane-side").get_by_title(titulo, exact=True).first.click()
+                    await pagina.locator("#main header").filter(has_text=titulo).wait_for(timeout=10000)
+                    abierto = True
+                except Exception as e:
+                    print(f"   ⚠️ No se pudo abrir '{titulo}': {type(e).__name__}")
+            if cacheado:
+                automatizador.actualizar_cache_chat(config, titulo if abierto else None, acierto=abierto)
+                if not abierto:
+                    print("   🔄 El chat cacheado no apareció: búsqueda completa")
+            if not abierto:
+                continue
+
+            if not cacheado:
+                automatizador.actualizar_cache_chat(config, titulo)
+            print(f"✅ Chat abierto: {titulo}")
+            return True
+        print(f"❌ No se encontró ningún chat para: {nombre_proveedor}")
+        return False
+
+    async def ir_al_final(self, pagina):
+        """Ir a los mensajes más recientes y esperar a que el panel deje de mutar"""
+        contenedor = await pagina.locator(self.xpath("contenedor_chat")).first.element_handle(timeout=10000)
+        await contenedor.evaluate("c => { c.scrollTop = c.scrollHeight; }")
+        await pagina.evaluate(FN_ESPERAR_DOM_ESTABLE, [contenedor, 300, 5000])
+
+    async def extraer_burbujas(self, pagina, solo_id=None):
+        """Mismos registros que AutomatizadorWSP.extraer_burbujas (backend js o cdp)"""
+        registros = None
+        if self.automatizador.backend_extraccion == "cdp" and not solo_id:
+            try:
+                cdp = await pagina.context.new_cdp_session(pagina)
+                registros = parsear_snapshot_burbujas(
+                    await cdp.send("DOMSnapshot.captureSnapshot", {"computedStyles": []})
+                )
+                await cdp.detach()
+            except Exception as e:
+                print(f"   ⚠️ DOMSnapshot no disponible ({type(e).__name__}), usando evaluate")
+        if registros is None:
+            registros = await pagina.evaluate(FN_EXTRAER_BURBUJAS, [solo_id, None]) or []
+        for registro in registros:
+            registro["timestamp"], registro["remitente"] = parsear_pre_plain_text(registro.get("pre"), self.automatizador.dia_primero)
+        return registros
+
+    async def expandir_leer_mas(self, pagina, data_ids=None, contiene=None, timeout=10):
+        """Expandir los "Leer más" en una sola pasada del navegador (JS_EXPANDIR_LEER_MAS)"""
+        resumen = await pagina.evaluate(FN_EXPANDIR_LEER_MAS, [data_ids, contiene, timeout * 1000])
+        if resumen["encontrados"]:
+            print(f"   📖 {resumen['expandidos']}/{resumen['encontrados']} mensajes expandidos en {resumen['ms']}ms")
+        return resumen
+
+    async def buscar_mensaje_objetivo(self, pagina):
+        """La burbuja más reciente que cumple es_mensaje_objetivo, expandida si estaba recortada"""
+        await self.ir_al_final(pagina)
+        await self.expandir_leer_mas(pagina)
+        candidatas = [
+            burbuja for burbuja in await self.extraer_burbujas(pagina)
+            if self.automatizador.es_mensaje_objetivo(burbuja)
+        ]
+        if not candidatas:
+            return None
+        burbuja = candidatas[-1]
+        if burbuja["truncado"]:
+            await self.expandir_leer_mas(pagina, data_ids=[burbuja["data_id"]], timeout=15)
+            actualizada = await self.extraer_burbujas(pagina, solo_id=burbuja["data_id"])
+            if actualizada and len(actualizada[0]["texto"]) > len(burbuja["texto"]):
+                burbuja = actualizada[0]
+        return burbuja
+
+    async def procesar_proveedor(self, pagina, nombre_proveedor, config):
+        """Abrir, extraer, filtrar y guardar un proveedor (mismo resultado que procesar_proveedor)"""
+        automatizador = self.automatizador
+        print(f"🏪 [Playwright] PROCESANDO: {nombre_proveedor}")
+        try:
+            with automatizador.traza.fase("pw_buscar_y_abrir_chat", proveedor=nombre_proveedor):
+                if not await self.abrir_chat(pagina, nombre_proveedor, config):
+                    return False
+            # Checkpoint rápido: la última burbuja sin expandir, antes de buscar nada (ver chat_sin_cambios)
+            await self.ir_al_final(pagina)
+            burbujas = await self.extraer_burbujas(pagina)
+            ultima = burbujas[-1] if burbujas else None
+            if automatizador.chat_sin_cambios(config, ultima):
+                print(f"⏭️  {nombre_proveedor} sin mensajes nuevos desde la última corrida - se conserva {config['archivo_salida']}")
+                automatizador.proveedores_sin_cambios.add(nombre_proveedor)
+                return True
+            with automatizador.traza.fase("pw_extraccion", proveedor=nombre_proveedor):
+                burbuja = await self.buscar_mensaje_objetivo(pagina)
+        except Exception as e:
+            print(f"❌ [Playwright] Error procesando {nombre_proveedor}: {e}")
+            return False
+        if not burbuja:
+            print(f"⏭️  SALTANDO {nombre_proveedor}: No tiene mensaje objetivo de hoy")
+            return False
+
+        # Desde acá todo es sincrónico (sin await): burbuja_objetivo no se mezcla entre perfiles
+        automatizador.burbuja_objetivo = burbuja
+        if automatizador.mensaje_sin_cambios(config):
+            print(f"⏭️  {nombre_proveedor} sin cambios desde la última corrida - se conserva {config['archivo_salida']}")
+            automatizador.proveedores_sin_cambios.add(nombre_proveedor)
+            return True
+        mensajes = automatizador.filtrar_mensajes_del_dia([burbuja["texto"]], config["filtro_inicio"])
+        exito = automatizador.guardar_archivo_txt(mensajes, config["archivo_salida"], nombre_proveedor)
+        if exito and mensajes:
+            automatizador.textos_extraidos[nombre_proveedor] = mensajes
+            automatizador.archivar_mensajes(config, mensajes)
+            automatizador.registrar_checkpoint(nombre_proveedor, config, ultima)
+        return exito
+
+    async def procesar_perfil(self, nombre_perfil, user_data_dir, proveedores):
+        """Un perfil: abrir WhatsApp Web y recorrer sus proveedores en la misma pestaña"""
+        resultados = {nombre: False for nombre in proveedores}
+        contexto = None
+        try:
+            print(f"📁 [{nombre_perfil}] Usando perfil: {user_data_dir}")
+            contexto, pagina = await self.abrir_contexto(user_data_dir)
+            inicio = time.time()
+            await pagina.goto("https://web.whatsapp.com")
+            if not await self.sondear_sesion(pagina):
+                return resultados
+            print(f"✅ [{nombre_perfil}] WhatsApp Web listo en {time.time() - inicio:.2f}s")
+            for nombre_proveedor in proveedores:
+                resultados[nombre_proveedor] = await self.procesar_proveedor(
+                    pagina, nombre_proveedor, self.automatizador.proveedores[nombre_proveedor]
+                )
+        except Exception as e:
+            print(f"❌ [{nombre_perfil}] Error procesando el perfil: {e}")
+        finally:
+            if contexto:
+                await contexto.close()
+                print(f"🔒 [{nombre_perfil}] Navegador cerrado")
+        return resultados
+
+    async def procesar(self, perfiles=None, proveedores=None):
+        """Procesar todos los perfiles a la vez (formato de leer_perfiles); sin perfiles, el perfil por defecto.
+
+        Devuelve {proveedor: éxito}, o None si Playwright no está disponible.
+        """
+        if not await self.iniciar():
+            return None
+        try:
+            if perfiles:
+                tareas = [
+                    self.procesar_perfil(
+                        nombre_perfil,
+                        ruta_perfil_chrome(perfil.get("perfil", nombre_perfil), perfil.get("user_data_dir")),
+                        perfil["proveedores"]
+                    )
+                    for nombre_perfil, perfil in perfiles.items()
+                ]
+            else:
+                ruta = ruta_perfil_chrome(self.automatizador.perfil, self.automatizador.user_data_dir)
+                tareas = [self.procesar_perfil("principal", ruta, proveedores or ["GcGroup"])]
+            resultados = {}
+            for parcial in await asyncio.gather(*tareas):
+                resultados.update(parcial)
+            return resultados
+        finally:
+            await self.cerrar()
+
+    async def reproducir(self, rutas):
+        """Replay offline en Chromium headless: carga, mensaje objetivo y filtro de cada página.
+
+        Mide dos cosas por separado: la latencia de cada página corriendo sola y el tiempo de
+        pared de todas las páginas a la vez en el event loop.
+        Devuelve ({ruta: {"ms", "caracteres"}}, ms de pared concurrente) o None sin Playwright.
+        """
+        if not await self.iniciar():
+            return None
+        navegador = await self.playwright.chromium.launch(headless=True)
+        try:
+            async def una_pagina(ruta):
+                pagina = await navegador.new_page(viewport={"width": 1280, "height": 900})
+                inicio = time.perf_counter()
+                await pagina.goto("file://" + os.path.abspath(ruta))
+                burbuja = await self.buscar_mensaje_objetivo(pagina)
+                texto = burbuja["texto"] if burbuja else ""
+                self.automatizador.filtrar_mensajes_del_dia([texto] if texto else [], ["lista de hoy"])
+                ms = (time.perf_counter() - inicio) * 1000
+                await pagina.close()
+                return ruta, {"ms": ms, "caracteres": len(texto)}
+
+            por_pagina = {}
+            for ruta in rutas:
+                ruta, medicion = await una_pagina(ruta)
+                por_pagina[ruta] = medicion
+
+            inicio = time.perf_counter()
+            await asyncio.gather(*(una_pagina(ruta) for ruta in rutas))
+            return por_pagina, (time.perf_counter() - inicio) * 1000
+        finally:
+            await navegador.close()
+            await self.cerrar()
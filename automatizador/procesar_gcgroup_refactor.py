@@ -556,6 +556,16 @@ def main():
         print(f"ERROR Error leyendo archivo: {e}")
         return False
     
+    return procesar_texto(contenido, procesador)
+
+def procesar_texto(contenido, procesador=None):
+    """Procesar el texto de una lista de GCGroup y generar el JSON y el archivo de difusión.
+
+    Lo usa main() después de leer output/lista_gcgroup.txt, y el automatizador de WhatsApp
+    directamente con el texto recién extraído (sin escribirlo y releerlo del disco).
+    """
+    procesador = procesador or ProcesadorGCGroup()
+    
     # Procesar productos
     productos = procesador.extraer_productos_del_texto(contenido)
     
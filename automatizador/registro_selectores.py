@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro central de selectores para el automatizador de WhatsApp
+Recuerda, por cada objetivo lógico (contenedor del chat, campo de búsqueda, ...),
+qué selector funcionó la última vez y cuántas veces acertó cada uno.
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+
+class RegistroSelectores:
+    def __init__(self, ruta="output/selectores_wsp.json"):
+        self.ruta = ruta
+        self.lock = threading.Lock()
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                self.datos = json.load(f)
+        except (OSError, ValueError):
+            self.datos = {}
+
+    def ordenar(self, objetivo, selectores):
+        """Ordenar los selectores: primero el último ganador, después por cantidad de aciertos"""
+        info = self.datos.get(objetivo, {})
+        ganador = info.get("ganador")
+        estadisticas = info.get("selectores", {})
+        return sorted(
+            selectores,
+            key=lambda sel: (sel != ganador, -estadisticas.get(sel, {}).get("aciertos", 0))
+        )
+
+    def registrar(self, objetivo, selector, acerto):
+        """Sumar un acierto o un fallo a un selector"""
+        with self.lock:
+            info = self.datos.setdefault(objetivo, {"ganador": None, "selectores": {}})
+            estadistica = info["selectores"].setdefault(
+                selector, {"aciertos": 0, "fallos": 0, "fallos_seguidos": 0, "ultimo_acierto": None}
+            )
+            if acerto:
+                estadistica["aciertos"] += 1
+                estadistica["fallos_seguidos"] = 0
+                estadistica["ultimo_acierto"] = datetime.now().isoformat(timespec='seconds')
+                info["ganador"] = selector
+            else:
+                estadistica["fallos"] += 1
+                estadistica["fallos_seguidos"] = estadistica.get("fallos_seguidos", 0) + 1
+
+    def fusionar(self, datos):
+        """Incorporar el ranking de otro proceso (pool de perfiles).
+
+        Por selector se queda la estadística con más intentos; el ganador pasa a ser el del
+        otro proceso si acertó más recientemente.
+        """
+        with self.lock:
+            for objetivo, info in datos.items():
+                propio = self.datos.setdefault(objetivo, {"ganador": None, "selectores": {}})
+                for selector, estadistica in info.get("selectores", {}).items():
+                    actual = propio["selectores"].get(selector)
+                    if not actual or estadistica["aciertos"] + estadistica["fallos"] > actual["aciertos"] + actual["fallos"]:
+                        propio["selectores"][selector] = estadistica
+
+                def ultimo_acierto(selector):
+                    return propio["selectores"].get(selector, {}).get("ultimo_acierto") or ""
+
+                ganador = info.get("ganador")
+                if ganador and (not propio["ganador"] or ultimo_acierto(ganador) >= ultimo_acierto(propio["ganador"])):
+                    propio["ganador"] = ganador
+
+    def buscar(self, driver, objetivo, selectores, timeout=5, timeout_ganador=1, por=By.XPATH):
+        """Buscar un elemento probando primero el selector ganador con un plazo corto.
+
+        Si el ganador no aparece, se prueban todos los selectores en cada sondeo hasta
+        que alguno coincida o venza el plazo total (nunca un plazo completo por selector).
+        Devuelve (elemento, selector) o (None, None).
+        """
+        ordenados = self.ordenar(objetivo, selectores)
+        inicio = time.time()
+
+        def primer_coincidente(candidatos):
+            def condicion(d):
+                for selector in candidatos:
+                    elementos = d.find_elements(por, selector)
+                    if elementos:
+                        return elementos[0], selector
+                return None
+            return condicion
+
+        resultado = None
+        for candidatos, plazo in ((ordenados[:1], timeout_ganador), (ordenados, timeout - timeout_ganador)):
+            try:
+                resultado = WebDriverWait(driver, max(plazo, 0.1), poll_frequency=0.1).until(primer_coincidente(candidatos))
+                break
+            except TimeoutException:
+                continue
+
+        if resultado:
+            elemento, selector = resultado
+            for anterior in ordenados[:ordenados.index(selector)]:
+                self.registrar(objetivo, anterior, False)
+            self.registrar(objetivo, selector, True)
+            print(f"   🧭 '{objetivo}' → {selector} ({time.time() - inicio:.2f}s)")
+            return elemento, selector
+
+        for selector in ordenados:
+            self.registrar(objetivo, selector, False)
+        print(f"   🧭 '{objetivo}': ningún selector coincidió ({time.time() - inicio:.2f}s)")
+        return None, None
+
+    def selectores_obsoletos(self, min_fallos=3):
+        """Selectores que fallaron al menos `min_fallos` veces seguidas desde su último acierto.
+
+        Incluye los que ganaban y dejaron de coincidir (el caso típico de un cambio en el DOM
+        de WhatsApp). Los registros viejos sin "fallos_seguidos" cuentan sus fallos si nunca acertaron.
+        """
+        obsoletos = []
+        for objetivo, info in self.datos.items():
+            for selector, estadistica in info.get("selectores", {}).items():
+                seguidos = estadistica.get(
+                    "fallos_seguidos", estadistica["fallos"] if estadistica["aciertos"] == 0 else 0
+                )
+                if seguidos >= min_fallos:
+                    obsoletos.append((objetivo, selector, seguidos, estadistica.get("ultimo_acierto")))
+        return obsoletos
+
+    def reportar(self):
+        """Mostrar el ranking de cada objetivo y los selectores que dejaron de coincidir"""
+        print("🧭 RANKING DE SELECTORES")
+        for objetivo, info in self.datos.items():
+            print(f"   {objetivo}: ganador = {info.get('ganador')}")
+            for selector, estadistica in info.get("selectores", {}).items():
+                intentos = estadistica["aciertos"] + estadistica["fallos"]
+                print(f"     • {estadistica['aciertos']}/{intentos} aciertos  {selector}")
+        for objetivo, selector, fallos, ultimo_acierto in self.selectores_obsoletos():
+            desde = f"último acierto {ultimo_acierto}" if ultimo_acierto else "nunca acertó"
+            print(f"   ⚠️ Selector sin coincidencias ({fallos} fallos seguidos, {desde}) para '{objetivo}': {selector}")
+
+    def guardar(self):
+        """Persistir el ranking para la próxima corrida"""
+        with self.lock:
+            try:
+                os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+                with open(self.ruta, 'w', encoding='utf-8') as f:
+                    json.dump(self.datos, f, indent=2, ensure_ascii=False)
+            except OSError as e:
+                print(f"⚠️ No se pudo guardar el registro de selectores: {e}")
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Replay offline del automatizador de WhatsApp
+Ejecuta extraer_burbujas (backends js y cdp), buscar_mensaje_objetivo_hoy, las rutinas de expansión y filtrar_mensajes_del_dia
+en Chrome headless contra páginas guardadas (capturas de --capturar-dom) o chats
+sintéticos de 10, 100 y 1000 mensajes, y reporta latencia y llamadas a WebDriver por fase.
+
+Uso:
+    python replay_wsp.py                       # chats sintéticos de 10, 100 y 1000 mensajes
+    python replay_wsp.py --mensajes 50 500     # tamaños a medida
+    python replay_wsp.py --ventana 40          # solo 40 mensajes en el DOM; el resto al subir
+    python replay_wsp.py --html output/capturas/chat_gcgroup_20251114_090000.html
+    python replay_wsp.py --comparar-motores    # latencia de extremo a extremo Selenium vs Playwright
+"""
+
+import io
+import os
+import sys
+import time
+import html
+import asyncio
+import argparse
+import contextlib
+from datetime import datetime, timedelta
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+from automatizador_wsp_completo import AutomatizadorWSP, formatear_fecha, contar_llamadas_webdriver
+
+PRODUCTOS_SINTETICOS = [
+    ("► IPHONE NEW", ["IPHONE 15 128GB", "IPHONE 15 PRO 256GB", "IPHONE 16 128GB", "IPHONE 16 PRO MAX 256GB"]),
+    ("► SAMSUNG - GTIA 3 MESES", ["SAMSUNG A06 64GB", "SAMSUNG A16 128GB", "SAMSUNG S24 256GB"]),
+    ("► MOTOROLA", ["MOTOROLA G15 128GB", "MOTOROLA G35 256GB", "MOTOROLA EDGE 50 FUSION"]),
+    ("► INFINIX", ["INFINIX HOT 50 PRO+", "INFINIX NOTE 50 PRO NFC"]),
+]
+
+# Script de la página sintética: "Leer más" reemplaza el texto recortado por el completo
+# después de la latencia simulada, igual que WhatsApp Web
+JS_PAGINA = """
+document.addEventListener('click', function (evento) {
+    var boton = evento.target.closest('.read-more-button');
+    if (!boton) return;
+    var cuerpo = boton.parentElement.querySelector('.selectable-text');
+    setTimeout(function () {
+        cuerpo.textContent = cuerpo.getAttribute('data-completo');
+        boton.remove();
+    }, window.LATENCIA_MS);
+});
+"""
+
+# Historial virtualizado: como WhatsApp Web, la página arranca con las últimas filas y, al
+# llegar arriba del panel, inserta el bloque anterior (después de la latencia simulada)
+JS_HISTORIAL = """
+(function () {
+    var panel = document.querySelector('[data-testid="conversation-panel-messages"]');
+    var historial = document.getElementById('historial');
+    var cargando = false;
+    function cargarBloque() {
+        if (cargando || !historial.content.childElementCount) return;
+        cargando = true;
+        setTimeout(function () {
+            var fragmento = document.createDocumentFragment();
+            for (var k = 0; k < window.BLOQUE_HISTORIAL && historial.content.lastElementChild; k++) {
+                fragmento.insertBefore(historial.content.lastElementChild, fragmento.firstChild);
+            }
+            var alto = panel.scrollHeight;
+            panel.insertBefore(fragmento, panel.firstChild);
+            panel.scrollTop += panel.scrollHeight - alto;
+            cargando = false;
+            if (panel.scrollHeight <= panel.clientHeight) cargarBloque();
+        }, window.LATENCIA_MS);
+    }
+    panel.addEventListener('scroll', function () {
+        if (panel.scrollTop < 50) cargarBloque();
+    });
+    if (panel.scrollHeight <= panel.clientHeight) cargarBloque();
+})();
+"""
+
+
+def texto_lista_precios(fecha, variante=0):
+    """Lista de precios sintética con el encabezado que busca el automatizador"""
+    lineas = [f"BUEN DIA TE DEJO LA LISTA DE HOY {formatear_fecha(fecha)}", ""]
+    for categoria, productos in PRODUCTOS_SINTETICOS:
+        lineas.append(categoria)
+        for j, producto in enumerate(productos):
+            lineas.append(f"{producto} - $ {300 + 25 * j + variante}")
+        lineas.append("")
+    lineas.append("ACEPTAMOS USDT - NO TOMAMOS EQUIPOS")
+    return "\n".join(lineas)
+
+
+def texto_lista_colores():
+    """Lista de disponibilidad (sin precios) que el filtro debe descartar"""
+    lineas = ["LISTA DE MODELOS Y COLORES DEL DÍA 📱👇🏻📱"]
+    for _, productos in PRODUCTOS_SINTETICOS:
+        lineas.extend(f"{producto} NEGRO / AZUL / BLANCO" for producto in productos)
+    return "\n".join(lineas)
+
+
+def generar_chat_sintetico(cantidad, fecha, ruta, latencia_ms=150, ventana=None):
+    """Generar una página que imita el panel de conversación de WhatsApp Web.
+
+    Los mensajes se reparten en días hasta la fecha objetivo; cada mensaje largo se
+    muestra recortado con su "Leer más", y el último es la lista de precios del día.
+    Con `ventana` solo las últimas filas están en el DOM al cargar; las anteriores se
+    insertan de a bloques al subir (JS_HISTORIAL).
+    """
+    filas = []
+    dia_anterior = None
+    for i in range(cantidad):
+        dias_atras = (cantidad - 1 - i) * 3 // max(cantidad, 1)
+        momento = datetime(fecha.year, fecha.month, fecha.day, 9, 0) - timedelta(days=dias_atras, minutes=cantidad - i)
+        if momento.date() != dia_anterior:
+            etiqueta = "Hoy" if momento.date() == fecha.date() else momento.strftime("%d/%m/%Y")
+            filas.append(f'<div class="focusable-list-item"><span dir="auto">{etiqueta}</span></div>')
+            dia_anterior = momento.date()
+
+        if i == cantidad - 1:
+            texto = texto_lista_precios(momento)
+        elif i % 10 == 5:
+            texto = texto_lista_colores()
+        elif i % 10 == 7:
+            texto = texto_lista_precios(momento, variante=i)
+        else:
+            texto = f"Mensaje {i + 1}: consulta de stock y envíos"
+
+        recortado = len(texto) > 300
+        visible = texto[:300] + "…" if recortado else texto
+        pre = f"[{momento.strftime('%H:%M, %d/%m/%Y')}] GcGroup: "
+        boton = '<div role="button" class="read-more-button">Leer más</div>' if recortado else ''
+        filas.append(
+            f'<div role="row"><div data-id="false_5491100000000@c.us_SINT{i:05d}" class="message-in">'
+            f'<div class="copyable-text" data-pre-plain-text="{html.escape(pre)}">'
+            f'<span class="selectable-text copyable-text" dir="ltr" data-completo="{html.escape(texto)}">'
+            f'{html.escape(visible)}</span>{boton}</div></div></div>'
+        )
+
+    ocultas = len(filas) - ventana if ventana and len(filas) > ventana else 0
+    historial, visibles = filas[:ocultas], filas[ocultas:]
+
+    pagina = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>WhatsApp replay ({cantidad} mensajes)</title>
+<style>
+body {{ margin: 0; font-family: sans-serif; }}
+#main {{ display: flex; flex-direction: column; height: 100vh; }}
+[data-testid="conversation-panel-messages"] {{ flex: 1; overflow-y: auto; }}
+.selectable-text {{ white-space: pre-wrap; }}
+.message-in {{ margin: 6px; padding: 6px; background: #eee; }}
+</style></head>
+<body>
+<div id="side"><div contenteditable="true" data-tab="3"></div><span title="GcGroup">GcGroup</span></div>
+<div id="main">
+<header><span title="GcGroup">GcGroup</span></header>
+<div data-testid="conversation-panel-messages" class="copyable-area">
+{chr(10).join(visibles)}
+</div>
+</div>
+<template id="historial">{chr(10).join(historial)}</template>
+<script>window.LATENCIA_MS = {latencia_ms}; window.BLOQUE_HISTORIAL = 20;{JS_PAGINA}{JS_HISTORIAL}</script>
+</body></html>
+"""
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write(pagina)
+    return ruta
+
+
+def crear_driver_headless(automatizador):
+    """Chrome headless sin perfil, con el mismo chromedriver que usa el automatizador"""
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1280,900")
+    ruta_driver = automatizador.resolver_chromedriver()
+    driver = webdriver.Chrome(service=Service(ruta_driver) if ruta_driver else Service(), options=options)
+    driver.set_script_timeout(60)
+    return contar_llamadas_webdriver(driver)
+
+
+def medir(fases, nombre, driver, funcion, verbose=False):
+    """Ejecutar una fase y registrar su latencia y la cantidad de llamadas a WebDriver"""
+    llamadas_antes = driver.llamadas_webdriver
+    salida = io.StringIO()
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stdout if verbose else salida):
+        resultado = funcion()
+    fases.append({
+        "fase": nombre,
+        "ms": (time.perf_counter() - inicio) * 1000,
+        "llamadas": driver.llamadas_webdriver - llamadas_antes
+    })
+    return resultado
+
+
+def reproducir(automatizador, driver, ruta_html, verbose=False):
+    """Correr las fases del automatizador contra una página guardada"""
+    fases = []
+    url = "file://" + os.path.abspath(ruta_html)
+    automatizador.driver = driver
+
+    medir(fases, "carga", driver, lambda: driver.get(url), verbose)
+    # Los dos backends de extracción sobre la misma página: deben devolver los mismos textos
+    backend_original = automatizador.backend_extraccion
+    textos_por_backend = {}
+    for backend in ("js", "cdp"):
+        automatizador.backend_extraccion = backend
+        burbujas = medir(fases, f"extraer_burbujas ({backend})", driver, automatizador.extraer_burbujas, verbose)
+        textos_por_backend[backend] = [b["texto"] for b in burbujas]
+    automatizador.backend_extraccion = backend_original
+    backends_coinciden = textos_por_backend["js"] == textos_por_backend["cdp"]
+
+    texto = medir(fases, "buscar_mensaje_objetivo_hoy", driver, automatizador.buscar_mensaje_objetivo_hoy, verbose)
+
+    # Las rutinas de expansión se miden sobre la página recién cargada
+    driver.get(url)
+    medir(fases, "expandir_todos_los_mensajes_hoy", driver, automatizador.expandir_todos_los_mensajes_hoy, verbose)
+    textos = medir(fases, "extraer_mensajes_fallback", driver, automatizador.extraer_mensajes_fallback, verbose)
+    medir(fases, "recorrer_mensajes (chat completo)", driver,
+          lambda: list(automatizador.recorrer_mensajes(max_mensajes=None)), verbose)
+    filtrados = medir(fases, "filtrar_mensajes_del_dia", driver,
+                      lambda: automatizador.filtrar_mensajes_del_dia(textos, ["lista de hoy"]), verbose)
+    return fases, texto, filtrados, backends_coinciden
+
+
+def mostrar_reporte(titulo, fases, texto, filtrados, backends_coinciden):
+    """Imprimir la tabla de latencia y llamadas por fase"""
+    print(f"\n📊 {titulo}")
+    print(f"   {'fase':<34}{'ms':>10}{'llamadas':>10}")
+    for fase in fases:
+        print(f"   {fase['fase']:<34}{fase['ms']:>10.1f}{fase['llamadas']:>10}")
+    print(f"   {'TOTAL':<34}{sum(f['ms'] for f in fases):>10.1f}{sum(f['llamadas'] for f in fases):>10}")
+    estado = f"✅ {len(texto)} caracteres" if texto else "❌ no encontrado"
+    print(f"   Mensaje objetivo: {estado} | Mensajes que pasan el filtro: {len(filtrados)}")
+    print(f"   Backends js/cdp: {'✅ mismos textos' if backends_coinciden else '❌ los textos difieren'}")
+
+
+def extremo_a_extremo_selenium(automatizador, driver, ruta):
+    """Los mismos pasos que mide MotorPlaywright.reproducir, con Selenium y sobre la página recién cargada:
+    carga, mensaje objetivo y filtro de ese único texto"""
+    automatizador.driver = driver
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        driver.get("file://" + os.path.abspath(ruta))
+        texto = automatizador.buscar_mensaje_objetivo_hoy() or ""
+        automatizador.filtrar_mensajes_del_dia([texto] if texto else [], ["lista de hoy"])
+        ms = (time.perf_counter() - inicio) * 1000
+    return {"ms": ms, "caracteres": len(texto)}
+
+
+def comparar_motores(automatizador, paginas, selenium):
+    """Latencia de extremo a extremo (carga, mensaje objetivo, filtro) de Selenium contra Playwright.
+
+    La latencia por página se mide con cada página sola en los dos motores. El tiempo de pared
+    se informa aparte: Selenium recorre las páginas una tras otra con un único driver y
+    Playwright las abre todas a la vez en un event loop.
+    """
+    from motor_playwright import MotorPlaywright
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = asyncio.run(MotorPlaywright(automatizador, headless=True).reproducir([ruta for _, ruta in paginas]))
+    if resultado is None:
+        print("\n❌ Playwright no está instalado: pip install playwright && playwright install chromium")
+        return
+    playwright, pared_ms = resultado
+    print("\n🏁 SELENIUM vs PLAYWRIGHT (carga + mensaje objetivo + filtro)")
+    print(f"   {'página (latencia, de a una)':<44}{'selenium ms':>14}{'playwright ms':>16}")
+    for titulo, ruta in paginas:
+        coinciden = "" if selenium[ruta]["caracteres"] == playwright[ruta]["caracteres"] else "  ⚠️ textos distintos"
+        print(f"   {titulo:<44}{selenium[ruta]['ms']:>14.1f}{playwright[ruta]['ms']:>16.1f}{coinciden}")
+    print(f"   {'SUMA de latencias':<44}{sum(m['ms'] for m in selenium.values()):>14.1f}"
+          f"{sum(m['ms'] for m in playwright.values()):>16.1f}")
+    print(f"   Tiempo de pared de todas las páginas: Selenium secuencial {sum(m['ms'] for m in selenium.values()):.1f} ms"
+          f" | Playwright concurrente {pared_ms:.1f} ms")
+
+
+def main():
+    """Función principal del replay"""
+    parser = argparse.ArgumentParser(description="Replay offline del automatizador de WhatsApp")
+    parser.add_argument("--html", nargs="*", default=[], help="Páginas capturadas con --capturar-dom")
+    parser.add_argument("--mensajes", nargs="*", type=int, default=[10, 100, 1000],
+                        help="Tamaños de los chats sintéticos")
+    parser.add_argument("--fecha", help="Fecha objetivo AAAA-MM-DD (por defecto hoy)")
+    parser.add_argument("--ventana", type=int,
+                        help="Filas presentes en el DOM al cargar (el resto se inserta al subir, como WhatsApp)")
+    parser.add_argument("--latencia-ms", type=int, default=150,
+                        help="Demora simulada de WhatsApp al expandir un 'Leer más'")
+    parser.add_argument("--backend", choices=["js", "cdp"], default="js",
+                        help="Backend de extracción para el resto de las fases")
+    parser.add_argument("--comparar-motores", action="store_true",
+                        help="Repetir las páginas con el motor de Playwright y comparar la latencia")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar la salida completa del automatizador")
+    args = parser.parse_args()
+
+    fecha = datetime.strptime(args.fecha, "%Y-%m-%d") if args.fecha else datetime.now()
+    automatizador = AutomatizadorWSP(fecha_objetivo=fecha)
+    automatizador.backend_extraccion = args.backend
+
+    print("🎬 REPLAY OFFLINE DEL AUTOMATIZADOR DE WHATSAPP")
+    print("=" * 50)
+    driver = crear_driver_headless(automatizador)
+    try:
+        paginas = [(f"Captura {os.path.basename(ruta)}", ruta) for ruta in args.html]
+        if not args.html:
+            for cantidad in args.mensajes:
+                ruta = generar_chat_sintetico(cantidad, fecha, f"output/replay/chat_{cantidad}.html",
+                                              args.latencia_ms, args.ventana)
+                paginas.append((f"Chat sintético de {cantidad} mensajes", ruta))
+
+        for titulo, ruta in paginas:
+            fases, texto, filtrados, backends_coinciden = reproducir(automatizador, driver, ruta, args.verbose)
+            mostrar_reporte(titulo, fases, texto, filtrados, backends_coinciden)
+        selenium = {ruta: extremo_a_extremo_selenium(automatizador, driver, ruta)
+                    for _, ruta in paginas} if args.comparar_motores else None
+    finally:
+        driver.quit()
+    
+    if args.comparar_motores:
+        comparar_motores(automatizador, paginas, selenium)
+
+
+if __name__ == "__main__":
+    main()
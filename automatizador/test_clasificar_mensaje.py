@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""clasificar_mensaje conserva los criterios del filtro de listas original"""
+
+from automatizador_wsp_completo import clasificar_mensaje
+
+
+def test_lista_de_precios_con_encabezado():
+    texto = "BUEN DIA TE DEJO LA LISTA DE HOY\nIPHONE 15 128GB - $ 800\nSAMSUNG A06 - $ 120"
+    assert clasificar_mensaje(texto)["etiqueta"] == "lista_precios"
+
+
+def test_lista_de_hoy_sola_no_es_encabezado_de_precios():
+    assert clasificar_mensaje("LISTA DE HOY\nIPHONE 15 - $ 800")["etiqueta"] == "otro"
+
+
+def test_disponibilidad_cuenta_productos_de_mas_de_10_caracteres():
+    # Seis líneas con marca pero de 10 caracteres o menos: no alcanza para lista de disponibilidad
+    cortas = "\n".join(["IPHONE 15"] * 6)
+    assert clasificar_mensaje(cortas)["etiqueta"] == "otro"
+    largas = "\n".join(["IPHONE 15 128GB"] * 6)
+    assert clasificar_mensaje(largas)["etiqueta"] == "lista_disponibilidad"
+
+
+def test_exclusion_por_colores():
+    texto = "LISTA DE PRECIOS - MODELOS Y COLORES\nIPHONE 15 - $ 800"
+    assert clasificar_mensaje(texto)["etiqueta"] == "lista_disponibilidad"
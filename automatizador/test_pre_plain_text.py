@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Parseo de data-pre-plain-text en los dos órdenes de fecha que usa WhatsApp Web"""
+
+from datetime import datetime
+
+from automatizador_wsp_completo import parsear_pre_plain_text
+
+
+def test_dia_primero_es_ar():
+    assert parsear_pre_plain_text("[10:32, 14/11/2025] GcGroup: ") == (datetime(2025, 11, 14, 10, 32), "GcGroup")
+    assert parsear_pre_plain_text("[10:32, 11/5/2025] GcGroup: ") == (datetime(2025, 5, 11, 10, 32), "GcGroup")
+
+
+def test_mes_primero_en_us():
+    assert parsear_pre_plain_text("[10:32 AM, 11/5/2025] GcGroup: ", dia_primero=False) == \
+        (datetime(2025, 11, 5, 10, 32), "GcGroup")
+    assert parsear_pre_plain_text("[3:05 PM, 11/14/25] GcGroup: ", dia_primero=False) == \
+        (datetime(2025, 11, 14, 15, 5), "GcGroup")
+
+
+def test_fecha_imposible_en_el_orden_indicado():
+    assert parsear_pre_plain_text("[10:32, 11/14/2025] X: ") == (None, "X")
+    assert parsear_pre_plain_text("[10:32, 14/11/2025] X: ", dia_primero=False) == (None, "X")
+
+
+def test_valor_vacio_o_desconocido():
+    assert parsear_pre_plain_text(None) == (None, None)
+    assert parsear_pre_plain_text("GcGroup: ") == (None, None)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Replay en Chrome headless: la lista del día se encuentra aunque no esté en la primera ventana del chat"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import replay_wsp
+from automatizador_wsp_completo import AutomatizadorWSP
+
+
+@pytest.fixture
+def driver(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    try:
+        driver = replay_wsp.crear_driver_headless(AutomatizadorWSP())
+    except Exception as e:
+        pytest.skip(f"Chrome headless no disponible: {e}")
+    yield driver
+    driver.quit()
+
+
+def test_lista_fuera_de_la_ventana_inicial(driver, tmp_path):
+    # 100 mensajes en tres días, solo los últimos 30 en el DOM. Las listas de hace dos días
+    # son los mensajes 7, 17 y 27: la más reciente (27) queda fuera de la ventana inicial
+    hoy = datetime(2025, 11, 14)
+    ruta = replay_wsp.generar_chat_sintetico(100, hoy, str(tmp_path / "chat.html"), latencia_ms=20, ventana=30)
+    automatizador = AutomatizadorWSP(fecha_objetivo=hoy - timedelta(days=2))
+    automatizador.driver = driver
+    driver.get("file://" + os.path.abspath(ruta))
+    assert not driver.find_elements("css selector", '[data-id$="SINT00027"]')
+
+    texto = automatizador.buscar_mensaje_objetivo_hoy()
+
+    assert texto and texto.startswith("BUEN DIA TE DEJO LA LISTA DE HOY")
+    assert automatizador.burbuja_objetivo["data_id"].endswith("SINT00027")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Traza por fases de cada corrida del automatizador de WhatsApp
+Registra duración y llamadas a WebDriver de cada fase (navegador, búsqueda del chat,
+expansión, extracción, guardado, post-procesamiento) y las guarda en output/trazas/
+como JSON y en formato Chrome trace (abrir con chrome://tracing o https://ui.perfetto.dev).
+"""
+
+import os
+import json
+import time
+import threading
+import contextlib
+from datetime import datetime
+
+
+class TrazaFases:
+    def __init__(self, nombre="corrida", directorio="output/trazas"):
+        self.nombre = nombre
+        self.directorio = directorio
+        self.inicio = time.perf_counter()
+        self.inicio_epoch = time.time()
+        self.fecha_inicio = datetime.now()
+        self.fases = []
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def fase(self, nombre, contar_llamadas=None, **detalles):
+        """Medir un bloque: `with traza.fase("buscar_y_abrir_chat", proveedor="GcGroup"):`
+
+        `contar_llamadas` devuelve el contador de comandos WebDriver del driver que usa la
+        fase (se lee al entrar y al salir). Las fases pueden anidarse.
+        """
+        llamadas_antes = contar_llamadas() if contar_llamadas else 0
+        comienzo = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            fin = time.perf_counter()
+            registro = {
+                "fase": nombre,
+                "inicio_ms": round((comienzo - self.inicio) * 1000, 1),
+                "ms": round((fin - comienzo) * 1000, 1),
+                "llamadas_webdriver": (contar_llamadas() if contar_llamadas else 0) - llamadas_antes,
+                "hilo": threading.current_thread().name,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "detalles": detalles
+            }
+            if error:
+                registro["error"] = error
+            with self.lock:
+                self.fases.append(registro)
+
+    def exportar(self):
+        """Fases en un dict serializable, para devolverlas desde otro proceso"""
+        with self.lock:
+            return {"inicio_epoch": self.inicio_epoch, "fases": list(self.fases)}
+
+    def incorporar(self, exportada):
+        """Sumar las fases de otro proceso (ver exportar), alineadas al inicio de esta traza"""
+        desfase_ms = (exportada["inicio_epoch"] - self.inicio_epoch) * 1000
+        with self.lock:
+            for fase in exportada["fases"]:
+                self.fases.append(dict(fase, inicio_ms=round(fase["inicio_ms"] + desfase_ms, 1)))
+
+    def eventos_chrome(self):
+        """Fases como eventos completos ("ph": "X") del formato Chrome trace, en microsegundos"""
+        return [
+            {
+                "name": fase["fase"],
+                "cat": "wsp",
+                "ph": "X",
+                "ts": int(fase["inicio_ms"] * 1000),
+                "dur": int(fase["ms"] * 1000),
+                "pid": fase["pid"],
+                "tid": fase["tid"],
+                "args": dict(fase["detalles"], llamadas_webdriver=fase["llamadas_webdriver"])
+            }
+            for fase in sorted(self.fases, key=lambda f: f["inicio_ms"])
+        ]
+
+    def reportar(self):
+        """Mostrar el tiempo y las llamadas acumuladas por fase"""
+        totales = {}
+        for fase in self.fases:
+            total = totales.setdefault(fase["fase"], {"veces": 0, "ms": 0.0, "llamadas": 0})
+            total["veces"] += 1
+            total["ms"] += fase["ms"]
+            total["llamadas"] += fase["llamadas_webdriver"]
+        print("⏱️ TIEMPOS POR FASE")
+        for nombre, total in sorted(totales.items(), key=lambda t: -t[1]["ms"]):
+            print(f"   {nombre:<40}{total['ms'] / 1000:>8.2f}s {total['llamadas']:>6} llamadas  (x{total['veces']})")
+
+    def guardar(self):
+        """Escribir la traza en JSON y en formato Chrome trace; devuelve las rutas"""
+        if not self.fases:
+            return None
+        sello = self.fecha_inicio.strftime("%Y%m%d_%H%M%S")
+        ruta_json = os.path.join(self.directorio, f"traza_{self.nombre}_{sello}.json")
+        ruta_chrome = os.path.join(self.directorio, f"traza_{self.nombre}_{sello}.trace.json")
+        with self.lock:
+            datos = {
+                "nombre": self.nombre,
+                "inicio": self.fecha_inicio.isoformat(timespec='seconds'),
+                "total_ms": round((time.perf_counter() - self.inicio) * 1000, 1),
+                "fases": sorted(self.fases, key=lambda f: f["inicio_ms"])
+            }
+            eventos = self.eventos_chrome()
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(ruta_json, 'w', encoding='utf-8') as f:
+                json.dump(datos, f, indent=2, ensure_ascii=False)
+            with open(ruta_chrome, 'w', encoding='utf-8') as f:
+                json.dump({"traceEvents": eventos, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar la traza: {e}")
+            return None
+        print(f"🧾 Traza guardada: {ruta_json} (Chrome trace: {ruta_chrome})")
+        return ruta_json, ruta_chrome